@@ -0,0 +1,79 @@
+import os
+import scripts.ui as ui
+from scripts.img_ascii_convertor import ImgAsciiConvertor
+from scripts.ascii_video_file import (
+    ASCII_VIDEO_EXTENSION,
+    convert_to_ascii_video_file,
+    convert_from_ascii_video_file,
+    is_ascii_video_file
+)
+
+
+# Define input options
+class InputOptions:
+    input_path: str
+    output_type: str
+
+
+def main() -> None:
+    # Print intro
+    print_intro()
+
+    # Get input options
+    input_options = get_input_options()
+
+    ui.print_separator()
+
+    output_path = f'{os.path.splitext(input_options.input_path)[0]}.{input_options.output_type}'
+
+    print(f'Converting {os.path.basename(input_options.input_path)}...')
+
+    if is_ascii_video_file(input_options.input_path):
+        convert_from_ascii_video_file(input_options.input_path, output_path)
+    else:
+        charset = ImgAsciiConvertor(1.0, False).get_grayscale_chars()
+        convert_to_ascii_video_file(input_options.input_path, output_path, charset)
+
+    ui.print_lines([
+        'FORMAT CONVERSION FINISHED',
+        f' -> Output file: {output_path}'
+    ], seperate_chunk=True)
+
+
+def print_intro() -> None:
+    ui.print_lines([
+        'ASCII VIDEO FORMAT CONVERTOR',
+        f' - Converts .json and .pkl ascii videos to the binary .{ASCII_VIDEO_EXTENSION} format',
+        f' - Converts .{ASCII_VIDEO_EXTENSION} ascii videos back to .json or .pkl'
+    ], seperate_chunk=True)
+
+
+def get_input_options() -> InputOptions:
+    input_options = InputOptions()
+
+    input_options.input_path = ui.get_input(
+        prompt='Ascii video file path',
+        custom_validator=ui.file_type_validator,
+        custom_validator_args=['json', 'pkl', ASCII_VIDEO_EXTENSION],
+        custom_validator_error=f'Invalid file type - only .json, .pkl and .{ASCII_VIDEO_EXTENSION} supported'
+    )
+
+    print()
+
+    if is_ascii_video_file(input_options.input_path):
+        input_options.output_type = ui.get_input(
+            prompt='Output type',
+            options=['json', 'pkl']
+        )
+    else:
+        input_options.output_type = ASCII_VIDEO_EXTENSION
+
+    return input_options
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except KeyboardInterrupt:
+        # Turn off on keyboard interrupt
+        print('Turned off by Keyboard Interrupt')
@@ -6,6 +6,7 @@ from scripts.ascii_video_player import AsciiVideoPlayer
 # Define input options
 class InputOptions:
     input_path: str
+    speed: float
 
 
 def main() -> None:
@@ -17,14 +18,14 @@ def main() -> None:
 
     # Play ascii video
     player = AsciiVideoPlayer()
-    player.play(input_options.input_path, True)
+    player.play(input_options.input_path, True, input_options.speed)
 
 
 def print_intro() -> None:
     ui.print_lines([
         'ASCII VIDEO PLAYER',
         ' - Plays an ascii video in the console',
-        ' - .json and .pkl files made using the Ascii Video Convertor supported'
+        ' - .json, .pkl and .ascv files made using the Ascii Video Convertor supported'
     ], seperate_chunk=True)
 
 
@@ -34,8 +35,16 @@ def get_input_options() -> InputOptions:
     input_options.input_path = ui.get_input(
         prompt='Ascii video file path',
         custom_validator=ui.file_type_validator,
-        custom_validator_args=['json', 'pkl'],
-        custom_validator_error='Invalid file type - only .json and .pkl supported'
+        custom_validator_args=['json', 'pkl', 'ascv'],
+        custom_validator_error='Invalid file type - only .json, .pkl and .ascv supported'
+    )
+
+    print()
+
+    input_options.speed = ui.get_range_input(
+        prompt='Playback speed',
+        min_val=0.25,
+        max_val=4.0
     )
 
     return input_options
@@ -46,5 +55,5 @@ if __name__ == '__main__':
         main()
     except KeyboardInterrupt:
         # Turn off on keyboard interrupt
-        os.system('cls')
+        os.system('cls' if os.name == 'nt' else 'clear')
         print('Turned off by Keyboard Interrupt')
\ No newline at end of file
@@ -0,0 +1,127 @@
+import os
+import sys
+import json
+import time
+import argparse
+import scripts.ui as ui
+from scripts.video_ascii_convertor import VideoAsciiConvertor, OUTPUT_TYPES, COMPRESSION_OPTIONS
+from scripts.batch_video_convertor import BatchVideoConvertor, collect_video_paths, DEFAULT_DECODERS
+from scripts.conversion_cache import ConversionCache, DEFAULT_CACHE_PATH, DEFAULT_CACHE_SIZE
+from scripts.ascii_color import COLOR_OPTIONS
+from scripts.img_ascii_convertor import GLYPH_MODE_OPTIONS, validate_charset
+
+
+def main() -> int:
+    args = parse_args()
+
+    video_paths = collect_video_paths(args.inputs)
+    if len(video_paths) == 0:
+        print('No videos found in the given inputs')
+        return 1
+
+    cache = None
+    if args.cache:
+        cache = ConversionCache(args.cache_dir, int(args.cache_size * 1024 ** 2))
+
+    video_convertor = VideoAsciiConvertor(
+        args.scale,
+        args.cores,
+        args.output_type,
+        keyframe_interval=args.keyframe_interval,
+        compression=COMPRESSION_OPTIONS[args.compression],
+        cache=cache,
+        target_fps=args.fps,
+        color_mode=COLOR_OPTIONS[args.color],
+        dedup_threshold=args.dedup,
+        glyph_mode=GLYPH_MODE_OPTIONS[args.glyphs],
+        charset=args.charset
+    )
+    if args.output_dir is not None:
+        os.makedirs(args.output_dir, exist_ok=True)
+        video_convertor.set_output_path(args.output_dir)
+
+    ui.print_lines([
+        'BATCH VIDEO TO ASCII CONVERTOR',
+        f' - Converting {len(video_paths)} videos on {args.cores} cores'
+    ], seperate_chunk=True)
+
+    batch_start = time.time()
+    batch_convertor = BatchVideoConvertor(video_convertor, args.cores, args.decoders)
+    summaries = batch_convertor.convert(video_paths)
+    batch_time = time.time() - batch_start
+
+    failed = [summary for summary in summaries if summary['error'] is not None]
+
+    outro_lines = [
+        f'BATCH CONVERSION FINISHED - Total time {batch_time:.2f}s',
+        f' -> Converted: {len(summaries) - len(failed)} | Failed: {len(failed)}'
+    ]
+    if cache is not None:
+        outro_lines.append(f' -> {cache.get_stats_line()}')
+
+    ui.print_lines(outro_lines, seperate_chunk=True)
+
+    if args.summary is not None:
+        with open(args.summary, 'w') as summary_file:
+            json.dump({
+                'resolution':   args.scale,
+                'cores':        args.cores,
+                'output_type':  OUTPUT_TYPES[args.output_type],
+                'color_mode':   COLOR_OPTIONS[args.color],
+                'glyph_mode':   GLYPH_MODE_OPTIONS[args.glyphs],
+                'total_time':   batch_time,
+                'cache':        cache.get_stats() if cache is not None else None,
+                'files':        summaries
+            }, summary_file, indent=4)
+
+    return 1 if failed else 0
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Convert many videos to ascii without prompts')
+
+    parser.add_argument('inputs', nargs='+', help='Video files, directories or glob patterns')
+    parser.add_argument('-s', '--scale', type=float, default=0.5, help='Resolution scale (0.1 - 1.0)')
+    parser.add_argument('-c', '--cores', type=int, default=os.cpu_count(), help='Number of pool processes')
+    parser.add_argument('-o', '--output-type', choices=list(OUTPUT_TYPES.keys()), default='j', help='j for JSON, p for PICKLE, b for BINARY')
+    parser.add_argument('-d', '--output-dir', default=None, help='Output directory, output/video_ascii by default')
+    parser.add_argument('-k', '--keyframe-interval', type=int, default=0, help='Keyframe interval, 0 stores every frame in full')
+    parser.add_argument('-z', '--compression', choices=list(COMPRESSION_OPTIONS.keys()), default='n', help='n for NONE, z for ZLIB, l for LZMA (binary output)')
+    parser.add_argument('--color', choices=list(COLOR_OPTIONS.keys()), default='n', help='n for NONE, 2 for 256 COLORS, t for TRUECOLOR')
+    parser.add_argument('--glyphs', choices=list(GLYPH_MODE_OPTIONS.keys()), default='b', help='b for BRIGHTNESS, s for STRUCTURE (glyph shapes matched to the image)')
+    parser.add_argument('--charset', default=None, help='Glyphs ordered from dark to bright, the default of the glyph mode otherwise')
+    parser.add_argument('--fps', type=float, default=None, help='Target output fps, source frames above it are skipped')
+    parser.add_argument('--dedup', type=float, default=None, help='Store duplicate frames as references, the share of cells a near duplicate may change (0 for identical frames only)')
+    parser.add_argument('--decoders', type=int, default=DEFAULT_DECODERS, help='Videos decoded at the same time')
+    parser.add_argument('--cache', action='store_true', help='Reuse outputs of videos converted before with the same settings')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_PATH, help='Conversion cache directory')
+    parser.add_argument('--cache-size', type=float, default=DEFAULT_CACHE_SIZE / 1024 ** 2, help='Conversion cache size limit in MB, least recently used outputs are evicted')
+    parser.add_argument('--summary', default=None, help='Write per file timings to this JSON file')
+
+    args = parser.parse_args()
+
+    if not 0.1 <= args.scale <= 1.0:
+        parser.error('--scale must be between 0.1 and 1.0')
+
+    if args.fps is not None and args.fps <= 0:
+        parser.error('--fps must be positive')
+
+    if args.dedup is not None and not 0.0 <= args.dedup < 1.0:
+        parser.error('--dedup must be between 0.0 and 1.0')
+
+    if args.charset is not None:
+        try:
+            validate_charset(args.charset)
+        except ValueError as error:
+            parser.error(f'--charset: {error}')
+
+    return args
+
+
+if __name__ == '__main__':
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        # Turn off on keyboard interrupt
+        print('Turned off by Keyboard Interrupt')
+        sys.exit(130)
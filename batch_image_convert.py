@@ -0,0 +1,97 @@
+import os
+import sys
+import time
+import argparse
+import scripts.ui as ui
+from scripts.img_ascii_convertor import ImgAsciiConvertor, GLYPH_MODE_OPTIONS, validate_charset
+from scripts.batch_image_convertor import BatchImageConvertor, collect_image_paths, DEFAULT_CHUNK_SIZE
+from scripts.ascii_color import COLOR_OPTIONS
+
+
+def main() -> int:
+    args = parse_args()
+
+    image_paths = collect_image_paths(args.inputs)
+    if len(image_paths) == 0:
+        print('No images found in the given inputs')
+        return 1
+
+    image_convertor = ImgAsciiConvertor(
+        args.scale,
+        output_to_file=True,
+        color_mode=COLOR_OPTIONS[args.color],
+        glyph_mode=GLYPH_MODE_OPTIONS[args.glyphs],
+        charset=args.charset
+    )
+    if args.output_dir is not None:
+        os.makedirs(args.output_dir, exist_ok=True)
+        image_convertor.set_output_path(args.output_dir)
+
+    ui.print_lines([
+        'BATCH IMAGE TO ASCII CONVERTOR',
+        f' - Converting {len(image_paths)} images on {args.cores} cores'
+    ], seperate_chunk=True)
+
+    batch_start = time.time()
+    batch_convertor = BatchImageConvertor(image_convertor, args.cores, args.chunk_size)
+
+    failed_count = 0
+    for result in batch_convertor.convert(image_paths):
+        if result.error is not None:
+            failed_count += 1
+            print(f'{image_paths[result.index]} - FAILED')
+            print(f' -> {result.error}')
+
+    # Write errors are only known once the writer finished
+    for output_path, error in batch_convertor.get_write_errors():
+        failed_count += 1
+        print(f'{output_path} - WRITE FAILED')
+        print(f' -> {error}')
+
+    batch_time = time.time() - batch_start
+
+    ui.print_lines([
+        f'BATCH CONVERSION FINISHED - Total time {batch_time:.2f}s',
+        f' -> Converted: {len(image_paths) - failed_count} | Failed: {failed_count}',
+        f' -> {len(image_paths) / max(batch_time, 1e-9):.1f} images/s'
+    ], seperate_chunk=True)
+
+    return 1 if failed_count else 0
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Convert many images to ascii without prompts')
+
+    parser.add_argument('inputs', nargs='+', help='Image files, directories or glob patterns')
+    parser.add_argument('-s', '--scale', type=float, default=0.5, help='Resolution scale (0.1 - 1.0)')
+    parser.add_argument('-c', '--cores', type=int, default=os.cpu_count(), help='Number of pool processes')
+    parser.add_argument('-d', '--output-dir', default=None, help='Output directory, output/img_ascii by default')
+    parser.add_argument('--color', choices=list(COLOR_OPTIONS.keys()), default='n', help='n for NONE, 2 for 256 COLORS, t for TRUECOLOR')
+    parser.add_argument('--glyphs', choices=list(GLYPH_MODE_OPTIONS.keys()), default='b', help='b for BRIGHTNESS, s for STRUCTURE (glyph shapes matched to the image)')
+    parser.add_argument('--charset', default=None, help='Glyphs ordered from dark to bright, the default of the glyph mode otherwise')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='Images converted per pool task')
+
+    args = parser.parse_args()
+
+    if not 0.1 <= args.scale <= 1.0:
+        parser.error('--scale must be between 0.1 and 1.0')
+
+    if args.chunk_size < 1:
+        parser.error('--chunk-size must be at least 1')
+
+    if args.charset is not None:
+        try:
+            validate_charset(args.charset)
+        except ValueError as error:
+            parser.error(f'--charset: {error}')
+
+    return args
+
+
+if __name__ == '__main__':
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        # Turn off on keyboard interrupt
+        print('Turned off by Keyboard Interrupt')
+        sys.exit(130)
@@ -0,0 +1,101 @@
+import os
+import sys
+import json
+import time
+import argparse
+import scripts.ui as ui
+from scripts.conversion_benchmark import (
+    ConversionBenchmark,
+    compare_results,
+    BENCHMARK_STAGES,
+    DEFAULT_FRAME_SIZES,
+    DEFAULT_FRAME_COUNTS,
+    DEFAULT_RESOLUTION_SCALES,
+    DEFAULT_REPEATS,
+    DEFAULT_REGRESSION_TOLERANCE
+)
+
+
+BASE_PATH = os.path.abspath(os.path.dirname(__file__))
+
+# Small configuration for a quick check
+QUICK_FRAME_SIZES = [(320, 180), (640, 360)]
+QUICK_FRAME_COUNTS = [24]
+QUICK_RESOLUTION_SCALES = [0.5]
+
+
+def main() -> int:
+    args = parse_args()
+
+    if args.quick:
+        benchmark = ConversionBenchmark(QUICK_FRAME_SIZES, QUICK_FRAME_COUNTS, QUICK_RESOLUTION_SCALES, args.cores, args.stages, 1)
+    else:
+        benchmark = ConversionBenchmark(args.sizes, args.frames, args.scales, args.cores, args.stages, args.repeats)
+
+    ui.print_lines([
+        'CONVERSION BENCHMARK',
+        f' - Stages: {", ".join(args.stages)}'
+    ], seperate_chunk=True)
+
+    try:
+        results = benchmark.run()
+    finally:
+        if not args.keep_media:
+            benchmark.clean_up()
+
+    output_path = args.output
+    if output_path is None:
+        output_path = os.path.join(BASE_PATH, 'output', f'benchmark_{time.strftime("%Y%m%d_%H%M%S")}.json')
+
+    with open(output_path, 'w') as output_file:
+        json.dump(results, output_file, indent=4)
+
+    outro_lines = [
+        f'BENCHMARK FINISHED - Total time {results["total_time"]:.2f}s',
+        f' -> Results: {output_path}'
+    ]
+
+    regressions = []
+    if args.baseline is not None:
+        with open(args.baseline, 'r') as baseline_file:
+            regressions = compare_results(json.load(baseline_file), results, args.tolerance)
+
+        outro_lines.append(f' -> Regressions over {args.tolerance * 100:.0f}%: {len(regressions)}')
+        for result_name, baseline_fps, current_fps in regressions:
+            outro_lines.append(f'    {result_name}: {baseline_fps:.1f} -> {current_fps:.1f} fps')
+
+    ui.print_lines(outro_lines, seperate_chunk=True)
+
+    return 1 if regressions else 0
+
+
+def parse_size(size: str) -> tuple:
+    width, height = size.lower().split('x')
+    return int(width), int(height)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Measure the frames per second of every stage of the conversion pipeline')
+
+    parser.add_argument('--sizes', type=parse_size, nargs='+', default=DEFAULT_FRAME_SIZES, help='Synthetic frame sizes, WIDTHxHEIGHT')
+    parser.add_argument('--frames', type=int, nargs='+', default=DEFAULT_FRAME_COUNTS, help='Synthetic video lengths in frames')
+    parser.add_argument('--scales', type=float, nargs='+', default=DEFAULT_RESOLUTION_SCALES, help='Resolution scales')
+    parser.add_argument('--cores', type=int, nargs='+', default=None, help='Core counts of the video conversion, 1 and all cores by default')
+    parser.add_argument('--stages', nargs='+', choices=BENCHMARK_STAGES, default=BENCHMARK_STAGES, help='Stages to measure')
+    parser.add_argument('--repeats', type=int, default=DEFAULT_REPEATS, help='Runs per measurement, the fastest one is kept')
+    parser.add_argument('--quick', action='store_true', help='Small sizes, one length and scale, no repeats')
+    parser.add_argument('--keep-media', action='store_true', help='Keep the generated videos and images in temp/benchmark')
+    parser.add_argument('-o', '--output', default=None, help='Results JSON path, output/benchmark_<time>.json by default')
+    parser.add_argument('--baseline', default=None, help='Results JSON of an earlier version to compare against')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_REGRESSION_TOLERANCE, help='Slowdown reported as a regression')
+
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        # Turn off on keyboard interrupt
+        print('Turned off by Keyboard Interrupt')
+        sys.exit(130)
@@ -0,0 +1,84 @@
+import os
+import sys
+import json
+import argparse
+import scripts.ui as ui
+from scripts.broadcast_server import AsciiBroadcastServer, DEFAULT_HOST, DEFAULT_PORT, DEFAULT_CLIENT_BUFFER_FRAMES
+from scripts.live_convertor import DEFAULT_LATENCY_BUDGET
+from scripts.ascii_color import COLOR_OPTIONS
+
+
+def main() -> int:
+    args = parse_args()
+
+    server = AsciiBroadcastServer(args.host, args.port, args.buffer, not args.no_wait)
+
+    ui.print_lines([
+        'ASCII VIDEO BROADCAST',
+        f' - Serving {os.path.basename(args.input)} on {args.host}:{args.port}',
+        f' - Watch with: nc <host> {args.port} or telnet <host> {args.port}'
+    ], seperate_chunk=True)
+
+    if args.live:
+        stats = server.serve_live(
+            args.input,
+            args.scale,
+            args.cores,
+            args.latency / 1000,
+            args.fps,
+            COLOR_OPTIONS[args.color]
+        )
+    else:
+        stats = server.serve_file(args.input, args.speed)
+
+    ui.print_lines([
+        'BROADCAST FINISHED',
+        f' -> Frames: {stats["ticks"]} | Skipped ticks: {stats["skipped_ticks"]} | Encoded: {stats["encoded_bytes"] / 1024 ** 2:.1f}MB',
+        *[
+            f' -> {client["address"]}: sent {client["sent_frames"]} | dropped {client["dropped_frames"]}'
+            for client in stats['clients']
+        ]
+    ], seperate_chunk=True)
+
+    if args.summary is not None:
+        with open(args.summary, 'w') as summary_file:
+            json.dump(stats, summary_file, indent=4)
+
+    return 0
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Stream an ascii video to many terminals over TCP')
+
+    parser.add_argument('input', help='Ascii video (.json, .pkl, .ascv) or a video with --live')
+    parser.add_argument('--host', default=DEFAULT_HOST, help='Address to listen on')
+    parser.add_argument('-p', '--port', type=int, default=DEFAULT_PORT, help='Port to listen on')
+    parser.add_argument('-b', '--buffer', type=int, default=DEFAULT_CLIENT_BUFFER_FRAMES, help='Frames buffered per client before frames are dropped for it')
+    parser.add_argument('--no-wait', action='store_true', help='Start right away instead of waiting for the first client')
+    parser.add_argument('--speed', type=float, default=1.0, help='Playback speed of ascii video files')
+    parser.add_argument('--live', action='store_true', help='Convert the input video while broadcasting it')
+    parser.add_argument('-s', '--scale', type=float, default=0.5, help='Resolution scale of the live conversion (0.1 - 1.0)')
+    parser.add_argument('-c', '--cores', type=int, default=os.cpu_count(), help='Processes of the live conversion')
+    parser.add_argument('--latency', type=float, default=DEFAULT_LATENCY_BUDGET * 1000, help='Latency budget of the live conversion in ms')
+    parser.add_argument('--fps', type=float, default=None, help='Target fps of the live conversion')
+    parser.add_argument('--color', choices=list(COLOR_OPTIONS.keys()), default='n', help='n for NONE, 2 for 256 COLORS, t for TRUECOLOR (live conversion)')
+    parser.add_argument('--summary', default=None, help='Write the broadcast stats to this JSON file')
+
+    args = parser.parse_args()
+
+    if not 0.1 <= args.scale <= 1.0:
+        parser.error('--scale must be between 0.1 and 1.0')
+
+    if args.speed <= 0:
+        parser.error('--speed must be positive')
+
+    return args
+
+
+if __name__ == '__main__':
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        # Turn off on keyboard interrupt
+        print('Turned off by Keyboard Interrupt')
+        sys.exit(130)
@@ -0,0 +1,69 @@
+import os
+import sys
+import argparse
+import scripts.ui as ui
+from scripts.ascii_video_exporter import AsciiVideoExporter, EXPORT_FORMATS, EXPORT_FORMAT_MP4, DEFAULT_FONT_SIZE
+from scripts.ascii_video_file import ASCII_VIDEO_EXTENSION
+
+
+def main() -> int:
+    args = parse_args()
+
+    output_path = args.output or f'{os.path.splitext(args.input)[0]}.{args.format}'
+
+    ui.print_lines([
+        'ASCII VIDEO EXPORTER',
+        f' - Rendering {os.path.basename(args.input)} to {os.path.basename(output_path)} on {args.cores} cores'
+    ], seperate_chunk=True)
+
+    exporter = AsciiVideoExporter(args.cores, args.font, args.font_size, args.speed)
+    exporter.export(args.input, output_path)
+
+    stats = exporter.get_stats()
+    frame_width, frame_height = stats['frame_size']
+
+    ui.print_lines([
+        f'EXPORT FINISHED - Total time {stats["export_time"]:.2f}s',
+        f' -> Output file: {output_path}',
+        f' -> Frames: {stats["frames"]} | Size: {frame_width}x{frame_height} | Cores used: {stats["cores"]}',
+        f' -> {stats["frames"] / max(stats["export_time"], 1e-9):.1f} frames/s'
+    ], seperate_chunk=True)
+
+    return 0
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Render an ascii video back to pixels as an .mp4 or .gif')
+
+    parser.add_argument('input', help=f'Ascii video file (.json, .pkl or .{ASCII_VIDEO_EXTENSION})')
+    parser.add_argument('-o', '--output', default=None, help='Output file, its extension picks the format (next to the input by default)')
+    parser.add_argument('-f', '--format', choices=EXPORT_FORMATS, default=EXPORT_FORMAT_MP4, help='Format of the default output file')
+    parser.add_argument('-c', '--cores', type=int, default=os.cpu_count(), help='Number of render processes for long videos')
+    parser.add_argument('--font', default=None, help='TrueType font file, a monospace system font by default')
+    parser.add_argument('--font-size', type=int, default=DEFAULT_FONT_SIZE, help='Font size in pixels')
+    parser.add_argument('--speed', type=float, default=1.0, help='Playback speed of the output (0.25 - 4.0)')
+
+    args = parser.parse_args()
+
+    if not os.path.isfile(args.input) or args.input.split('.')[-1] not in ['json', 'pkl', ASCII_VIDEO_EXTENSION]:
+        parser.error(f'{args.input} is not a .json, .pkl or .{ASCII_VIDEO_EXTENSION} file')
+
+    if args.output is not None and args.output.split('.')[-1].lower() not in EXPORT_FORMATS:
+        parser.error(f'--output must end in .{", .".join(EXPORT_FORMATS)}')
+
+    if args.font_size < 4:
+        parser.error('--font-size must be at least 4')
+
+    if not 0.25 <= args.speed <= 4.0:
+        parser.error('--speed must be between 0.25 and 4.0')
+
+    return args
+
+
+if __name__ == '__main__':
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        # Turn off on keyboard interrupt
+        print('Turned off by Keyboard Interrupt')
+        sys.exit(130)
@@ -1,5 +1,7 @@
 import scripts.ui as ui
-from scripts.img_ascii_convertor import ImgAsciiConvertor
+from scripts.img_ascii_convertor import ImgAsciiConvertor, GLYPH_MODE_OPTIONS
+from scripts.conversion_cache import ConversionCache
+from scripts.ascii_color import COLOR_OPTIONS
 
 
 # Define input options
@@ -7,6 +9,9 @@ class InputOptions:
     image_path: str
     resolution_scale: float
     print_output: bool
+    color_mode: str
+    glyph_mode: str
+    use_cache: bool
 
 
 def main() -> None:
@@ -21,7 +26,10 @@ def main() -> None:
     convertor = ImgAsciiConvertor(
         resolution_scale=input_options.resolution_scale, 
         output_to_file=True, 
-        print_output=input_options.print_output
+        print_output=input_options.print_output,
+        cache=ConversionCache() if input_options.use_cache else None,
+        color_mode=input_options.color_mode,
+        glyph_mode=input_options.glyph_mode
     )
     convertor.convert(image_path=input_options.image_path, print_message=True)
 
@@ -55,6 +63,28 @@ def get_input_options() -> InputOptions:
 
     input_options.print_output = ui.get_bool_input('Print result')
 
+    print()
+
+    color_mode = ui.get_input(
+        prompt='Colors',
+        options=list(COLOR_OPTIONS.keys()),
+        options_prompt='n for NONE, 2 for 256 COLORS, t for TRUECOLOR'
+    )
+    input_options.color_mode = COLOR_OPTIONS[color_mode]
+
+    print()
+
+    glyph_mode = ui.get_input(
+        prompt='Glyphs',
+        options=list(GLYPH_MODE_OPTIONS.keys()),
+        options_prompt='b for BRIGHTNESS, s for STRUCTURE (sharper edges)'
+    )
+    input_options.glyph_mode = GLYPH_MODE_OPTIONS[glyph_mode]
+
+    print()
+
+    input_options.use_cache = ui.get_bool_input('Reuse cached conversions')
+
     return input_options
 
 
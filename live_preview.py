@@ -0,0 +1,105 @@
+import os
+import scripts.ui as ui
+from scripts.live_convertor import LiveAsciiConvertor, DEFAULT_LATENCY_BUDGET
+from scripts.ascii_color import COLOR_OPTIONS
+
+
+# Define input options
+class InputOptions:
+    input_path: str
+    resolution_scale: float
+    num_cores: int
+    latency_budget: float
+    target_fps: float
+    color_mode: str
+
+
+def main() -> None:
+    # Print intro
+    print_intro()
+
+    # Get input options
+    input_options = get_input_options()
+
+    ui.print_separator()
+
+    convertor = LiveAsciiConvertor(
+        input_options.resolution_scale,
+        input_options.num_cores,
+        input_options.latency_budget,
+        target_fps=input_options.target_fps,
+        color_mode=input_options.color_mode
+    )
+    convertor.play(input_options.input_path)
+
+
+def print_intro() -> None:
+    ui.print_lines([
+        'LIVE ASCII PREVIEW',
+        ' - Plays a video as ascii while it is being converted',
+        ' - Nothing is saved, frames the conversion can not keep up with are dropped'
+    ], seperate_chunk=True)
+
+
+def get_input_options() -> InputOptions:
+    input_options = InputOptions()
+
+    input_options.input_path = ui.get_input(
+        prompt='Video input path',
+        custom_validator=ui.file_type_validator,
+        custom_validator_args=['mp4'],
+        custom_validator_error='The path specified is not a video'
+    )
+
+    print()
+
+    input_options.resolution_scale = ui.get_range_input(
+        prompt='Resolution scale',
+        min_val=0.1,
+        max_val=1.0
+    )
+
+    print()
+
+    input_options.num_cores = ui.get_range_input(
+        prompt=f'Number of cores to use for conversion',
+        min_val=1,
+        max_val=os.cpu_count()
+    )
+
+    print()
+
+    input_options.latency_budget = ui.get_range_input(
+        prompt=f'Latency budget in ms, {int(DEFAULT_LATENCY_BUDGET * 1000)} recommended',
+        min_val=0,
+        max_val=1000
+    ) / 1000
+
+    print()
+
+    target_fps = ui.get_range_input(
+        prompt='Target fps, 0 keeps the fps of the video',
+        min_val=0,
+        max_val=240
+    )
+    input_options.target_fps = target_fps if target_fps > 0 else None
+
+    print()
+
+    color_mode = ui.get_input(
+        prompt='Colors',
+        options=list(COLOR_OPTIONS.keys()),
+        options_prompt='n for NONE, 2 for 256 COLORS, t for TRUECOLOR'
+    )
+    input_options.color_mode = COLOR_OPTIONS[color_mode]
+
+    return input_options
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except KeyboardInterrupt:
+        # Turn off on keyboard interrupt
+        os.system('cls' if os.name == 'nt' else 'clear')
+        print('Turned off by Keyboard Interrupt')
@@ -0,0 +1,277 @@
+from __future__ import annotations
+import base64
+from typing import Callable
+from scripts.lazy_import import lazy_import
+
+np = lazy_import('numpy')
+
+
+COLOR_NONE = 'none'
+COLOR_256 = '256'
+COLOR_TRUE = 'truecolor'
+
+COLOR_MODES = [COLOR_NONE, COLOR_256, COLOR_TRUE]
+
+COLOR_OPTIONS = {
+    'n': COLOR_NONE,
+    '2': COLOR_256,
+    't': COLOR_TRUE
+}
+
+# Bytes stored per cell, a palette index or r, g, b
+COLOR_CELL_BYTES = {
+    COLOR_256:  1,
+    COLOR_TRUE: 3
+}
+
+SGR_RESET = '\033[0m'
+
+# Channel levels of the 6x6x6 cube (palette 16 - 231) and the gray ramp (palette 232 - 255)
+ANSI_CUBE_LEVELS = (0, 95, 135, 175, 215, 255)
+ANSI_CUBE_START = 16
+ANSI_GRAY_START = 232
+ANSI_GRAY_STEPS = 24
+
+# Truecolor channels are rounded to steps of this size, nearby shades share one escape code
+TRUECOLOR_STEP = 8
+
+# Spaces show no foreground color, any color can be used for them
+SPACE_BYTE = ord(' ')
+
+# RGB of the 16 system colors (palette 0 - 15) as xterm draws them
+ANSI_SYSTEM_COLORS = (
+    (0, 0, 0), (128, 0, 0), (0, 128, 0), (128, 128, 0), (0, 0, 128), (128, 0, 128), (0, 128, 128), (192, 192, 192),
+    (128, 128, 128), (255, 0, 0), (0, 255, 0), (255, 255, 0), (0, 0, 255), (255, 0, 255), (0, 255, 255), (255, 255, 255)
+)
+
+# Cube levels array + channel value -> index of the nearest cube level, built on first use
+_cube_tables = None
+
+# Palette index -> RGB, built on first use
+_ansi256_rgb_table = None
+
+
+class SgrWriter:
+    def __init__(self, color_mode: str) -> None:
+        # Keeps the color the terminal currently draws with, codes are only written when it changes
+        self._color_mode = color_mode
+        self._current_key = None
+
+        if color_mode == COLOR_256:
+            self._sgr_codes = [f'\033[38;5;{palette_index}m' for palette_index in range(256)]
+
+    def write_cells(self, text: str, color_keys: np.ndarray) -> str:
+        # Returns the text with an escape code in front of every cell group whose color differs from the current one
+        text_bytes = np.frombuffer(text.encode('ascii'), dtype=np.uint8)
+        visible_cells = np.flatnonzero(text_bytes != SPACE_BYTE)
+
+        if len(visible_cells) == 0:
+            return text
+
+        # Spaces take the color of the visible cell before them (or the first one), so they never start a group
+        fill_indices = np.zeros(len(text_bytes), dtype=np.int64)
+        fill_indices[visible_cells] = visible_cells
+        fill_indices = np.maximum.accumulate(fill_indices)
+        fill_indices[:visible_cells[0]] = visible_cells[0]
+        filled_keys = color_keys[fill_indices]
+
+        group_starts = np.flatnonzero(filled_keys[1:] != filled_keys[:-1]) + 1
+        group_bounds = [0, *group_starts.tolist(), len(text_bytes)]
+
+        output = []
+        for group_start, group_end in zip(group_bounds[:-1], group_bounds[1:]):
+            color_key = int(filled_keys[group_start])
+
+            if color_key != self._current_key:
+                output.append(self._get_sgr_code(color_key))
+                self._current_key = color_key
+
+            output.append(text[group_start:group_end])
+
+        return ''.join(output)
+
+    def reset(self) -> str:
+        # Back to the default color, for lines drawn without colors
+        if self._current_key is None:
+            return ''
+
+        self._current_key = None
+        return SGR_RESET
+
+    def invalidate(self) -> None:
+        # Terminal state is unknown after outside writes, the next group always writes its code
+        self._current_key = None
+
+    def _get_sgr_code(self, color_key: int) -> str:
+        if self._color_mode == COLOR_256:
+            return self._sgr_codes[color_key]
+
+        return f'\033[38;2;{color_key >> 16};{(color_key >> 8) & 0xFF};{color_key & 0xFF}m'
+
+
+class ColorFrameValues:
+    def __init__(self, frames: object) -> None:
+        # Wraps the frames of a colored .json/.pkl file, every value is an object with the colors next to
+        # the rows (or the delta runs), reads return the value without the colors
+        self._frames = frames
+
+        # Last read frame value, lazy sources parse a frame on every read
+        self._value_number = None
+        self._value = None
+
+    def __contains__(self, frame_key: object) -> bool:
+        return frame_key in self._frames
+
+    def __getitem__(self, frame_key: object) -> object:
+        frame_value = self._get_value(int(frame_key))
+
+        # References to earlier frames have no colors of their own
+        if isinstance(frame_value, int):
+            return frame_value
+
+        if 'rows' in frame_value:
+            return frame_value['rows']
+
+        return {key: value for key, value in frame_value.items() if key != 'colors'}
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def __iter__(self):
+        return iter(self._frames)
+
+    def keys(self):
+        return self._frames.keys()
+
+    def get_colors(self, frame_key: object) -> str:
+        return self._get_value(int(frame_key))['colors']
+
+    def close(self) -> None:
+        if hasattr(self._frames, 'close'):
+            self._frames.close()
+
+    def _get_value(self, frame_number: int) -> dict:
+        if self._value_number != frame_number:
+            self._value = self._frames[str(frame_number)]
+            self._value_number = frame_number
+
+        return self._value
+
+
+class ColorFrames:
+    def __init__(self, frames: object, get_colors: Callable[[object], np.ndarray]) -> None:
+        # Reads return (rows, colors) pairs
+        self._frames = frames
+        self._get_colors = get_colors
+
+    def __contains__(self, frame_key: object) -> bool:
+        return frame_key in self._frames
+
+    def __getitem__(self, frame_key: object) -> tuple:
+        return self._frames[frame_key], self._get_colors(frame_key)
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def __iter__(self):
+        return iter(self._frames)
+
+    def keys(self):
+        return self._frames.keys()
+
+    def close(self) -> None:
+        if hasattr(self._frames, 'close'):
+            self._frames.close()
+
+
+def quantize_colors(rgb_values: np.ndarray, color_mode: str) -> np.ndarray:
+    # (..., 3) uint8 averages -> (...) palette indices or (..., 3) rounded truecolor channels
+    if color_mode == COLOR_256:
+        return quantize_ansi256(rgb_values)
+
+    rounded = (rgb_values.astype(np.int32) // TRUECOLOR_STEP) * TRUECOLOR_STEP + TRUECOLOR_STEP // 2
+    return np.minimum(rounded, 255).astype(np.uint8)
+
+
+def quantize_ansi256(rgb_values: np.ndarray) -> np.ndarray:
+    rgb_values = rgb_values.astype(np.int32)
+
+    # Nearest cube color per channel
+    cube_levels, cube_index_lut = _get_cube_tables()
+    cube_indices = cube_index_lut[rgb_values]
+    cube_distance = ((rgb_values - cube_levels[cube_indices]) ** 2).sum(axis=-1)
+
+    # Nearest gray of the ramp (8, 18 ... 238) to the channel mean
+    gray_steps = np.clip((rgb_values.mean(axis=-1) - 8 + 5) // 10, 0, ANSI_GRAY_STEPS - 1).astype(np.int32)
+    gray_distance = ((rgb_values - (8 + 10 * gray_steps)[..., None]) ** 2).sum(axis=-1)
+
+    cube_palette = ANSI_CUBE_START + 36 * cube_indices[..., 0] + 6 * cube_indices[..., 1] + cube_indices[..., 2]
+    gray_palette = ANSI_GRAY_START + gray_steps
+
+    return np.where(gray_distance < cube_distance, gray_palette, cube_palette).astype(np.uint8)
+
+
+def get_color_keys(colors: np.ndarray, color_mode: str) -> np.ndarray:
+    # One comparable int per cell, flattened
+    if color_mode == COLOR_256:
+        return colors.reshape(-1).astype(np.int32)
+
+    channels = colors.reshape(-1, 3).astype(np.int32)
+    return (channels[:, 0] << 16) | (channels[:, 1] << 8) | channels[:, 2]
+
+
+def get_ansi256_rgb_table() -> np.ndarray:
+    # (256, 3) uint8 RGB of every palette index, for drawing 256 color frames outside of a terminal
+    global _ansi256_rgb_table
+
+    if _ansi256_rgb_table is None:
+        cube_colors = [
+            (red, green, blue) for red in ANSI_CUBE_LEVELS for green in ANSI_CUBE_LEVELS for blue in ANSI_CUBE_LEVELS
+        ]
+        gray_colors = [(8 + 10 * gray_step,) * 3 for gray_step in range(ANSI_GRAY_STEPS)]
+        _ansi256_rgb_table = np.array([*ANSI_SYSTEM_COLORS, *cube_colors, *gray_colors], dtype=np.uint8)
+
+    return _ansi256_rgb_table
+
+
+def encode_colors(colors: np.ndarray) -> str:
+    return base64.b64encode(np.ascontiguousarray(colors, dtype=np.uint8).tobytes()).decode('ascii')
+
+
+def decode_colors(color_data: object, frame_rows: int, frame_cols: int, color_mode: str) -> np.ndarray:
+    # Base64 text of .json/.pkl files or raw bytes of .ascv files
+    if isinstance(color_data, str):
+        color_data = base64.b64decode(color_data)
+
+    colors = np.frombuffer(color_data, dtype=np.uint8)
+
+    if color_mode == COLOR_TRUE:
+        return colors.reshape(frame_rows, frame_cols, 3)
+
+    return colors.reshape(frame_rows, frame_cols)
+
+
+def colorize_rows(frame_rows: list, colors: np.ndarray, color_mode: str) -> list:
+    # Rows with escape codes for printing without a renderer, every row ends in the default color
+    sgr_writer = SgrWriter(color_mode)
+    frame_cols = len(frame_rows[0]) if frame_rows else 0
+    color_keys = get_color_keys(colors, color_mode)
+
+    return [
+        sgr_writer.write_cells(row, color_keys[row_index * frame_cols:(row_index + 1) * frame_cols]) + sgr_writer.reset()
+        for row_index, row in enumerate(frame_rows)
+    ]
+
+
+def _get_cube_tables() -> tuple:
+    global _cube_tables
+
+    if _cube_tables is None:
+        cube_levels = np.array(ANSI_CUBE_LEVELS, dtype=np.int32)
+        cube_index_lut = np.argmin(
+            np.abs(np.arange(256, dtype=np.int32)[:, None] - cube_levels[None, :]),
+            axis=1
+        ).astype(np.int32)
+        _cube_tables = (cube_levels, cube_index_lut)
+
+    return _cube_tables
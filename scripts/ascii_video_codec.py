@@ -0,0 +1,288 @@
+from __future__ import annotations
+from typing import Callable
+from scripts.lazy_import import lazy_import
+
+np = lazy_import('numpy')
+
+
+ENCODING_FULL = 'full'
+ENCODING_DELTA = 'delta'
+
+DEFAULT_KEYFRAME_INTERVAL = 48
+
+# Frames changing more than this are stored as keyframes (scene cuts)
+DEFAULT_KEYFRAME_CHANGE_RATIO = 0.4
+
+# Changed runs closer than this many cells are merged, a run header costs about as much
+RUN_MERGE_GAP = 8
+
+
+class DeltaFrameEncoder:
+    def __init__(
+            self,
+            keyframe_interval: int = DEFAULT_KEYFRAME_INTERVAL,
+            keyframe_change_ratio: float = DEFAULT_KEYFRAME_CHANGE_RATIO
+        ) -> None:
+
+        self._keyframe_interval = max(1, keyframe_interval)
+        self._keyframe_change_ratio = keyframe_change_ratio
+
+        self._previous_frame = None
+        self._frames_since_keyframe = 0
+
+    def encode(self, frame: bytes) -> tuple:
+        # Returns (is keyframe, [(cell offset, changed cells)], change ratio)
+        if self._previous_frame is None or len(frame) != len(self._previous_frame):
+            return self._encode_keyframe(frame, 1.0)
+
+        runs, change_ratio = find_changed_runs(self._previous_frame, frame)
+
+        if self._frames_since_keyframe + 1 >= self._keyframe_interval or change_ratio > self._keyframe_change_ratio:
+            return self._encode_keyframe(frame, change_ratio)
+
+        self._previous_frame = frame
+        self._frames_since_keyframe += 1
+
+        return False, [(start, frame[start:end]) for start, end in runs], change_ratio
+
+    def _encode_keyframe(self, frame: bytes, change_ratio: float) -> tuple:
+        self._previous_frame = frame
+        self._frames_since_keyframe = 0
+
+        return True, [(0, frame)], change_ratio
+
+
+class DeltaFrameDecoder:
+    def __init__(self, get_record: Callable[[int], tuple], is_keyframe: Callable[[int], bool]) -> None:
+        # get_record returns the (is keyframe, runs) record of a frame number
+        self._get_record = get_record
+        self._is_keyframe = is_keyframe
+
+        self._decoded_number = None
+        self._decoded_frame = None
+
+    def decode(self, frame_number: int) -> bytes:
+        if self._decoded_number is not None and self._decoded_number == frame_number:
+            return bytes(self._decoded_frame)
+
+        # Start from the last decoded frame when it lies between the keyframe and the wanted frame
+        keyframe_number = self._find_keyframe(frame_number)
+        if self._decoded_number is not None and keyframe_number <= self._decoded_number < frame_number:
+            start_number = self._decoded_number + 1
+        else:
+            start_number = keyframe_number
+
+        for decode_number in range(start_number, frame_number + 1):
+            is_keyframe, runs = self._get_record(decode_number)
+
+            if is_keyframe:
+                self._decoded_frame = bytearray(runs[0][1])
+                continue
+
+            for start, cells in runs:
+                self._decoded_frame[start:start + len(cells)] = cells
+
+        self._decoded_number = frame_number
+
+        return bytes(self._decoded_frame)
+
+    def _find_keyframe(self, frame_number: int) -> int:
+        while not self._is_keyframe(frame_number):
+            frame_number -= 1
+
+        return frame_number
+
+
+class DeltaFrames:
+    def __init__(self, frames: object, frame_cols: int) -> None:
+        # Wraps a delta encoded .json/.pkl frames dict, keyframes are row lists and delta frames dicts
+        self._frames = frames
+        self._frame_cols = frame_cols
+        self._decoder = DeltaFrameDecoder(self._get_record, self._is_keyframe)
+
+        # Last read frame value, lazy sources parse a frame on every read
+        self._value_number = None
+        self._value = None
+
+    def __contains__(self, frame_key: object) -> bool:
+        return str(frame_key) in self._frames
+
+    def __getitem__(self, frame_key: object) -> list:
+        # Keyframes need no decoding, references are resolved by ReferenceFrames
+        frame_value = self._get_value(int(frame_key))
+        if isinstance(frame_value, (list, int)):
+            return frame_value
+
+        frame_data = self._decoder.decode(int(frame_key)).decode('ascii')
+
+        return [frame_data[i:i + self._frame_cols] for i in range(0, len(frame_data), self._frame_cols)]
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def __iter__(self):
+        return iter(self._frames)
+
+    def keys(self):
+        return self._frames.keys()
+
+    def close(self) -> None:
+        if hasattr(self._frames, 'close'):
+            self._frames.close()
+
+    def _get_value(self, frame_number: int) -> object:
+        if self._value_number != frame_number:
+            self._value = self._frames[str(frame_number)]
+            self._value_number = frame_number
+
+        return self._value
+
+    def _is_keyframe(self, frame_number: int) -> bool:
+        return isinstance(self._get_value(frame_number), list)
+
+    def _get_record(self, frame_number: int) -> tuple:
+        frame_value = self._get_value(frame_number)
+
+        if isinstance(frame_value, list):
+            return True, [(0, ''.join(frame_value).encode('ascii'))]
+
+        # References repeat the previous stored frame, nothing changes
+        if isinstance(frame_value, int):
+            return False, []
+
+        return False, [(start, cells.encode('ascii')) for start, cells in frame_value['delta']]
+
+
+class ReferenceFrames:
+    def __init__(self, frames: object, get_reference: Callable[[object], int]) -> None:
+        # Duplicate frames are stored as the number of an earlier frame, get_reference returns it or None
+        self._frames = frames
+        self._get_reference = get_reference
+
+        # Last read frame, runs of duplicates return the same object instead of reading it again
+        self._frame_number = None
+        self._frame_data = None
+
+    def __contains__(self, frame_key: object) -> bool:
+        return frame_key in self._frames
+
+    def __getitem__(self, frame_key: object) -> object:
+        frame_number = self._get_reference(frame_key) or int(frame_key)
+
+        if self._frame_number != frame_number:
+            self._frame_data = self._frames[str(frame_number)]
+            self._frame_number = frame_number
+
+        return self._frame_data
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def __iter__(self):
+        return iter(self._frames)
+
+    def keys(self):
+        return self._frames.keys()
+
+    def close(self) -> None:
+        if hasattr(self._frames, 'close'):
+            self._frames.close()
+
+
+def find_changed_runs(previous_frame: bytes, frame: bytes, merge_gap: int = RUN_MERGE_GAP) -> tuple:
+    previous_cells = np.frombuffer(previous_frame, dtype=np.uint8)
+    cells = np.frombuffer(frame, dtype=np.uint8)
+
+    changed_cells = np.flatnonzero(previous_cells != cells)
+    change_ratio = len(changed_cells) / max(1, len(cells))
+
+    return find_runs(changed_cells, merge_gap), change_ratio
+
+
+def find_runs(changed_cells: np.ndarray, merge_gap: int = RUN_MERGE_GAP) -> list:
+    # Sorted changed cell offsets -> (start, end) runs
+    if len(changed_cells) == 0:
+        return []
+
+    # Split the changed cells into runs wherever the gap between them is too big to merge
+    breaks = np.flatnonzero(np.diff(changed_cells) > merge_gap + 1)
+    starts = changed_cells[np.concatenate(([0], breaks + 1))]
+    ends = changed_cells[np.concatenate((breaks, [len(changed_cells) - 1]))] + 1
+
+    return list(zip(starts.tolist(), ends.tolist()))
+
+
+def delta_encode_frames(
+        frames: dict,
+        keyframe_interval: int = DEFAULT_KEYFRAME_INTERVAL,
+        keyframe_change_ratio: float = DEFAULT_KEYFRAME_CHANGE_RATIO
+    ) -> dict:
+
+    encoder = DeltaFrameEncoder(keyframe_interval, keyframe_change_ratio)
+    encoded_frames = {}
+
+    for frame_key in sorted(frames.keys(), key=int):
+        frame_rows = frames[frame_key]
+
+        # References stay references, the chain goes on from the previous stored frame
+        if isinstance(frame_rows, int):
+            encoded_frames[frame_key] = frame_rows
+            continue
+
+        encoded_frames[frame_key] = encode_delta_frame(encoder, frame_rows)
+
+    return encoded_frames
+
+
+def encode_delta_frame(encoder: DeltaFrameEncoder, frame_rows: list) -> object:
+    # Keyframes stay row lists, other frames become an object with their changed runs
+    is_keyframe, runs, change_ratio = encoder.encode(''.join(frame_rows).encode('ascii'))
+
+    if is_keyframe:
+        return frame_rows
+
+    return {
+        'delta':    [[start, cells.decode('ascii')] for start, cells in runs],
+        'change':   round(change_ratio, 4)
+    }
+
+
+def resolve_references(frames: dict, colors: dict = None) -> dict:
+    # Delta chains skip references, so a reference has to repeat the previous stored frame
+    # References to anything else point at an equal previous frame or are stored in full
+    resolved_frames = {}
+    previous_key = None
+
+    for frame_key in sorted(frames.keys(), key=int):
+        frame_value = frames[frame_key]
+
+        if isinstance(frame_value, int):
+            target_key = str(frame_value)
+
+            if previous_key is not None and (target_key == previous_key or _frames_equal(
+                    frames, colors, target_key, previous_key)):
+                resolved_frames[frame_key] = int(previous_key)
+                continue
+
+            frame_value = frames[target_key]
+            if colors is not None:
+                colors[frame_key] = colors[target_key]
+
+        resolved_frames[frame_key] = frame_value
+        previous_key = frame_key
+
+    return resolved_frames
+
+
+def get_frame_reference(frames: object, frame_key: object) -> int:
+    # Reference of a .json/.pkl frames dict entry, None for stored frames
+    frame_value = frames[str(frame_key)]
+    return frame_value if isinstance(frame_value, int) else None
+
+
+def _frames_equal(frames: dict, colors: dict, frame_key: str, other_key: str) -> bool:
+    # Frames are row lists or glyph index arrays
+    if not np.array_equal(frames[frame_key], frames[other_key]):
+        return False
+
+    return colors is None or np.array_equal(colors[frame_key], colors[other_key])
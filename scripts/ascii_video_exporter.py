@@ -0,0 +1,387 @@
+from __future__ import annotations
+import os
+import math
+import time
+import multiprocessing as mp
+from collections import deque
+from scripts.ascii_video_loader import load_ascii_video
+from scripts.ascii_color import COLOR_NONE, COLOR_256, get_ansi256_rgb_table
+from scripts.lazy_import import lazy_import
+
+np = lazy_import('numpy')
+cv2 = lazy_import('cv2')
+Image = lazy_import('PIL.Image')
+ImageDraw = lazy_import('PIL.ImageDraw')
+ImageFont = lazy_import('PIL.ImageFont')
+
+
+EXPORT_FORMAT_MP4 = 'mp4'
+EXPORT_FORMAT_GIF = 'gif'
+
+EXPORT_FORMATS = [EXPORT_FORMAT_MP4, EXPORT_FORMAT_GIF]
+
+MP4_FOURCC = 'mp4v'
+
+# Used for outputs stored without a frame rate, same as the player
+DEFAULT_FRAME_RATE = 24
+
+DEFAULT_FONT_SIZE = 14
+
+# Monospace fonts tried in order (linux, windows, macos), the Pillow default font is the fallback
+DEFAULT_FONTS = ['DejaVuSansMono.ttf', 'consola.ttf', 'Menlo.ttc', 'cour.ttf']
+
+# Frames rendered per pool task, each task seeks once (delta frames decode from their keyframe)
+SEGMENT_FRAMES = 96
+
+# Segments waiting in or for the pool per core, bounds the rendered frames held in memory
+PENDING_SEGMENTS_PER_CORE = 2
+
+# Shorter videos are rendered in the main process, starting the pool would take longer
+MIN_PARALLEL_FRAMES = 2 * SEGMENT_FRAMES
+
+# Pool processes read their segment with a short read ahead, a long one would read past the segment
+WORKER_PREFETCH_FRAMES = 8
+
+# Frames and rasterizer of each pool process, created once by the initializer
+_worker_frames = None
+_worker_rasterizer = None
+
+
+class GlyphAtlas:
+    def __init__(self, font_path: str = None, font_size: int = DEFAULT_FONT_SIZE) -> None:
+        # Every printable ascii glyph is rendered once into a tile indexed by its byte value,
+        # a frame is the tiles of its character bytes put next to each other
+        font = _load_font(font_path, font_size)
+        printable_chars = [chr(char_byte) for char_byte in range(ord(' '), ord('~') + 1)]
+
+        ascent, descent = font.getmetrics()
+        self.cell_width = max(1, math.ceil(max(font.getlength(char) for char in printable_chars)))
+        self.cell_height = max(1, ascent + descent)
+
+        # Bytes outside of printable ascii stay blank
+        self._tiles = np.zeros((256, self.cell_height, self.cell_width), dtype=np.uint8)
+
+        for char in printable_chars:
+            tile = Image.new('L', (self.cell_width, self.cell_height), 0)
+            ImageDraw.Draw(tile).text(((self.cell_width - font.getlength(char)) / 2, 0), char, fill=255, font=font)
+            self._tiles[ord(char)] = np.asarray(tile)
+
+    def compose(self, glyph_bytes: np.ndarray) -> np.ndarray:
+        # (rows, cols) character bytes -> (rows, cell height, cols, cell width) glyph coverage
+        return self._tiles[glyph_bytes].transpose(0, 2, 1, 3)
+
+    def get_frame_size(self, frame_rows: int, frame_cols: int) -> tuple:
+        # (width, height) in pixels
+        return frame_cols * self.cell_width, frame_rows * self.cell_height
+
+
+class FrameRasterizer:
+    def __init__(self, atlas: GlyphAtlas, color_mode: str, export_format: str, frame_size: tuple) -> None:
+        # Turns frames of the loader (rows or (rows, colors) pairs) into frames of the export format:
+        # BGR arrays for cv2.VideoWriter, Pillow images for GIFs
+        self._atlas = atlas
+        self._color_mode = color_mode
+        self._export_format = export_format
+        self._frame_size = frame_size
+
+        # Glyphs are drawn in their cell color, white without colors, on black
+        self._palette = None
+        if color_mode == COLOR_256:
+            self._palette = get_ansi256_rgb_table()
+            if export_format == EXPORT_FORMAT_MP4:
+                self._palette = self._palette[:, ::-1]
+
+    def render(self, frame_data: object) -> object:
+        colors = None
+        if isinstance(frame_data, tuple):
+            frame_data, colors = frame_data
+
+        frame_rows, frame_cols = len(frame_data), len(frame_data[0])
+        glyph_bytes = np.frombuffer(''.join(frame_data).encode('ascii', errors='replace'), dtype=np.uint8)
+        coverage = self._atlas.compose(glyph_bytes.reshape(frame_rows, frame_cols))
+
+        pixel_height, pixel_width = frame_rows * self._atlas.cell_height, frame_cols * self._atlas.cell_width
+
+        if colors is None or self._color_mode == COLOR_NONE:
+            pixels = coverage.reshape(pixel_height, pixel_width)
+        else:
+            cell_colors = self._get_cell_colors(colors)
+
+            # Every glyph pixel scales the color of its cell, broadcast over the cell height and width
+            pixels = (coverage[..., None].astype(np.uint16) * cell_colors[:, None, :, None, :] + 127) // 255
+            pixels = pixels.astype(np.uint8).reshape(pixel_height, pixel_width, 3)
+
+        if self._export_format == EXPORT_FORMAT_GIF:
+            return self._to_gif_frame(pixels)
+
+        return self._to_video_frame(pixels)
+
+    def _get_cell_colors(self, colors: np.ndarray) -> np.ndarray:
+        # (rows, cols, 3) channels in the channel order of the export format
+        if self._palette is not None:
+            return self._palette[colors]
+
+        if self._export_format == EXPORT_FORMAT_MP4:
+            return colors[..., ::-1]
+
+        return colors
+
+    def _to_video_frame(self, pixels: np.ndarray) -> np.ndarray:
+        if pixels.ndim == 2:
+            pixels = cv2.cvtColor(pixels, cv2.COLOR_GRAY2BGR)
+
+        # Frames are padded to the writer size (codecs need even sizes)
+        frame_width, frame_height = self._frame_size
+        if pixels.shape[:2] != (frame_height, frame_width):
+            pixels = cv2.copyMakeBorder(
+                pixels, 0, frame_height - pixels.shape[0], 0, frame_width - pixels.shape[1], cv2.BORDER_CONSTANT, value=0
+            )
+
+        return pixels
+
+    def _to_gif_frame(self, pixels: np.ndarray) -> Image.Image:
+        if pixels.ndim == 2:
+            return Image.fromarray(pixels, 'L')
+
+        # GIF frames hold up to 256 colors, picked per frame
+        return Image.fromarray(pixels, 'RGB').quantize(256, method=Image.Quantize.FASTOCTREE)
+
+
+class AsciiVideoExporter:
+    def __init__(
+            self,
+            num_cores: int = 1,
+            font_path: str = None,
+            font_size: int = DEFAULT_FONT_SIZE,
+            speed: float = 1.0
+        ) -> None:
+
+        self._num_cores = max(1, min(int(num_cores), os.cpu_count()))
+        self._font_path = font_path
+        self._font_size = font_size
+        self._speed = speed
+
+        self._stats = {}
+
+    def export(self, input_path: str, output_path: str) -> str:
+        # Renders a .json/.pkl/.ascv ascii video to an .mp4 or .gif, the format follows the output extension
+        export_format = get_export_format(output_path)
+        export_start = time.time()
+
+        input_data = load_ascii_video(input_path)
+        frames = input_data['frames']
+        first_frame = input_data['first_frame']
+        color_mode = input_data.get('color_mode', COLOR_NONE)
+        frame_rate = (input_data['fps'] or DEFAULT_FRAME_RATE) * self._speed
+
+        first_frame_data = frames[str(first_frame)]
+        if isinstance(first_frame_data, tuple):
+            first_frame_data = first_frame_data[0]
+        frame_rows, frame_cols = len(first_frame_data), len(first_frame_data[0])
+
+        atlas = GlyphAtlas(self._font_path, self._font_size)
+        frame_size = _get_output_size(*atlas.get_frame_size(frame_rows, frame_cols), export_format)
+
+        # Lazy sources have no frame count, a frame far enough in is enough to know the video is long
+        use_pool = self._num_cores > 1 and str(first_frame + MIN_PARALLEL_FRAMES - 1) in frames
+
+        if use_pool:
+            # Every pool process opens the input itself, only the rendered frames come back
+            frames.close()
+            rendered_frames = self._render_parallel(input_path, first_frame, color_mode, export_format, frame_size)
+        else:
+            rasterizer = FrameRasterizer(atlas, color_mode, export_format, frame_size)
+            rendered_frames = self._render_sequential(frames, rasterizer, first_frame)
+
+        try:
+            if export_format == EXPORT_FORMAT_GIF:
+                written_frames = _write_gif(output_path, rendered_frames, frame_rate)
+            else:
+                written_frames = _write_video(output_path, rendered_frames, frame_rate, frame_size)
+        finally:
+            if not use_pool:
+                frames.close()
+
+        self._stats = {
+            'frames':       written_frames,
+            'frame_size':   frame_size,
+            'cell_size':    (atlas.cell_width, atlas.cell_height),
+            'cores':        self._num_cores if use_pool else 1,
+            'export_time':  time.time() - export_start
+        }
+
+        return output_path
+
+    def get_stats(self) -> dict:
+        # Frames written, output (width, height), glyph cell (width, height), cores used and seconds of the last export
+        return self._stats
+
+    def _render_sequential(self, frames: object, rasterizer: FrameRasterizer, first_frame: int) -> object:
+        segment_start = first_frame
+
+        while True:
+            rendered_segment, reached_end = _render_segment(frames, rasterizer, segment_start, segment_start + SEGMENT_FRAMES)
+            yield from rendered_segment
+
+            if reached_end:
+                return
+
+            segment_start += SEGMENT_FRAMES
+
+    def _render_parallel(
+            self,
+            input_path: str,
+            first_frame: int,
+            color_mode: str,
+            export_format: str,
+            frame_size: tuple
+        ) -> object:
+
+        pool = mp.Pool(
+            self._num_cores,
+            initializer=_init_worker,
+            initargs=(input_path, self._font_path, self._font_size, color_mode, export_format, frame_size)
+        )
+
+        pending_segments = deque()
+        next_start = first_frame
+        reached_end = False
+
+        try:
+            while True:
+                # Segments are taken in order, the oldest one is waited for before more are sent
+                while not reached_end and len(pending_segments) < self._num_cores * PENDING_SEGMENTS_PER_CORE:
+                    pending_segments.append(pool.apply_async(_render_worker_segment, (next_start, next_start + SEGMENT_FRAMES)))
+                    next_start += SEGMENT_FRAMES
+
+                if not pending_segments:
+                    return
+
+                rendered_segment, segment_end = pending_segments.popleft().get()
+                yield from rendered_segment
+
+                # Segments sent after the end come back empty
+                reached_end = reached_end or segment_end
+        finally:
+            pool.terminate()
+            pool.join()
+
+
+def get_export_format(output_path: str) -> str:
+    export_format = output_path.split('.')[-1].lower()
+
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f'{os.path.basename(output_path)} is not an export format, expected .{", .".join(EXPORT_FORMATS)}')
+
+    return export_format
+
+
+def _load_font(font_path: str, font_size: int) -> ImageFont.ImageFont:
+    for font_name in ([font_path] if font_path is not None else DEFAULT_FONTS):
+        try:
+            return ImageFont.truetype(font_name, font_size)
+        except OSError:
+            if font_path is not None:
+                raise
+
+    try:
+        return ImageFont.load_default(size=font_size)
+    except TypeError:
+        # Pillow before 10.1 only has the small bitmap font
+        return ImageFont.load_default()
+
+
+def _get_output_size(frame_width: int, frame_height: int, export_format: str) -> tuple:
+    if export_format == EXPORT_FORMAT_MP4:
+        return frame_width + frame_width % 2, frame_height + frame_height % 2
+
+    return frame_width, frame_height
+
+
+def _render_segment(frames: object, rasterizer: FrameRasterizer, segment_start: int, segment_end: int) -> tuple:
+    # Rendered frames of the segment and whether the video ends in it
+    # Duplicates are read as the object of the frame they repeat, they come back as None and are not rendered again
+    rendered_segment = []
+    previous_data = None
+
+    for frame_number in range(segment_start, segment_end):
+        frame_key = str(frame_number)
+        if frame_key not in frames:
+            return rendered_segment, True
+
+        frame_data = frames[frame_key]
+        rendered_segment.append(None if frame_data is previous_data else rasterizer.render(frame_data))
+        previous_data = frame_data
+
+    return rendered_segment, False
+
+
+def _write_video(output_path: str, rendered_frames: object, frame_rate: float, frame_size: tuple) -> int:
+    writer = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*MP4_FOURCC), frame_rate, frame_size)
+    if not writer.isOpened():
+        raise RuntimeError(f'Could not open a video writer for {os.path.basename(output_path)}')
+
+    written_frames = 0
+    previous_frame = None
+
+    try:
+        for frame in rendered_frames:
+            # Duplicates repeat the last written frame
+            if frame is None:
+                frame = previous_frame
+
+            writer.write(frame)
+            previous_frame = frame
+            written_frames += 1
+    finally:
+        writer.release()
+
+    return written_frames
+
+
+def _write_gif(output_path: str, rendered_frames: object, frame_rate: float) -> int:
+    # GIFs are written at once, duplicates lengthen the frame before them instead of being stored
+    frame_duration = 1000 / frame_rate
+    gif_frames = []
+    frame_durations = []
+    written_frames = 0
+
+    for frame in rendered_frames:
+        written_frames += 1
+
+        if frame is None:
+            frame_durations[-1] += frame_duration
+            continue
+
+        gif_frames.append(frame)
+        frame_durations.append(frame_duration)
+
+    if gif_frames:
+        gif_frames[0].save(
+            output_path,
+            save_all=True,
+            append_images=gif_frames[1:],
+            duration=[round(duration) for duration in frame_durations],
+            loop=0
+        )
+
+    return written_frames
+
+
+def _init_worker(
+        input_path: str,
+        font_path: str,
+        font_size: int,
+        color_mode: str,
+        export_format: str,
+        frame_size: tuple
+    ) -> None:
+
+    global _worker_frames, _worker_rasterizer
+
+    _worker_frames = load_ascii_video(input_path, WORKER_PREFETCH_FRAMES)['frames']
+    _worker_rasterizer = FrameRasterizer(GlyphAtlas(font_path, font_size), color_mode, export_format, frame_size)
+
+
+def _render_worker_segment(segment_start: int, segment_end: int) -> tuple:
+    return _render_segment(_worker_frames, _worker_rasterizer, segment_start, segment_end)
@@ -0,0 +1,679 @@
+from __future__ import annotations
+import os
+import json
+import mmap
+import pickle
+import struct
+import zlib
+import lzma
+from collections import OrderedDict
+from scripts.ascii_video_codec import (
+    DeltaFrameEncoder,
+    DeltaFrameDecoder,
+    DeltaFrames,
+    ENCODING_FULL,
+    ENCODING_DELTA,
+    get_frame_reference
+)
+from scripts.ascii_color import (
+    ColorFrameValues,
+    COLOR_NONE,
+    COLOR_CELL_BYTES,
+    encode_colors,
+    decode_colors
+)
+
+
+# File layout:
+#   magic | version (u16) | header length (u32) | header json
+#   frame data (one glyph index byte per cell)
+#     delta encoding: record header (keyframe flag u8 + change ratio u16) followed by
+#     the raw frame for keyframes or (cell offset u32 + run length u32 + cells) runs
+#     compression: frame data is split into independently compressed chunks of
+#     chunk_frames frames, a chunk starts with the offsets of its frames (u32 each + end)
+#     colors: the cell colors of a frame (1 or 3 bytes per cell) follow its glyph data
+#   frame index (offset u64 + length u32 per frame, of its chunk when compressed)
+#     references: duplicate frames store no data, their entry holds the number of the
+#     repeated frame as the offset and REFERENCE_LENGTH as the length
+#   index offset (u64) | magic
+ASCII_VIDEO_MAGIC = b'ASCV'
+ASCII_VIDEO_VERSION = 3
+
+# Files without colors or references are still written as version 1 so older readers can play them
+ASCII_VIDEO_COLOR_VERSION = 2
+ASCII_VIDEO_REFERENCE_VERSION = 3
+ASCII_VIDEO_EXTENSION = 'ascv'
+
+PREAMBLE_STRUCT = struct.Struct('<4sHI')
+INDEX_ENTRY_STRUCT = struct.Struct('<QI')
+FOOTER_STRUCT = struct.Struct('<Q4s')
+RECORD_STRUCT = struct.Struct('<BH')
+RUN_STRUCT = struct.Struct('<II')
+
+CHANGE_RATIO_SCALE = 10000
+
+COMPRESSION_NONE = 'none'
+COMPRESSION_ZLIB = 'zlib'
+COMPRESSION_LZMA = 'lzma'
+
+COMPRESSION_TYPES = [COMPRESSION_NONE, COMPRESSION_ZLIB, COMPRESSION_LZMA]
+
+DEFAULT_COMPRESSION_LEVEL = 6
+DEFAULT_CHUNK_FRAMES = 32
+
+# Decompressed chunks kept by the reader, seeking back a few frames stays cheap
+CHUNK_CACHE_SIZE = 2
+
+CHUNK_OFFSET_STRUCT = struct.Struct('<I')
+CHUNK_SPAN_STRUCT = struct.Struct('<II')
+
+REFERENCE_LENGTH = 0xFFFFFFFF
+
+UNKNOWN_GLYPH = b'?'
+
+
+class AsciiVideoWriter:
+    def __init__(
+            self,
+            path: str,
+            fps: float,
+            resolution: float,
+            frame_rows: int,
+            frame_cols: int,
+            charset: str,
+            first_frame: int = 1,
+            keyframe_interval: int = 0,
+            compression: str = COMPRESSION_NONE,
+            compression_level: int = DEFAULT_COMPRESSION_LEVEL,
+            chunk_frames: int = DEFAULT_CHUNK_FRAMES,
+            color_mode: str = COLOR_NONE
+        ) -> None:
+
+        if compression not in COMPRESSION_TYPES:
+            raise ValueError(f'Unsupported compression {compression}')
+
+        self._header = {
+            'fps':          fps,
+            'resolution':   resolution,
+            'rows':         frame_rows,
+            'cols':         frame_cols,
+            'charset':      charset,
+            'first_frame':  first_frame,
+            'encoding':     ENCODING_DELTA if keyframe_interval > 0 else ENCODING_FULL,
+            'compression':  compression
+        }
+
+        # Frames are collected into chunks and compressed together
+        self._compression = compression
+        self._compression_level = compression_level
+        self._chunk_frames = max(1, chunk_frames)
+        self._chunk = []
+        self._chunk_references = []
+        if compression != COMPRESSION_NONE:
+            self._header['compression_level'] = compression_level
+            self._header['chunk_frames'] = self._chunk_frames
+
+        self._raw_bytes = 0
+        self._stored_bytes = 0
+
+        # Frames are delta encoded against the previous one when a keyframe interval is set
+        self._encoder = None
+        if keyframe_interval > 0:
+            self._header['keyframe_interval'] = keyframe_interval
+            self._encoder = DeltaFrameEncoder(keyframe_interval)
+
+        self._color_mode = color_mode
+        if color_mode != COLOR_NONE:
+            self._header['color_mode'] = color_mode
+
+        # Char byte -> glyph index table for frames passed in as row strings
+        self._charset_bytes = charset.encode('ascii')
+        self._encode_table = _create_encode_table(charset)
+
+        self._index = []
+        self._has_references = False
+
+        # The index holds no frame numbers, frame N is entry N - first_frame
+        self._next_number = first_frame
+
+        self._path = path
+        self._file = open(path, 'wb')
+        try:
+            self._write_header()
+        except BaseException:
+            self.discard()
+            raise
+
+    def __enter__(self) -> AsciiVideoWriter:
+        return self
+
+    def __exit__(self, exc_type: type, *exc_info: object) -> None:
+        # A file without its index and footer can not be read, it is removed when writing failed
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+    def write_frame(self, glyph_indices: bytes, colors: bytes = None, frame_number: int = None) -> None:
+        # Frame numbers are optional, passed ones are checked against the position in the index
+        self._check_frame_number(frame_number)
+        frame_data = bytes(glyph_indices)
+
+        if self._encoder is not None:
+            frame_data = self._encode_record(frame_data)
+
+        # Colors are stored whole, compression takes care of repeated ones
+        if self._color_mode != COLOR_NONE:
+            frame_data += bytes(colors)
+
+        self._raw_bytes += len(frame_data)
+
+        if self._compression != COMPRESSION_NONE:
+            self._chunk.append(frame_data)
+            self._chunk_references.append(None)
+            if len(self._chunk) >= self._chunk_frames:
+                self._write_chunk()
+            return
+
+        self._index.append((self._file.tell(), len(frame_data)))
+        self._file.write(frame_data)
+        self._stored_bytes += len(frame_data)
+
+    def write_rows(self, frame_rows: list, colors: bytes = None, frame_number: int = None) -> None:
+        frame_bytes = ''.join(frame_rows).encode('ascii')
+
+        # Chars outside of the charset have no glyph index, they would be stored as the first glyph
+        unknown_bytes = frame_bytes.translate(None, self._charset_bytes)
+        if unknown_bytes:
+            unknown_chars = ''.join(sorted(set(unknown_bytes.decode('ascii'))))
+            raise ValueError(f'Frame holds characters that are not in the charset: {unknown_chars!r}')
+
+        self.write_frame(frame_bytes.translate(self._encode_table), colors, frame_number)
+
+    def write_reference(self, reference_number: int, frame_number: int = None) -> None:
+        # Duplicate of an earlier frame, with delta encoding it has to be the previous written one
+        self._check_frame_number(frame_number)
+        self._has_references = True
+
+        if self._compression != COMPRESSION_NONE:
+            # Takes an empty slot in the chunk so the frame positions inside chunks stay the same
+            self._chunk.append(b'')
+            self._chunk_references.append(reference_number)
+            if len(self._chunk) >= self._chunk_frames:
+                self._write_chunk()
+            return
+
+        self._index.append((reference_number, REFERENCE_LENGTH))
+
+    def get_compression_ratio(self) -> float:
+        return self._raw_bytes / max(1, self._stored_bytes)
+
+    def close(self) -> None:
+        if self._file.closed:
+            return
+
+        try:
+            if self._chunk:
+                self._write_chunk()
+
+            index_offset = self._file.tell()
+
+            for entry in self._index:
+                self._file.write(INDEX_ENTRY_STRUCT.pack(*entry))
+
+            self._file.write(FOOTER_STRUCT.pack(index_offset, ASCII_VIDEO_MAGIC))
+
+            # Older readers can not resolve references, the version is raised once the first one was written
+            if self._has_references:
+                self._file.seek(0)
+                self._file.write(PREAMBLE_STRUCT.pack(ASCII_VIDEO_MAGIC, ASCII_VIDEO_REFERENCE_VERSION, self._header_length))
+        except BaseException:
+            self.discard()
+            raise
+
+        self._file.close()
+
+    def discard(self) -> None:
+        # Closes the file without finishing it and removes what was written, finished files are kept
+        if self._file.closed:
+            return
+
+        self._file.close()
+        os.remove(self._path)
+
+    def _check_frame_number(self, frame_number: int = None) -> None:
+        # A skipped frame would shift every later frame to the number before it
+        if frame_number is not None and frame_number != self._next_number:
+            raise ValueError(
+                f'Frame {frame_number} was written where frame {self._next_number} belongs, '
+                f'.{ASCII_VIDEO_EXTENSION} files can not skip frames'
+            )
+
+        self._next_number += 1
+
+    def _encode_record(self, frame_data: bytes) -> bytes:
+        is_keyframe, runs, change_ratio = self._encoder.encode(frame_data)
+        record = [RECORD_STRUCT.pack(is_keyframe, round(change_ratio * CHANGE_RATIO_SCALE))]
+
+        if is_keyframe:
+            record.append(frame_data)
+        else:
+            for start, cells in runs:
+                record.append(RUN_STRUCT.pack(start, len(cells)))
+                record.append(cells)
+
+        return b''.join(record)
+
+    def _write_chunk(self) -> None:
+        # Frame offsets inside the chunk come first so single frames can be sliced out
+        chunk_offsets = [0]
+        for frame_data in self._chunk:
+            chunk_offsets.append(chunk_offsets[-1] + len(frame_data))
+
+        offsets_size = len(chunk_offsets) * CHUNK_OFFSET_STRUCT.size
+        chunk_data = b''.join([
+            *[CHUNK_OFFSET_STRUCT.pack(offsets_size + offset) for offset in chunk_offsets],
+            *self._chunk
+        ])
+        compressed_chunk = _compress(chunk_data, self._compression, self._compression_level)
+
+        chunk_offset = self._file.tell()
+        self._file.write(compressed_chunk)
+        self._stored_bytes += len(compressed_chunk)
+
+        # Every frame of the chunk points at the whole chunk
+        self._index.extend([
+            (chunk_offset, len(compressed_chunk)) if reference is None else (reference, REFERENCE_LENGTH)
+            for reference in self._chunk_references
+        ])
+        self._chunk = []
+        self._chunk_references = []
+
+    def _write_header(self) -> None:
+        header_data = json.dumps(self._header).encode('utf-8')
+        self._header_length = len(header_data)
+
+        version = ASCII_VIDEO_COLOR_VERSION if self._color_mode != COLOR_NONE else 1
+        self._file.write(PREAMBLE_STRUCT.pack(ASCII_VIDEO_MAGIC, version, len(header_data)))
+        self._file.write(header_data)
+
+
+class AsciiVideoReader:
+    def __init__(self, path: str) -> None:
+        self._file = open(path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, header_length = PREAMBLE_STRUCT.unpack_from(self._mmap, 0)
+        if magic != ASCII_VIDEO_MAGIC or version > ASCII_VIDEO_VERSION:
+            self.close()
+            raise ValueError(f'{os.path.basename(path)} is not a supported ascii video file')
+
+        header_start = PREAMBLE_STRUCT.size
+        self._header = json.loads(self._mmap[header_start:header_start + header_length])
+
+        # The index sits between the frame data and the footer
+        footer_offset = len(self._mmap) - FOOTER_STRUCT.size
+        self._index_offset, _ = FOOTER_STRUCT.unpack_from(self._mmap, footer_offset)
+        self._frame_count = (footer_offset - self._index_offset) // INDEX_ENTRY_STRUCT.size
+
+        # Glyph index byte -> char byte table
+        self._decode_table = _create_decode_table(self.charset)
+
+        # Decompressed chunks by file offset
+        self._compression = self._header.get('compression', COMPRESSION_NONE)
+        self._chunk_cache = OrderedDict()
+
+        # Size of the colors at the end of every frame
+        self._color_size = 0
+        if self.color_mode != COLOR_NONE:
+            self._color_size = self.rows * self.cols * COLOR_CELL_BYTES[self.color_mode]
+
+        self._delta_decoder = None
+        if self._header.get('encoding', ENCODING_FULL) == ENCODING_DELTA:
+            self._delta_decoder = DeltaFrameDecoder(self._get_record, self._is_keyframe)
+
+    def __contains__(self, frame_key: object) -> bool:
+        try:
+            frame_number = int(frame_key)
+        except (TypeError, ValueError):
+            return False
+
+        return self.first_frame <= frame_number < self.first_frame + self.frame_count
+
+    def __getitem__(self, frame_key: object) -> list:
+        frame_data = self.get_glyph_indices(frame_key).tobytes().translate(self._decode_table).decode('ascii')
+        return [frame_data[i:i + self.cols] for i in range(0, len(frame_data), self.cols)]
+
+    def __len__(self) -> int:
+        return self.frame_count
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def keys(self) -> list:
+        return [str(frame_number) for frame_number in range(self.first_frame, self.first_frame + self.frame_count)]
+
+    def get_glyph_indices(self, frame_key: object) -> memoryview:
+        if frame_key not in self:
+            raise KeyError(frame_key)
+
+        frame_number = self._resolve_reference(int(frame_key))
+
+        if self._delta_decoder is not None:
+            return memoryview(self._delta_decoder.decode(frame_number))
+
+        return self._get_glyph_data(frame_number)
+
+    def get_colors(self, frame_key: object) -> object:
+        if frame_key not in self:
+            raise KeyError(frame_key)
+
+        frame_data = self._get_frame_data(self._resolve_reference(int(frame_key)))
+        return decode_colors(bytes(frame_data[len(frame_data) - self._color_size:]), self.rows, self.cols, self.color_mode)
+
+    def get_change_ratio(self, frame_key: object) -> float:
+        # Only delta encoded files record the change ratio, full frames count as fully changed
+        if self._delta_decoder is None:
+            return 1.0
+
+        # References repeat a frame, nothing changes
+        if self.get_reference(frame_key) is not None:
+            return 0.0
+
+        _, change_ratio = RECORD_STRUCT.unpack_from(self._get_glyph_data(int(frame_key)))
+        return change_ratio / CHANGE_RATIO_SCALE
+
+    def get_reference(self, frame_key: object) -> int:
+        # Number of the frame a duplicate repeats, None for stored frames
+        frame_offset, frame_length = self._get_index_entry(int(frame_key))
+        return frame_offset if frame_length == REFERENCE_LENGTH else None
+
+    def close(self) -> None:
+        self._mmap.close()
+        self._file.close()
+
+    @property
+    def fps(self) -> float:
+        return self._header['fps']
+
+    @property
+    def resolution(self) -> float:
+        return self._header['resolution']
+
+    @property
+    def rows(self) -> int:
+        return self._header['rows']
+
+    @property
+    def cols(self) -> int:
+        return self._header['cols']
+
+    @property
+    def charset(self) -> str:
+        return self._header['charset']
+
+    @property
+    def first_frame(self) -> int:
+        return self._header['first_frame']
+
+    @property
+    def color_mode(self) -> str:
+        return self._header.get('color_mode', COLOR_NONE)
+
+    @property
+    def frame_count(self) -> int:
+        return self._frame_count
+
+    def _get_index_entry(self, frame_number: int) -> tuple:
+        entry_offset = self._index_offset + (frame_number - self.first_frame) * INDEX_ENTRY_STRUCT.size
+        return INDEX_ENTRY_STRUCT.unpack_from(self._mmap, entry_offset)
+
+    def _resolve_reference(self, frame_number: int) -> int:
+        return self.get_reference(frame_number) or frame_number
+
+    def _get_frame_data(self, frame_number: int) -> memoryview:
+        # O(1) seek through the index, the frame itself is a view into the mmap
+        frame_offset, frame_length = self._get_index_entry(frame_number)
+
+        if self._compression == COMPRESSION_NONE:
+            return memoryview(self._mmap)[frame_offset:frame_offset + frame_length]
+
+        # Chunks hold chunk_frames frames each, only the one holding this frame is decompressed
+        chunk = self._get_chunk(frame_offset, frame_length)
+        chunk_index = (frame_number - self.first_frame) % self._header['chunk_frames']
+        start, end = CHUNK_SPAN_STRUCT.unpack_from(chunk, chunk_index * CHUNK_OFFSET_STRUCT.size)
+
+        return memoryview(chunk)[start:end]
+
+    def _get_glyph_data(self, frame_number: int) -> memoryview:
+        frame_data = self._get_frame_data(frame_number)
+        return frame_data[:len(frame_data) - self._color_size]
+
+    def _get_chunk(self, chunk_offset: int, chunk_length: int) -> bytes:
+        if chunk_offset in self._chunk_cache:
+            self._chunk_cache.move_to_end(chunk_offset)
+            return self._chunk_cache[chunk_offset]
+
+        chunk = _decompress(self._mmap[chunk_offset:chunk_offset + chunk_length], self._compression)
+
+        self._chunk_cache[chunk_offset] = chunk
+        if len(self._chunk_cache) > CHUNK_CACHE_SIZE:
+            self._chunk_cache.popitem(last=False)
+
+        return chunk
+
+    def _is_keyframe(self, frame_number: int) -> bool:
+        if self.get_reference(frame_number) is not None:
+            return False
+
+        return self._get_glyph_data(frame_number)[0] == 1
+
+    def _get_record(self, frame_number: int) -> tuple:
+        # References repeat the previous stored frame, nothing changes
+        if self.get_reference(frame_number) is not None:
+            return False, []
+
+        record = self._get_glyph_data(frame_number)
+        is_keyframe, _ = RECORD_STRUCT.unpack_from(record)
+
+        if is_keyframe:
+            return True, [(0, record[RECORD_STRUCT.size:])]
+
+        runs = []
+        offset = RECORD_STRUCT.size
+        while offset < len(record):
+            start, run_length = RUN_STRUCT.unpack_from(record, offset)
+            offset += RUN_STRUCT.size
+            runs.append((start, record[offset:offset + run_length]))
+            offset += run_length
+
+        return False, runs
+
+
+def is_ascii_video_file(path: str) -> bool:
+    return path.endswith(f'.{ASCII_VIDEO_EXTENSION}')
+
+
+def convert_to_ascii_video_file(
+        input_path: str,
+        output_path: str,
+        charset: str,
+        keyframe_interval: int = 0,
+        compression: str = COMPRESSION_NONE,
+        compression_level: int = DEFAULT_COMPRESSION_LEVEL
+    ) -> str:
+
+    # Files written with their charset use it, the passed one is for files from before charsets were stored
+    input_data = _load_legacy_file(input_path)
+    frame_keys = sorted(input_data['frames'].keys(), key=int)
+    if not frame_keys:
+        raise ValueError(f'{os.path.basename(input_path)} holds no frames')
+    check_contiguous_frames(frame_keys)
+
+    # Colored frames keep their colors next to the rows
+    color_mode = input_data.get('color_mode', COLOR_NONE)
+    color_values = None
+    if color_mode != COLOR_NONE:
+        color_values = ColorFrameValues(input_data['frames'])
+        input_data['frames'] = color_values
+
+    first_rows = input_data['frames'][frame_keys[0]]
+
+    # Delta encoded input frames are decoded before being written again
+    input_frames = input_data['frames']
+    if input_data.get('encoding', ENCODING_FULL) == ENCODING_DELTA:
+        input_frames = DeltaFrames(input_frames, len(first_rows[0]))
+
+    if 'charset' not in input_data:
+        charset = _get_legacy_charset(input_data['frames'], input_frames, frame_keys, charset)
+
+    raw_frames = input_data['frames']
+    previous_key = None
+
+    with AsciiVideoWriter(
+        output_path,
+        input_data['fps'],
+        input_data.get('resolution', 1.0),
+        len(first_rows),
+        len(first_rows[0]),
+        input_data.get('charset', charset),
+        int(frame_keys[0]),
+        keyframe_interval,
+        compression,
+        compression_level,
+        color_mode=color_mode
+    ) as writer:
+        for frame_key in frame_keys:
+            frame_number = int(frame_key)
+
+            # Delta chains skip references, those of delta output have to repeat the previous written frame
+            reference = get_frame_reference(raw_frames, frame_key)
+            if reference is not None and (keyframe_interval <= 0 or str(reference) == previous_key):
+                writer.write_reference(reference, frame_number)
+                continue
+
+            if reference is not None:
+                frame_key = str(reference)
+            else:
+                previous_key = frame_key
+
+            colors = None
+            if color_values is not None:
+                colors = decode_colors(color_values.get_colors(frame_key), len(first_rows), len(first_rows[0]), color_mode)
+
+            writer.write_rows(input_frames[frame_key], colors, frame_number)
+
+    return output_path
+
+
+def check_contiguous_frames(frame_keys: list) -> None:
+    # Sorted frame keys, .ascv files number their frames by index position and can not hold gaps
+    if not frame_keys:
+        return
+
+    first_number, last_number = int(frame_keys[0]), int(frame_keys[-1])
+    if last_number - first_number + 1 == len(frame_keys):
+        return
+
+    frame_numbers = set(int(frame_key) for frame_key in frame_keys)
+    missing_numbers = [number for number in range(first_number, last_number + 1) if number not in frame_numbers]
+
+    raise ValueError(
+        f'Missing frames {", ".join(str(number) for number in missing_numbers[:10])}{" ..." if len(missing_numbers) > 10 else ""}, '
+        f'.{ASCII_VIDEO_EXTENSION} files can not skip frames'
+    )
+
+
+def convert_from_ascii_video_file(input_path: str, output_path: str) -> str:
+    reader = AsciiVideoReader(input_path)
+
+    output = {
+        'fps':          reader.fps,
+        'resolution':   reader.resolution,
+        'color_mode':   reader.color_mode,
+        'charset':      reader.charset,
+        'frames':       {
+            frame_key: reader.get_reference(frame_key) or reader[frame_key] for frame_key in reader.keys()
+        }
+    }
+
+    if reader.color_mode != COLOR_NONE:
+        output['frames'] = {
+            frame_key: frame_rows if isinstance(frame_rows, int) else {
+                'rows':     frame_rows,
+                'colors':   encode_colors(reader.get_colors(frame_key))
+            }
+            for frame_key, frame_rows in output['frames'].items()
+        }
+
+    reader.close()
+
+    if output_path.endswith('.json'):
+        with open(output_path, 'w') as json_file:
+            json.dump(output, json_file)
+
+    if output_path.endswith('.pkl'):
+        with open(output_path, 'wb') as pkl_file:
+            pickle.dump(output, pkl_file)
+
+    return output_path
+
+
+def _load_legacy_file(path: str) -> dict:
+    if path.endswith('.json'):
+        with open(path, 'r') as json_file:
+            return json.load(json_file)
+
+    if path.endswith('.pkl'):
+        with open(path, 'rb') as pkl_file:
+            return pickle.load(pkl_file)
+
+    raise ValueError(f'{os.path.basename(path)} is not a .json or .pkl ascii video')
+
+
+def _get_legacy_charset(raw_frames: object, input_frames: object, frame_keys: list, charset: str) -> str:
+    # Files from before charsets were stored may use other glyphs than the passed charset,
+    # those are added after it so the glyph indices of the charset stay the same
+    used_chars = set()
+    for frame_key in frame_keys:
+        if get_frame_reference(raw_frames, frame_key) is None:
+            used_chars.update(''.join(input_frames[frame_key]))
+
+    missing_chars = ''.join(sorted(used_chars - set(charset)))
+    if len(charset) + len(missing_chars) > 256:
+        raise ValueError(f'Frames use {len(used_chars | set(charset))} different characters, a charset holds up to 256')
+
+    return charset + missing_chars
+
+
+def _compress(data: bytes, compression: str, compression_level: int) -> bytes:
+    if compression == COMPRESSION_ZLIB:
+        return zlib.compress(data, compression_level)
+
+    if compression == COMPRESSION_LZMA:
+        return lzma.compress(data, preset=compression_level)
+
+    return data
+
+
+def _decompress(data: bytes, compression: str) -> bytes:
+    if compression == COMPRESSION_ZLIB:
+        return zlib.decompress(data)
+
+    if compression == COMPRESSION_LZMA:
+        return lzma.decompress(data)
+
+    return data
+
+
+def _create_encode_table(charset: str) -> bytes:
+    encode_table = bytearray(256)
+    for glyph_index, char_byte in enumerate(charset.encode('ascii')):
+        encode_table[char_byte] = glyph_index
+
+    return bytes(encode_table)
+
+
+def _create_decode_table(charset: str) -> bytes:
+    charset_bytes = charset.encode('ascii')
+    return charset_bytes + UNKNOWN_GLYPH * (256 - len(charset_bytes))
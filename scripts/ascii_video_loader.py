@@ -0,0 +1,279 @@
+import os
+import re
+import json
+import mmap
+import pickle
+import threading
+from scripts.ascii_video_file import AsciiVideoReader, is_ascii_video_file
+from scripts.ascii_video_codec import DeltaFrames, ReferenceFrames, ENCODING_FULL, ENCODING_DELTA, get_frame_reference
+from scripts.ascii_color import ColorFrameValues, ColorFrames, COLOR_NONE, decode_colors
+
+
+DEFAULT_PREFETCH_FRAMES = 48
+
+# Frame keys are the only quoted numbers followed by a colon, quotes inside row strings are escaped
+# Values are rows, objects (delta/colored frames) or the number of the frame a duplicate repeats
+JSON_FRAME_KEY_PATTERN = re.compile(rb'"(\d+)": [\[{\d]')
+JSON_FRAMES_KEY = b'"frames": {'
+
+# Scanned frames between wake ups of readers waiting for the index
+JSON_INDEX_NOTIFY_INTERVAL = 16
+
+
+class LazyJsonFrames:
+    def __init__(self, path: str) -> None:
+        self._file = open(path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._decoder = json.JSONDecoder()
+
+        # Everything before the frames is small, parse it right away
+        self._frames_start = self._mmap.find(JSON_FRAMES_KEY)
+        if self._frames_start < 0:
+            self.close()
+            raise ValueError(f'{os.path.basename(path)} has no frames')
+
+        self._header = json.loads(self._mmap[:self._frames_start] + b'"frames": {}}')
+
+        # Frame number -> file offset of its value, filled by the scan thread
+        self._offsets = {}
+        self._next_offsets = {}
+        self._scanned = False
+        self._index_condition = threading.Condition()
+
+        self._scan_thread = threading.Thread(target=self._scan_frames, daemon=True)
+        self._scan_thread.start()
+
+    def __contains__(self, frame_key: object) -> bool:
+        return self._wait_for_frame(int(frame_key))
+
+    def __getitem__(self, frame_key: object) -> object:
+        frame_number = int(frame_key)
+        if not self._wait_for_frame(frame_number):
+            raise KeyError(frame_key)
+
+        value_start = self._offsets[frame_number]
+        value_end = self._next_offsets.get(frame_number, len(self._mmap))
+
+        frame_value, _ = self._decoder.raw_decode(self._mmap[value_start:value_end].decode('ascii'))
+        return frame_value
+
+    def __len__(self) -> int:
+        self._wait_for_scan()
+        return len(self._offsets)
+
+    def get_reference(self, frame_key: object) -> int:
+        # Duplicates are stored as a plain number, checked without parsing the frame
+        frame_number = int(frame_key)
+        if not self._wait_for_frame(frame_number):
+            raise KeyError(frame_key)
+
+        value_start = self._offsets[frame_number]
+        if not self._mmap[value_start:value_start + 1].isdigit():
+            return None
+
+        return self[frame_number]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def keys(self) -> list:
+        self._wait_for_scan()
+        return [str(frame_number) for frame_number in sorted(self._offsets)]
+
+    def get_header(self) -> dict:
+        return self._header
+
+    def get_first_frame(self) -> int:
+        # Files written in order store their first frame, older ones need the whole index
+        if 'first_frame' in self._header:
+            return self._header['first_frame']
+
+        self._wait_for_scan()
+        return min(self._offsets)
+
+    def close(self) -> None:
+        self._mmap.close()
+        self._file.close()
+
+    def _scan_frames(self) -> None:
+        previous_number = None
+
+        for frame_index, match in enumerate(JSON_FRAME_KEY_PATTERN.finditer(self._mmap, self._frames_start)):
+            frame_number = int(match.group(1))
+
+            with self._index_condition:
+                self._offsets[frame_number] = match.end() - 1
+
+                # The previous value ends where this key starts
+                if previous_number is not None:
+                    self._next_offsets[previous_number] = match.start()
+
+                if frame_index % JSON_INDEX_NOTIFY_INTERVAL == 0:
+                    self._index_condition.notify_all()
+
+            previous_number = frame_number
+
+        with self._index_condition:
+            self._scanned = True
+            self._index_condition.notify_all()
+
+    def _wait_for_frame(self, frame_number: int) -> bool:
+        with self._index_condition:
+            # A frame is readable once the key after it was found or the scan ended
+            self._index_condition.wait_for(
+                lambda: frame_number in self._next_offsets or self._scanned
+            )
+            return frame_number in self._offsets
+
+    def _wait_for_scan(self) -> None:
+        with self._index_condition:
+            self._index_condition.wait_for(lambda: self._scanned)
+
+
+class PrefetchingFrames:
+    def __init__(self, frames: object, first_frame: int, prefetch_size: int = DEFAULT_PREFETCH_FRAMES) -> None:
+        # Reads the frames after the one being played in a background thread
+        self._frames = frames
+        self._prefetch_size = max(1, prefetch_size)
+
+        self._buffer = {}
+        self._next_number = first_frame
+        self._running = True
+
+        # The source is only read by one thread at a time, delta decoding keeps state
+        self._source_lock = threading.Lock()
+        self._buffer_condition = threading.Condition()
+
+        self._prefetch_thread = threading.Thread(target=self._prefetch_frames, daemon=True)
+        self._prefetch_thread.start()
+
+    def __contains__(self, frame_key: object) -> bool:
+        with self._buffer_condition:
+            if int(frame_key) in self._buffer:
+                return True
+
+        return frame_key in self._frames
+
+    def __getitem__(self, frame_key: object) -> list:
+        frame_number = int(frame_key)
+
+        with self._buffer_condition:
+            # Frames before the requested one were played, make room for new ones
+            for buffered_number in [number for number in self._buffer if number < frame_number]:
+                del self._buffer[buffered_number]
+            self._buffer_condition.notify_all()
+
+            if frame_number in self._buffer:
+                return self._buffer[frame_number]
+
+            # Seeked outside the buffer, prefetch from the new position
+            self._buffer.clear()
+            self._next_number = frame_number + 1
+            self._buffer_condition.notify_all()
+
+        with self._source_lock:
+            frame_data = self._frames[frame_key]
+
+        with self._buffer_condition:
+            self._buffer[frame_number] = frame_data
+
+        return frame_data
+
+    def close(self) -> None:
+        with self._buffer_condition:
+            self._running = False
+            self._buffer_condition.notify_all()
+
+        self._prefetch_thread.join()
+
+        if hasattr(self._frames, 'close'):
+            self._frames.close()
+
+    def _prefetch_frames(self) -> None:
+        while True:
+            with self._buffer_condition:
+                self._buffer_condition.wait_for(
+                    lambda: not self._running or len(self._buffer) < self._prefetch_size
+                )
+                if not self._running:
+                    return
+
+                frame_number = self._next_number
+
+            if frame_number not in self._frames:
+                # Reached the end, wait for a seek
+                with self._buffer_condition:
+                    self._buffer_condition.wait_for(
+                        lambda: not self._running or self._next_number != frame_number
+                    )
+                continue
+
+            with self._source_lock:
+                frame_data = self._frames[str(frame_number)]
+
+            with self._buffer_condition:
+                # Drop the frame if a seek happened meanwhile
+                if self._next_number == frame_number:
+                    self._buffer[frame_number] = frame_data
+                    self._next_number += 1
+
+
+def load_ascii_video(path: str, prefetch_size: int = DEFAULT_PREFETCH_FRAMES) -> dict:
+    file_name = os.path.basename(path)
+
+    if is_ascii_video_file(file_name):
+        reader = AsciiVideoReader(path)
+        get_reference = reader.get_reference
+        input_data = {
+            'fps':          reader.fps,
+            'resolution':   reader.resolution,
+            'first_frame':  reader.first_frame,
+            'color_mode':   reader.color_mode,
+            'frames':       reader
+        }
+    elif file_name.endswith('.json'):
+        json_frames = LazyJsonFrames(path)
+        get_reference = json_frames.get_reference
+        input_data = json_frames.get_header()
+        input_data['first_frame'] = json_frames.get_first_frame()
+        input_data['frames'] = json_frames
+    elif file_name.endswith('.pkl'):
+        # Pickles can only be read whole
+        with open(path, 'rb') as pkl_file:
+            input_data = pickle.load(pkl_file)
+        input_data['first_frame'] = min(int(frame_key) for frame_key in input_data['frames'])
+
+        pkl_frames = input_data['frames']
+        get_reference = lambda frame_key: get_frame_reference(pkl_frames, frame_key)
+    else:
+        raise ValueError(f'{file_name} is not a supported ascii video file')
+
+    # Colored .json/.pkl frames hold their colors next to the rows
+    input_data['color_mode'] = input_data.get('color_mode', COLOR_NONE)
+    color_values = None
+    if input_data['color_mode'] != COLOR_NONE and not is_ascii_video_file(file_name):
+        color_values = ColorFrameValues(input_data['frames'])
+        input_data['frames'] = color_values
+
+    # Delta frames of .json/.pkl files are decoded on read, the first frame is always a keyframe
+    if input_data.get('encoding', ENCODING_FULL) == ENCODING_DELTA:
+        first_frame_cols = len(input_data['frames'][str(input_data['first_frame'])][0])
+        input_data['frames'] = DeltaFrames(input_data['frames'], first_frame_cols)
+
+    # Colored frames are read as (rows, colors) pairs
+    if color_values is not None:
+        first_rows = input_data['frames'][str(input_data['first_frame'])]
+        frame_rows, frame_cols, color_mode = len(first_rows), len(first_rows[0]), input_data['color_mode']
+        input_data['frames'] = ColorFrames(
+            input_data['frames'],
+            lambda frame_key: decode_colors(color_values.get_colors(frame_key), frame_rows, frame_cols, color_mode)
+        )
+    elif input_data['color_mode'] != COLOR_NONE:
+        input_data['frames'] = ColorFrames(reader, reader.get_colors)
+
+    # Duplicate frames resolve to the frame they repeat, read once for the whole run
+    input_data['frames'] = ReferenceFrames(input_data['frames'], get_reference)
+
+    input_data['frames'] = PrefetchingFrames(input_data['frames'], input_data['first_frame'], prefetch_size)
+
+    return input_data
@@ -1,9 +1,11 @@
-import json
-import pickle
+from __future__ import annotations
 import os
-import time
-import keyboard
 import scripts.ui as ui
+from scripts.ascii_video_loader import load_ascii_video
+from scripts.terminal_renderer import DiffRenderer
+from scripts.playback_scheduler import PlaybackScheduler
+from scripts.ascii_color import COLOR_NONE, colorize_rows
+from scripts.player_input import create_key_input, INPUT_AUTO
 
 CONTROL_KEY_PAUSE = 'q'
 CONTROL_KEY_UNPAUSE = 'w'
@@ -14,12 +16,19 @@ CONTROL_KEY_STOP = 'z'
 CONTROL_KEY_STOP_ALT = 'y'
 
 class AsciiVideoPlayer:
-    def __init__(self, default_frame_rate: int = 24) -> None:
+    def __init__(self, default_frame_rate: int = 24, diff_render: bool = True, input_backend: str = INPUT_AUTO) -> None:
         self._default_frame_rate = default_frame_rate
+        self._diff_render = diff_render
+        self._renderer = None
+
+        # Keys come from stdin (or keyboard hooks on windows), the frame loop polls them once per frame
+        self._input_backend = input_backend
+        self._key_input = None
 
         self._frames = {}
         self._frame_rows = 0
         self._frame_cols = 0
+        self._color_mode = COLOR_NONE
         self._first_frame = 0
         self._current_frame = 0
 
@@ -33,134 +42,173 @@ class AsciiVideoPlayer:
             CONTROL_KEY_STOP:   'Stop',
         }
 
-    def play(self, path: str, clear_before: bool = False) -> None:
+    def play(self, path: str, clear_before: bool = False, speed: float = 1.0) -> None:
         print('Loading video...')
 
-        input_data = self._get_input_data(path)
+        self.play_frames(self._get_input_data(path), clear_before, speed)
 
-        input_frames = input_data['frames']
-        frame_rate = input_data['fps']
-        frame_rate += 0.1 # Needs a bit of adjusting to be perfect
-        
-        # Sort frames
-        frame_keys = list(input_frames.keys())
-        frame_keys.sort(key=int)
-        self._frames = {i: input_frames[i] for i in frame_keys}
+    def play_frames(self, input_data: dict, clear_before: bool = False, speed: float = 1.0) -> None:
+        # Input data holds the fps, first frame, color mode and a frames source read by frame key
+
+        # Frames are read ahead in the background while playing
+        self._frames = input_data['frames']
+        self._first_frame = input_data['first_frame']
+        frame_rate = input_data['fps'] or self._default_frame_rate
+
+        # Colored frames are (rows, colors) pairs
+        self._color_mode = input_data.get('color_mode', COLOR_NONE)
 
         # Set frame dimensions
-        self._frame_rows = len(list(self._frames.values())[0])
-        self._frame_cols = len(list(self._frames.values())[0][0])
+        first_frame_data = self._frames[str(self._first_frame)]
+        if isinstance(first_frame_data, tuple):
+            first_frame_data = first_frame_data[0]
+        self._frame_rows = len(first_frame_data)
+        self._frame_cols = len(first_frame_data[0])
 
         # Set first frame key
-        self._first_frame = self._current_frame = int(list(self._frames.keys())[0])
+        self._current_frame = self._first_frame
+
+        if self._diff_render:
+            # Only the changed parts of each frame are written to the console
+            self._renderer = DiffRenderer(
+                self._frame_rows,
+                self._frame_cols,
+                self._get_controls_line(),
+                color_mode=self._color_mode
+            )
 
         if clear_before:
             self._clear_console()
         
-        while self._has_next_frame():
-            frame_start = time.perf_counter()
+        # Frames are shown on absolute deadlines, late frames are skipped
+        scheduler = PlaybackScheduler(frame_rate, speed)
+        scheduler.start(self._current_frame)
+
+        # The terminal is restored when playback ends in any way (stop key, ctrl+c, errors)
+        with create_key_input(self._input_backend) as self._key_input:
+            while self._has_next_frame():
+                frame_displayed = self._paused or scheduler.should_render(self._current_frame)
 
-            # Display the ascii frame
-            self._display_frame(self._frames[str(self._current_frame)])
+                if frame_displayed:
+                    # Display the ascii frame
+                    self._display_frame(self._frames[str(self._current_frame)])
 
-            # Print a seperator
-            self._print_seperator()
+                    # Print a seperator
+                    self._print_seperator()
 
-            # Print player controls
-            self._print_controls()
+                    # Print player controls
+                    self._print_controls()
 
-            # Check for input and handle it
-            self._handle_user_input()
+                # Check for input and handle it
+                self._handle_user_input()
 
-            # Prepare next frame by moving the cursor to the start
-            self._prep_next_frame()
+                # Prepare next frame by moving the cursor to the start
+                self._prep_next_frame(frame_displayed)
 
-            # Limit frames per second
-            time.sleep(max(0, (1.0 / frame_rate) - (time.perf_counter() - frame_start)))
+                # Wait for the deadline of the next frame
+                scheduler.wait_for_frame(self._current_frame)
+
+        self._key_input = None
         
         # Clear the last frame
         self._clear_console()
 
-        ui.print_lines(['Video finished playing!'], seperate_chunk=True)
+        self._frames.close()
 
-    def _is_pickle(self, file: str) -> bool:
-        return file.endswith('.pkl')
+        outro_lines = ['Video finished playing!', *scheduler.get_stats_lines()]
+        if self._renderer is not None:
+            outro_lines.append(f' -> Avg. bytes written per frame: {self._renderer.get_average_frame_bytes():.0f}')
 
-    def _is_json(self, file: str) -> bool:
-        return file.endswith('.json')
+        ui.print_lines(outro_lines, seperate_chunk=True)
 
     def _get_input_data(self, file_path: str) -> dict:
-        file_name = os.path.basename(file_path)
-
-        if self._is_json(file_name):
-            with open(file_path, 'r') as json_file:
-                return json.load(json_file)
-        
-        if self._is_pickle(file_name):
-            with open(file_path, 'rb') as pkl_file:
-                return pickle.load(pkl_file)
-
-        return {}
+        return load_ascii_video(file_path)
 
     def _handle_user_input(self) -> None:
+        # Keys pressed since the last frame, empty most of the time
+        pressed_keys = self._key_input.poll()
+        if not pressed_keys:
+            return
+
         if self._paused:
             # UNPAUSE
-            if keyboard.is_pressed(CONTROL_KEY_UNPAUSE):
+            if CONTROL_KEY_UNPAUSE in pressed_keys:
                 if self._paused:
                     self._paused = False
+                    if self._renderer is not None:
+                        self._renderer.render_status(self._get_controls_line())
         else:
             # PAUSE
-            if keyboard.is_pressed(CONTROL_KEY_PAUSE):
+            if CONTROL_KEY_PAUSE in pressed_keys:
                 self._paused = True
-                # Clear the controls line
-                print(f'\033[1A\033[2K', end='')
-                print(''.join([' ' for _ in range(self._frame_cols)]))
-                print(f'\033[1A\033[2K', end='')
-                print(f'| PAUSED: Press {CONTROL_KEY_UNPAUSE} to unpause |')
+                if self._renderer is not None:
+                    self._renderer.render_status(f'| PAUSED: Press {CONTROL_KEY_UNPAUSE} to unpause |')
+                else:
+                    # Clear the controls line
+                    print(f'\033[1A\033[2K', end='')
+                    print(''.join([' ' for _ in range(self._frame_cols)]))
+                    print(f'\033[1A\033[2K', end='')
+                    print(f'| PAUSED: Press {CONTROL_KEY_UNPAUSE} to unpause |')
             
             # REWIND
-            if keyboard.is_pressed(CONTROL_KEY_REWIND):
+            if CONTROL_KEY_REWIND in pressed_keys:
                 if self._current_frame - 5 >= self._first_frame:
                     self._current_frame -= 5
             
             # FAST FORWARD
-            if keyboard.is_pressed(CONTROL_KEY_FF):
+            if CONTROL_KEY_FF in pressed_keys:
                 self._current_frame += 4
 
         # CLEAR ARTIFACTS
-        if keyboard.is_pressed(CONTROL_KEY_CLEAR):
+        if CONTROL_KEY_CLEAR in pressed_keys:
             self._clear_console()
         
         # STOP AND TURN OFF
-        if keyboard.is_pressed(CONTROL_KEY_STOP) or keyboard.is_pressed(CONTROL_KEY_STOP_ALT):
+        if CONTROL_KEY_STOP in pressed_keys or CONTROL_KEY_STOP_ALT in pressed_keys:
             self._clear_console()
             self._playing = False
+            self._key_input.stop()
             ui.print_lines(['Video stopped by controls'], seperate_chunk=True)
             exit(0)
     
     def _print_seperator(self) -> None:
-        if self._paused:
+        # The renderer draws the separator only when the whole frame is redrawn
+        if self._paused or self._renderer is not None:
             return
         
         print(''.join(['-' for _ in range(self._frame_cols)]))
 
     def _print_controls(self) -> None:
-        if self._paused:
+        if self._paused or self._renderer is not None:
             return
 
-        print('CONTROLS: | ' + ' | '.join([f'{key} - {self._controls[key]}' for key in self._controls]) + ' |')
+        print(self._get_controls_line())
 
-    def _display_frame(self, frame_data: list) -> None:
+    def _get_controls_line(self) -> str:
+        return 'CONTROLS: | ' + ' | '.join([f'{key} - {self._controls[key]}' for key in self._controls]) + ' |'
+
+    def _display_frame(self, frame_data: object) -> None:
         if self._paused:
             return
+
+        if self._renderer is not None:
+            self._renderer.render(frame_data)
+            return
+
+        if isinstance(frame_data, tuple):
+            frame_data = colorize_rows(*frame_data, self._color_mode)
         
         print('\n'.join(frame_data))
 
-    def _prep_next_frame(self) -> None:
+    def _prep_next_frame(self, frame_displayed: bool = True) -> None:
         if self._paused:
             return
         
         self._current_frame += 1
+
+        # The renderer positions the cursor itself, skipped frames left the cursor in place
+        if self._renderer is not None or not frame_displayed:
+            return
         
         # Move cursor up by the number of rows in one frame + 2 rows for controls
         move_lines = self._frame_rows + 2
@@ -170,4 +218,7 @@ class AsciiVideoPlayer:
         return str(self._current_frame + 1) in self._frames
     
     def _clear_console(self) -> None:
-        os.system('cls')
+        os.system('cls' if os.name == 'nt' else 'clear')
+
+        if self._renderer is not None:
+            self._renderer.invalidate()
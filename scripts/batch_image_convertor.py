@@ -0,0 +1,179 @@
+import os
+import glob
+import queue
+import threading
+import multiprocessing as mp
+from collections import deque
+from multiprocessing.pool import AsyncResult
+from scripts.img_ascii_convertor import ImgAsciiConvertor
+
+
+IMAGE_EXTENSIONS = ['jpg', 'jpeg', 'png']
+
+# Images sent to a pool process per task, spreads the task overhead over many small images
+DEFAULT_CHUNK_SIZE = 32
+
+# Chunks waiting in or for the pool per core, bounds memory while keeping the cores busy
+PENDING_CHUNKS_PER_CORE = 4
+
+# Converted images waiting for the writer before the conversion waits for it
+WRITER_QUEUE_IMAGES = 1024
+
+# Convertor of each pool process, created once by the initializer
+_worker_convertor = None
+
+
+class ImageResult:
+    def __init__(self, index: int, name: str) -> None:
+        self.index = index
+        self.name = name
+
+        self.rows = None
+        self.colors = None
+        self.error = None
+
+        # Set when the convertor writes output files, the file is written by the writer thread
+        self.output_path = None
+
+
+class BatchImageConvertor:
+    def __init__(self, image_convertor: ImgAsciiConvertor, num_cores: int, chunk_size: int = DEFAULT_CHUNK_SIZE) -> None:
+        # The image convertor holds the conversion and output settings, its pool copies convert the images
+        self._image_convertor = image_convertor
+        self._num_cores = max(1, min(int(num_cores), os.cpu_count()))
+        self._chunk_size = max(1, chunk_size)
+
+        self._write_queue = None
+        self._write_errors = []
+
+    def convert(self, image_inputs: object) -> object:
+        # Generator of ImageResults in input order. Inputs are image paths, encoded image bytes,
+        # pixel arrays (grayscale or RGB) or (name, input) tuples, read lazily from any iterable
+        self._write_errors = []
+
+        pool = mp.Pool(
+            self._num_cores,
+            initializer=_init_worker,
+            initargs=(
+                self._image_convertor.get_resolution_scale(),
+                self._image_convertor.get_color_mode(),
+                self._image_convertor.get_glyph_mode(),
+                self._image_convertor.get_grayscale_chars()
+            )
+        )
+
+        writer = None
+        if self._image_convertor.outputs_to_file():
+            self._write_queue = queue.Queue(maxsize=WRITER_QUEUE_IMAGES)
+            writer = threading.Thread(target=self._write_results, daemon=True)
+            writer.start()
+
+        pending_chunks = deque()
+        try:
+            for chunk in self._split_inputs(image_inputs):
+                # Results are taken in order, the oldest chunk is waited for before more are sent
+                if len(pending_chunks) >= self._num_cores * PENDING_CHUNKS_PER_CORE:
+                    yield from self._finish_chunk(*pending_chunks.popleft())
+
+                tasks = [(result.index, image_data) for result, image_data in chunk]
+                pending_chunks.append(([result for result, _ in chunk], pool.apply_async(_convert_chunk, (tasks,))))
+
+            while pending_chunks:
+                yield from self._finish_chunk(*pending_chunks.popleft())
+        finally:
+            pool.terminate()
+            pool.join()
+
+            # Results handed to the writer are still written when the consumer stops early
+            if writer is not None:
+                self._write_queue.put(None)
+                writer.join()
+
+    def get_write_errors(self) -> list:
+        # (output path, error) of every output file that could not be written
+        return self._write_errors
+
+    def _split_inputs(self, image_inputs: object) -> object:
+        chunk = []
+
+        for index, image_input in enumerate(image_inputs):
+            if isinstance(image_input, tuple):
+                name, image_data = image_input
+            elif isinstance(image_input, str):
+                name, image_data = os.path.basename(image_input).split('.')[0], image_input
+            else:
+                name, image_data = f'image_{index}', image_input
+
+            chunk.append((ImageResult(index, name), image_data))
+
+            if len(chunk) >= self._chunk_size:
+                yield chunk
+                chunk = []
+
+        if chunk:
+            yield chunk
+
+    def _finish_chunk(self, results: list, async_result: AsyncResult) -> object:
+        try:
+            converted = async_result.get()
+        except Exception as error:
+            # Only a broken pool process fails a whole chunk, image errors come back per image
+            converted = [(result.index, None, None, str(error)) for result in results]
+
+        for result, (_, rows, colors, error) in zip(results, converted):
+            result.rows = rows
+            result.colors = colors
+            result.error = error
+
+            if error is None and self._write_queue is not None:
+                result.output_path = self._image_convertor.get_result_path(result.name)
+                self._write_queue.put(result)
+
+            yield result
+
+    def _write_results(self) -> None:
+        # Output files are written next to the conversion, the pool never waits for the disk
+        while True:
+            result = self._write_queue.get()
+            if result is None:
+                return
+
+            try:
+                self._image_convertor.save_result(result.rows, result.name, result.colors)
+            except Exception as error:
+                self._write_errors.append((result.output_path, str(error)))
+
+
+def collect_image_paths(inputs: list) -> list:
+    image_paths = []
+
+    for input_path in inputs:
+        if os.path.isdir(input_path):
+            candidates = sorted(os.path.join(input_path, file) for file in os.listdir(input_path))
+        else:
+            candidates = sorted(glob.glob(input_path)) or [input_path]
+
+        for candidate in candidates:
+            if os.path.isfile(candidate) and candidate.split('.')[-1].lower() in IMAGE_EXTENSIONS:
+                if candidate not in image_paths:
+                    image_paths.append(candidate)
+
+    return image_paths
+
+
+def _init_worker(resolution_scale: float, color_mode: str, glyph_mode: str, charset: str) -> None:
+    global _worker_convertor
+    _worker_convertor = ImgAsciiConvertor(resolution_scale, False, color_mode=color_mode, glyph_mode=glyph_mode, charset=charset)
+
+
+def _convert_chunk(tasks: list) -> list:
+    results = []
+
+    for index, image_data in tasks:
+        try:
+            rows, colors = _worker_convertor.convert_image_data(image_data)
+            results.append((index, rows, colors, None))
+        except Exception as error:
+            results.append((index, None, None, str(error)))
+
+    return results
@@ -0,0 +1,362 @@
+from __future__ import annotations
+import os
+import glob
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, Future
+from concurrent.futures.process import BrokenProcessPool
+from scripts.img_ascii_convertor import ImgAsciiConvertor, GLYPH_MODE_BRIGHTNESS
+from scripts.video_ascii_convertor import VideoAsciiConvertor
+from scripts.video_to_frames import FrameSampler
+from scripts.ascii_color import COLOR_NONE
+from scripts.frame_dedup import DuplicateFrameDetector
+from scripts.lazy_import import lazy_import
+
+cv2 = lazy_import('cv2')
+
+
+VIDEO_EXTENSIONS = ['mp4', 'avi', 'mov', 'mkv', 'webm']
+
+DEFAULT_DECODERS = 2
+
+# Frames waiting in or for the pool per core, bounds memory while keeping the cores busy
+PENDING_FRAMES_PER_CORE = 8
+
+# Convertor of each pool process, created once by the initializer
+_worker_convertor = None
+
+# Duplicate frame detector of each video a pool process converted frames of, None without dedup
+_worker_detectors = None
+_worker_dedup_threshold = None
+
+
+class VideoJob:
+    def __init__(self, index: int, video_path: str) -> None:
+        self.index = index
+        self.video_path = video_path
+
+        self.fps = 0.0
+        self.glyph_frames = {}
+        self.color_frames = {}
+        self.pending_frames = 0
+        self.decoded = False
+        self.finished = False
+        self.error = None
+
+        # Set when the output was copied from the conversion cache
+        self.cache_key = None
+        self.cached_output = None
+
+        self.decode_start = None
+        self.decode_end = None
+        self.convert_end = None
+
+        self.lock = threading.Lock()
+
+
+class BatchVideoConvertor:
+    def __init__(self, video_convertor: VideoAsciiConvertor, num_cores: int, num_decoders: int = DEFAULT_DECODERS) -> None:
+        # The video convertor holds the output settings and writes the results
+        self._video_convertor = video_convertor
+        self._num_cores = max(1, min(int(num_cores), os.cpu_count()))
+        self._num_decoders = max(1, num_decoders)
+
+        self._jobs = []
+        self._video_jobs = queue.Queue()
+        self._finished_jobs = queue.Queue()
+        self._pending_frames = threading.BoundedSemaphore(self._num_cores * PENDING_FRAMES_PER_CORE)
+
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def convert(self, video_paths: list) -> list:
+        self._jobs = [VideoJob(index, video_path) for index, video_path in enumerate(video_paths)]
+        for job in self._jobs:
+            self._video_jobs.put(job)
+
+        # One pool for the whole batch, frames of several videos are converted side by side
+        self._pool = self._create_pool()
+
+        decoders = [threading.Thread(target=self._decode_videos, daemon=True) for _ in range(self._num_decoders)]
+        for decoder in decoders:
+            decoder.start()
+
+        summaries = []
+        try:
+            for _ in range(len(self._jobs)):
+                job = self._finished_jobs.get()
+                summaries.append(self._save_job(job))
+                self._print_job_summary(summaries[-1], len(summaries))
+        finally:
+            with self._pool_lock:
+                self._pool.shutdown(cancel_futures=True)
+
+        return sorted(summaries, key=lambda summary: summary['index'])
+
+    def _decode_videos(self) -> None:
+        while True:
+            try:
+                job = self._video_jobs.get_nowait()
+            except queue.Empty:
+                return
+
+            try:
+                if not self._restore_cached_job(job):
+                    self._decode_video(job)
+            except Exception as error:
+                job.error = str(error)
+
+            with job.lock:
+                job.decoded = True
+                job.decode_end = time.time()
+            self._check_finished(job)
+
+    def _restore_cached_job(self, job: VideoJob) -> bool:
+        if self._video_convertor.get_cache() is None:
+            return False
+
+        # Batch frames are decoded in memory like streamed ones
+        job.cache_key = self._video_convertor.get_cache_key(job.video_path, True)
+        job.cached_output = self._video_convertor.restore_cached_result(job.cache_key, self._get_file_name(job))
+
+        return job.cached_output is not None
+
+    def _decode_video(self, job: VideoJob) -> None:
+        job.decode_start = time.time()
+
+        vidcap = cv2.VideoCapture(job.video_path)
+        if not vidcap.isOpened():
+            raise IOError(f'Could not open {job.video_path}')
+
+        sampler = FrameSampler(vidcap.get(cv2.CAP_PROP_FPS), self._video_convertor.get_target_fps())
+        job.fps = sampler.get_output_fps()
+
+        # Pool processes split colored frames themselves
+        keep_color = self._video_convertor.get_color_mode() != COLOR_NONE
+
+        source_index = -1
+        frame_number = 0
+
+        while job.error is None:
+            if not vidcap.grab():
+                break
+
+            # Skipped frames are grabbed but never retrieved and converted
+            source_index += 1
+            if not sampler.keeps(source_index):
+                continue
+
+            success, image = vidcap.retrieve()
+            if not success:
+                break
+
+            frame_number = sampler.get_frame_number(source_index)
+            if not keep_color:
+                image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+            # Wait for room in the pool before decoding further
+            self._pending_frames.acquire()
+            with job.lock:
+                job.pending_frames += 1
+
+            try:
+                future = self._submit_frame((job.index, frame_number, image))
+            except BaseException:
+                self._pending_frames.release()
+                with job.lock:
+                    job.pending_frames -= 1
+                raise
+
+            # Runs for every frame, frames of a crashed pool process fail instead of never coming back
+            future.add_done_callback(lambda future, job=job: self._on_frame_done(job, future))
+
+        vidcap.release()
+
+        if frame_number == 0:
+            raise IOError(f'No frames could be read from {job.video_path}')
+
+    def _create_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            self._num_cores,
+            initializer=_init_worker,
+            initargs=(
+                self._video_convertor.get_resolution_scale(),
+                self._video_convertor.get_color_mode(),
+                self._video_convertor.get_dedup_threshold(),
+                self._video_convertor.get_glyph_mode(),
+                self._video_convertor.get_charset()
+            )
+        )
+
+    def _submit_frame(self, task: tuple) -> Future:
+        with self._pool_lock:
+            try:
+                return self._pool.submit(_convert_frame, task)
+            except BrokenProcessPool:
+                # A pool process died, the videos it had frames of failed, the rest of the batch gets a new pool
+                self._pool.shutdown(wait=False)
+                self._pool = self._create_pool()
+                return self._pool.submit(_convert_frame, task)
+
+    def _on_frame_done(self, job: VideoJob, future: Future) -> None:
+        if future.cancelled():
+            # The batch is shutting down, the decoder waiting for a free slot stops
+            self._on_frame_failed(job, 'Frame conversion was cancelled')
+            return
+
+        error = future.exception()
+        if error is not None:
+            self._on_frame_failed(job, error)
+            return
+
+        self._on_frame_converted(future.result())
+
+    def _on_frame_converted(self, result: tuple) -> None:
+        video_index, frame_number, glyph_indices, colors = result
+        job = self._jobs[video_index]
+
+        with job.lock:
+            job.glyph_frames[frame_number] = glyph_indices
+            if colors is not None:
+                job.color_frames[frame_number] = colors
+            job.pending_frames -= 1
+
+        self._pending_frames.release()
+        self._check_finished(job)
+
+    def _on_frame_failed(self, job: VideoJob, error: object) -> None:
+        with job.lock:
+            job.error = str(error)
+            job.pending_frames -= 1
+
+        self._pending_frames.release()
+        self._check_finished(job)
+
+    def _check_finished(self, job: VideoJob) -> None:
+        with job.lock:
+            if job.finished or not job.decoded or job.pending_frames > 0:
+                return
+
+            job.finished = True
+            job.convert_end = time.time()
+
+        self._finished_jobs.put(job)
+
+    def _save_job(self, job: VideoJob) -> dict:
+        summary = {
+            'index':        job.index,
+            'input':        job.video_path,
+            'output':       None,
+            'frames':       len(job.glyph_frames),
+            'error':        job.error,
+            'cached':       job.cached_output is not None
+        }
+
+        if job.cached_output is not None:
+            summary['output'] = job.cached_output
+        elif job.error is None:
+            save_start = time.time()
+
+            try:
+                summary['output'] = self._video_convertor.save_glyph_frames(
+                    self._get_file_name(job),
+                    job.fps,
+                    job.glyph_frames,
+                    job.color_frames
+                )
+
+                if job.cache_key is not None:
+                    self._video_convertor.cache_result(job.cache_key, summary['output'])
+            except Exception as error:
+                summary['error'] = str(error)
+
+            summary['save_time'] = time.time() - save_start
+
+        if job.decode_start is not None:
+            summary['decode_time'] = job.decode_end - job.decode_start
+            summary['convert_time'] = job.convert_end - job.decode_start
+            summary['total_time'] = time.time() - job.decode_start
+            summary['fps'] = summary['frames'] / max(summary['convert_time'], 1e-9)
+
+        # Frames are no longer needed once written
+        job.glyph_frames = {}
+        job.color_frames = {}
+
+        return summary
+
+    def _get_file_name(self, job: VideoJob) -> str:
+        return os.path.basename(job.video_path).split('.')[0]
+
+    def _print_job_summary(self, summary: dict, finished_count: int) -> None:
+        if summary['error'] is not None:
+            status = 'FAILED'
+        elif summary['cached']:
+            status = 'CACHED'
+        else:
+            status = f'{summary.get("total_time", 0):.2f}s'
+
+        print(f'[{finished_count}/{len(self._jobs)}] {os.path.basename(summary["input"])} - {status}')
+
+        if summary['error'] is not None:
+            print(f' -> {summary["error"]}')
+
+
+def collect_video_paths(inputs: list) -> list:
+    video_paths = []
+
+    for input_path in inputs:
+        if os.path.isdir(input_path):
+            candidates = sorted(os.path.join(input_path, file) for file in os.listdir(input_path))
+        else:
+            candidates = sorted(glob.glob(input_path)) or [input_path]
+
+        for candidate in candidates:
+            if os.path.isfile(candidate) and candidate.split('.')[-1].lower() in VIDEO_EXTENSIONS:
+                if candidate not in video_paths:
+                    video_paths.append(candidate)
+
+    return video_paths
+
+
+def _init_worker(
+        resolution_scale: float,
+        color_mode: str = COLOR_NONE,
+        dedup_threshold: float = None,
+        glyph_mode: str = GLYPH_MODE_BRIGHTNESS,
+        charset: str = None
+    ) -> None:
+
+    global _worker_convertor, _worker_detectors, _worker_dedup_threshold
+    _worker_convertor = ImgAsciiConvertor(resolution_scale, False, color_mode=color_mode, glyph_mode=glyph_mode, charset=charset)
+    _worker_detectors = {}
+    _worker_dedup_threshold = dedup_threshold
+
+
+def _convert_frame(task: tuple) -> tuple:
+    video_index, frame_number, frame_array = task
+
+    # Colored frames arrive as decoded (BGR)
+    colors = None
+    if frame_array.ndim == 3:
+        colors = _worker_convertor.get_block_colors(cv2.cvtColor(frame_array, cv2.COLOR_BGR2RGB))
+        frame_array = cv2.cvtColor(frame_array, cv2.COLOR_BGR2GRAY)
+
+    block_sums, block_area = _worker_convertor.get_block_sums(frame_array)
+
+    # Glyphs matched by shape are compared themselves, equal block sums can still hold other shapes
+    glyph_indices = None
+    if _worker_convertor.matches_glyph_structure(block_area):
+        glyph_indices = _worker_convertor.get_glyph_indices(frame_array, block_sums)
+
+    # Duplicates come back as the number of the frame they repeat, frames of a video reach a process in order
+    if _worker_dedup_threshold is not None:
+        detector = _worker_detectors.setdefault(video_index, DuplicateFrameDetector(_worker_dedup_threshold))
+        reference_number = detector.find_reference(frame_number, block_sums, block_area, colors, glyph_indices)
+        if reference_number is not None:
+            return video_index, frame_number, reference_number, None
+
+    if glyph_indices is None:
+        glyph_indices = _worker_convertor.get_glyph_indices(frame_array, block_sums)
+
+    return video_index, frame_number, glyph_indices, colors
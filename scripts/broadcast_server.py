@@ -0,0 +1,270 @@
+import io
+import socket
+import asyncio
+from scripts.ascii_video_loader import load_ascii_video
+from scripts.live_convertor import LiveFrames, DEFAULT_LATENCY_BUDGET, DEFAULT_REORDER_FRAMES
+from scripts.terminal_renderer import DiffRenderer
+from scripts.ascii_color import COLOR_NONE
+
+
+DEFAULT_HOST = '0.0.0.0'
+DEFAULT_PORT = 2323
+
+# Encoded frames waiting per client, a full buffer drops frames for that client only
+DEFAULT_CLIENT_BUFFER_FRAMES = 8
+
+DEFAULT_FRAME_RATE = 24
+
+# Bytes the socket and the transport hold per client, kept small so lagging shows up in the frame buffer
+CLIENT_SOCKET_BUFFER = 64 * 1024
+CLIENT_WRITE_BUFFER = 16 * 1024
+
+# Time clients get to receive their last frames when the broadcast ends
+CLIENT_CLOSE_TIMEOUT = 2.0
+
+
+class BroadcastClient:
+    def __init__(self, address: str, writer: asyncio.StreamWriter, buffer_frames: int) -> None:
+        self.address = address
+        self.writer = writer
+        self.queue = asyncio.Queue(maxsize=buffer_frames)
+
+        # Diffs only apply on top of the previous frame, new and lagging clients get a full frame first
+        self.needs_full = True
+
+        self.sent_frames = 0
+        self.dropped_frames = 0
+        self.sent_bytes = 0
+
+
+class AsciiBroadcastServer:
+    def __init__(
+            self,
+            host: str = DEFAULT_HOST,
+            port: int = DEFAULT_PORT,
+            client_buffer_frames: int = DEFAULT_CLIENT_BUFFER_FRAMES,
+            wait_for_client: bool = True
+        ) -> None:
+
+        # Plain TCP, every client gets the terminal output of the player (telnet/netcat compatible)
+        self._host = host
+        self._port = port
+        self._client_buffer_frames = max(1, client_buffer_frames)
+
+        # Start the frame clock only once someone is watching
+        self._wait_for_client = wait_for_client
+
+        self._server = None
+        self._clients = set()
+        self._client_tasks = set()
+        self._client_connected = None
+
+        self._diff_renderer = None
+        self._full_renderer = None
+        self._diff_output = io.StringIO()
+        self._full_output = io.StringIO()
+
+        self._stats = {}
+        self._finished_clients = []
+
+    def serve_file(self, path: str, speed: float = 1.0) -> dict:
+        # Broadcast a .json, .pkl or .ascv output
+        return asyncio.run(self.serve(load_ascii_video(path), speed))
+
+    def serve_live(
+            self,
+            video_path: str,
+            resolution_scale: float,
+            num_cores: int,
+            latency_budget: float = DEFAULT_LATENCY_BUDGET,
+            target_fps: float = None,
+            color_mode: str = COLOR_NONE
+        ) -> dict:
+
+        # Broadcast a video while it is converted
+        live_frames = LiveFrames(
+            video_path,
+            resolution_scale,
+            num_cores,
+            latency_budget,
+            DEFAULT_REORDER_FRAMES,
+            target_fps,
+            color_mode
+        )
+
+        return asyncio.run(self.serve({
+            'fps':          live_frames.get_fps(),
+            'first_frame':  1,
+            'color_mode':   color_mode,
+            'frames':       live_frames
+        }))
+
+    async def serve(self, input_data: dict, speed: float = 1.0) -> dict:
+        # Input data as loaded for the player, returns the broadcast stats when the frames run out
+        loop = asyncio.get_running_loop()
+        frames = input_data['frames']
+        frame_number = input_data['first_frame']
+        frame_interval = 1.0 / ((input_data['fps'] or DEFAULT_FRAME_RATE) * speed)
+
+        self._client_connected = asyncio.Event()
+        self._server = await asyncio.start_server(self._on_client, self._host, self._port)
+        self._port = self._server.sockets[0].getsockname()[1]
+
+        self._stats = {'ticks': 0, 'skipped_ticks': 0, 'encoded_bytes': 0}
+        self._finished_clients = []
+
+        try:
+            first_frame_data = await loop.run_in_executor(None, frames.__getitem__, str(frame_number))
+            self._create_renderers(first_frame_data, input_data.get('color_mode', COLOR_NONE))
+
+            if self._wait_for_client:
+                await self._client_connected.wait()
+
+            next_tick = loop.time()
+
+            while await loop.run_in_executor(None, frames.__contains__, str(frame_number)):
+                # Frame sources can block (lazy files, live conversion), they are read off the event loop
+                frame_data = await loop.run_in_executor(None, frames.__getitem__, str(frame_number))
+                self._broadcast(frame_data)
+                self._stats['ticks'] += 1
+
+                frame_number += 1
+                next_tick += frame_interval
+
+                delay = next_tick - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                else:
+                    # Behind the clock, skip the frames whose tick already passed
+                    skipped_ticks = int(-delay / frame_interval)
+                    frame_number += skipped_ticks
+                    next_tick += skipped_ticks * frame_interval
+                    self._stats['skipped_ticks'] += skipped_ticks
+        finally:
+            await self._close_clients()
+
+            self._server.close()
+            await self._server.wait_closed()
+
+            await loop.run_in_executor(None, frames.close)
+
+        return self.get_stats()
+
+    def get_port(self) -> int:
+        # Port the server listens on, the assigned one when created with port 0
+        return self._port
+
+    def get_stats(self) -> dict:
+        clients = [*self._finished_clients, *self._clients]
+
+        return {
+            **self._stats,
+            'clients': [
+                {
+                    'address':          client.address,
+                    'sent_frames':      client.sent_frames,
+                    'dropped_frames':   client.dropped_frames,
+                    'sent_bytes':       client.sent_bytes
+                }
+                for client in clients
+            ]
+        }
+
+    def _create_renderers(self, frame_data: object, color_mode: str) -> None:
+        frame_rows = frame_data[0] if isinstance(frame_data, tuple) else frame_data
+        status_line = f'ASCII BROADCAST | {len(frame_rows[0])}x{len(frame_rows)}'
+
+        # One renderer keeps the diff chain, the other draws full frames for clients that need one
+        self._diff_renderer = DiffRenderer(len(frame_rows), len(frame_rows[0]), status_line, self._diff_output, color_mode)
+        self._full_renderer = DiffRenderer(len(frame_rows), len(frame_rows[0]), status_line, self._full_output, color_mode)
+
+    def _broadcast(self, frame_data: object) -> None:
+        # Every frame is encoded once as a diff and at most once as a full frame, then shared by all clients
+        diff_payload = self._render(self._diff_renderer, self._diff_output, frame_data)
+        full_payload = None
+
+        for client in list(self._clients):
+            if client.needs_full:
+                if full_payload is None:
+                    self._full_renderer.invalidate()
+                    full_payload = self._render(self._full_renderer, self._full_output, frame_data)
+                payload = full_payload
+            elif diff_payload:
+                payload = diff_payload
+            else:
+                continue
+
+            if client.queue.full():
+                # Slow client, the frame is dropped for it alone and its diff chain restarts with a full frame
+                client.dropped_frames += 1
+                client.needs_full = True
+                continue
+
+            client.queue.put_nowait(payload)
+            client.needs_full = False
+
+    def _render(self, renderer: DiffRenderer, output: io.StringIO, frame_data: object) -> bytes:
+        output.seek(0)
+        output.truncate()
+        renderer.render(frame_data)
+
+        payload = output.getvalue().encode('ascii')
+        self._stats['encoded_bytes'] += len(payload)
+
+        return payload
+
+    async def _on_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        peer = writer.get_extra_info('peername')
+        client = BroadcastClient(f'{peer[0]}:{peer[1]}' if peer else 'unknown', writer, self._client_buffer_frames)
+
+        client_socket = writer.get_extra_info('socket')
+        if client_socket is not None:
+            client_socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, CLIENT_SOCKET_BUFFER)
+        writer.transport.set_write_buffer_limits(high=CLIENT_WRITE_BUFFER)
+
+        self._clients.add(client)
+        self._client_tasks.add(asyncio.current_task())
+        self._client_connected.set()
+
+        try:
+            while True:
+                payload = await client.queue.get()
+                if payload is None:
+                    break
+
+                writer.write(payload)
+                await writer.drain()
+
+                client.sent_frames += 1
+                client.sent_bytes += len(payload)
+        except (ConnectionError, OSError):
+            # Disconnected clients are dropped without affecting the others
+            pass
+        finally:
+            self._clients.discard(client)
+            self._finished_clients.append(client)
+            self._client_tasks.discard(asyncio.current_task())
+
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+
+    async def _close_clients(self) -> None:
+        # Queued frames are still sent, the end marker goes after them
+        for client in list(self._clients):
+            if client.queue.full():
+                client.queue.get_nowait()
+            client.queue.put_nowait(None)
+
+        if not self._client_tasks:
+            return
+
+        # Clients that stopped reading are cut off, their pending write fails and ends the client task
+        _, pending_tasks = await asyncio.wait(list(self._client_tasks), timeout=CLIENT_CLOSE_TIMEOUT)
+        if pending_tasks:
+            for client in list(self._clients):
+                client.writer.transport.abort()
+
+            await asyncio.wait(pending_tasks)
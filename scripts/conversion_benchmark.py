@@ -0,0 +1,422 @@
+from __future__ import annotations
+import os
+import io
+import sys
+import time
+import shutil
+import platform
+import subprocess
+import contextlib
+from scripts.video_to_frames import VideoFramesExtractor
+from scripts.img_ascii_convertor import ImgAsciiConvertor, GLYPH_MODES
+from scripts.video_ascii_convertor import VideoAsciiConvertor, OUTPUT_TYPES
+from scripts.ascii_video_loader import load_ascii_video
+from scripts.lazy_import import lazy_import
+
+np = lazy_import('numpy')
+cv2 = lazy_import('cv2')
+
+
+BASE_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+BENCHMARK_VERSION = 1
+
+STAGE_EXTRACT = 'extract'
+STAGE_IMAGE_CONVERT = 'image_convert'
+STAGE_GLYPH_MAPPING = 'glyph_mapping'
+STAGE_VIDEO_CONVERT = 'video_convert'
+STAGE_SAVE_RESULT = 'save_result'
+STAGE_PLAYER_LOAD = 'player_load'
+
+BENCHMARK_STAGES = [
+    STAGE_EXTRACT,
+    STAGE_IMAGE_CONVERT,
+    STAGE_GLYPH_MAPPING,
+    STAGE_VIDEO_CONVERT,
+    STAGE_SAVE_RESULT,
+    STAGE_PLAYER_LOAD
+]
+
+DECODE_TEMP_FILES = 'temp files'
+DECODE_STREAM = 'stream'
+DECODE_SHARDED = 'sharded'
+
+DECODE_MODES = [DECODE_TEMP_FILES, DECODE_STREAM, DECODE_SHARDED]
+
+# (width, height) of the synthetic videos and images
+DEFAULT_FRAME_SIZES = [(320, 180), (640, 360), (1280, 720)]
+DEFAULT_FRAME_COUNTS = [48, 144]
+DEFAULT_RESOLUTION_SCALES = [0.25, 0.5, 1.0]
+DEFAULT_REPEATS = 3
+
+SYNTHETIC_FPS = 24
+SYNTHETIC_SEED = 1234
+IMAGES_PER_SIZE = 8
+
+# Slowdown over the baseline reported as a regression
+DEFAULT_REGRESSION_TOLERANCE = 0.15
+
+
+class ConversionBenchmark:
+    def __init__(
+            self,
+            frame_sizes: list = DEFAULT_FRAME_SIZES,
+            frame_counts: list = DEFAULT_FRAME_COUNTS,
+            resolution_scales: list = DEFAULT_RESOLUTION_SCALES,
+            core_counts: list = None,
+            stages: list = BENCHMARK_STAGES,
+            repeats: int = DEFAULT_REPEATS,
+            work_path: str = os.path.join(BASE_PATH, 'temp', 'benchmark')
+        ) -> None:
+
+        self._frame_sizes = frame_sizes
+        self._frame_counts = frame_counts
+        self._resolution_scales = resolution_scales
+        self._core_counts = core_counts if core_counts is not None else sorted({1, os.cpu_count()})
+        self._stages = stages
+        self._repeats = max(1, repeats)
+
+        self._work_path = work_path
+        self._media_path = os.path.join(work_path, 'media')
+        self._output_path = os.path.join(work_path, 'output')
+
+        self._results = []
+
+    def run(self) -> dict:
+        os.makedirs(self._media_path, exist_ok=True)
+        os.makedirs(self._output_path, exist_ok=True)
+
+        self._results = []
+        run_start = time.time()
+
+        videos = self._create_videos()
+        images = self._create_images()
+
+        if STAGE_EXTRACT in self._stages:
+            for video in videos:
+                self._bench_extract(video)
+
+        if STAGE_IMAGE_CONVERT in self._stages:
+            for image in images:
+                for resolution_scale in self._resolution_scales:
+                    self._bench_image_convert(image, resolution_scale)
+
+        if STAGE_GLYPH_MAPPING in self._stages:
+            for image in images:
+                for resolution_scale in self._resolution_scales:
+                    self._bench_glyph_mapping(image, resolution_scale)
+
+        for video in videos:
+            for resolution_scale in self._resolution_scales:
+                if STAGE_VIDEO_CONVERT in self._stages:
+                    for num_cores in self._core_counts:
+                        self._bench_video_convert(video, resolution_scale, num_cores)
+
+                if STAGE_SAVE_RESULT in self._stages or STAGE_PLAYER_LOAD in self._stages:
+                    self._bench_outputs(video, resolution_scale)
+
+        return {
+            'benchmark_version':    BENCHMARK_VERSION,
+            'environment':          get_environment_info(),
+            'config': {
+                'frame_sizes':          self._frame_sizes,
+                'frame_counts':         self._frame_counts,
+                'resolution_scales':    self._resolution_scales,
+                'core_counts':          self._core_counts,
+                'repeats':              self._repeats
+            },
+            'total_time':           time.time() - run_start,
+            'results':              self._results
+        }
+
+    def clean_up(self) -> None:
+        shutil.rmtree(self._work_path, ignore_errors=True)
+
+    def _create_videos(self) -> list:
+        videos = []
+
+        for width, height in self._frame_sizes:
+            for frame_count in self._frame_counts:
+                video_name = f'synthetic_{width}x{height}_{frame_count}'
+                video_path = os.path.join(self._media_path, f'{video_name}.mp4')
+
+                # Generated media is deterministic, reuse it between runs
+                if not os.path.isfile(video_path):
+                    writer = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*'mp4v'), SYNTHETIC_FPS, (width, height))
+                    for frame_number in range(frame_count):
+                        writer.write(create_synthetic_frame(width, height, frame_number))
+                    writer.release()
+
+                videos.append({
+                    'name':     video_name,
+                    'path':     video_path,
+                    'size':     [width, height],
+                    'frames':   frame_count
+                })
+
+        return videos
+
+    def _create_images(self) -> list:
+        images = []
+
+        for width, height in self._frame_sizes:
+            image_paths = []
+            for image_number in range(IMAGES_PER_SIZE):
+                image_path = os.path.join(self._media_path, f'synthetic_{width}x{height}_{image_number}.png')
+                if not os.path.isfile(image_path):
+                    cv2.imwrite(image_path, create_synthetic_frame(width, height, image_number * 7))
+                image_paths.append(image_path)
+
+            images.append({
+                'name':     f'synthetic_{width}x{height}',
+                'paths':    image_paths,
+                'size':     [width, height],
+                'frames':   len(image_paths)
+            })
+
+        return images
+
+    def _bench_extract(self, video: dict) -> None:
+        extractor = VideoFramesExtractor(self._output_path)
+
+        def extract() -> None:
+            frames_dir = extractor.extract(video['path'])
+            extractor.close_vidcap()
+            shutil.rmtree(frames_dir)
+
+        self._add_result(STAGE_EXTRACT, video, self._measure(extract), video['frames'])
+
+    def _bench_image_convert(self, image: dict, resolution_scale: float) -> None:
+        convertor = ImgAsciiConvertor(resolution_scale, False)
+
+        def convert() -> None:
+            for image_path in image['paths']:
+                convertor.convert(image_path)
+
+        self._add_result(STAGE_IMAGE_CONVERT, image, self._measure(convert), image['frames'], resolution_scale)
+
+    def _bench_glyph_mapping(self, image: dict, resolution_scale: float) -> None:
+        # Block to glyph mapping alone on decoded images, brightness lookup against glyph shape matching
+        image_arrays = [cv2.imread(image_path, cv2.IMREAD_GRAYSCALE) for image_path in image['paths']]
+
+        for glyph_mode in GLYPH_MODES:
+            convertor = ImgAsciiConvertor(resolution_scale, False, glyph_mode=glyph_mode)
+
+            # Glyph bitmaps and lookup tables are built once per convertor, not per frame
+            convertor.get_glyph_indices(image_arrays[0])
+
+            def map_glyphs() -> None:
+                for image_array in image_arrays:
+                    convertor.get_glyph_indices(image_array)
+
+            self._add_result(
+                STAGE_GLYPH_MAPPING,
+                image,
+                self._measure(map_glyphs),
+                image['frames'],
+                resolution_scale,
+                glyph_mode=glyph_mode
+            )
+
+    def _bench_video_convert(self, video: dict, resolution_scale: float, num_cores: int) -> None:
+        # Every frame source of the convertor, temp files, streamed frames and sharded decoding
+        for decode_mode in DECODE_MODES:
+            convertor = VideoAsciiConvertor(
+                resolution_scale,
+                num_cores,
+                'j',
+                stream_frames=decode_mode == DECODE_STREAM,
+                sharded_decode=decode_mode == DECODE_SHARDED
+            )
+            convertor.set_output_path(self._output_path)
+
+            seconds = self._measure(lambda: convertor.convert(video['path']))
+            self._add_result(
+                STAGE_VIDEO_CONVERT,
+                video,
+                seconds,
+                video['frames'],
+                resolution_scale,
+                num_cores,
+                decode=decode_mode
+            )
+
+    def _bench_outputs(self, video: dict, resolution_scale: float) -> None:
+        # Frames are converted once, saving and loading are measured on the same data
+        image_convertor = ImgAsciiConvertor(resolution_scale, False)
+        glyph_frames = {}
+
+        vidcap = cv2.VideoCapture(video['path'])
+        while True:
+            success, image = vidcap.read()
+            if not success:
+                break
+            glyph_frames[len(glyph_frames) + 1] = image_convertor.get_glyph_indices(cv2.cvtColor(image, cv2.COLOR_BGR2GRAY))
+        vidcap.release()
+
+        for output_type in OUTPUT_TYPES:
+            convertor = VideoAsciiConvertor(resolution_scale, 1, output_type)
+            convertor.set_output_path(self._output_path)
+
+            result_paths = []
+            save_seconds = self._measure(
+                lambda: result_paths.append(convertor.save_glyph_frames(video['name'], SYNTHETIC_FPS, glyph_frames))
+            )
+
+            if STAGE_SAVE_RESULT in self._stages:
+                self._add_result(
+                    STAGE_SAVE_RESULT,
+                    video,
+                    save_seconds,
+                    len(glyph_frames),
+                    resolution_scale,
+                    output_type=OUTPUT_TYPES[output_type],
+                    file_size=os.path.getsize(result_paths[-1])
+                )
+
+            if STAGE_PLAYER_LOAD in self._stages:
+                self._bench_player_load(video, result_paths[-1], resolution_scale, OUTPUT_TYPES[output_type])
+
+            os.remove(result_paths[-1])
+
+    def _bench_player_load(self, video: dict, result_path: str, resolution_scale: float, output_type: str) -> None:
+        first_frame_times = []
+
+        def load() -> None:
+            load_start = time.perf_counter()
+            input_data = load_ascii_video(result_path)
+            frames = input_data['frames']
+
+            frame_number = input_data['first_frame']
+            frames[str(frame_number)]
+            first_frame_times.append(time.perf_counter() - load_start)
+
+            # Read every frame in playback order
+            while str(frame_number + 1) in frames:
+                frame_number += 1
+                frames[str(frame_number)]
+
+            frames.close()
+
+        self._add_result(
+            STAGE_PLAYER_LOAD,
+            video,
+            self._measure(load),
+            video['frames'],
+            resolution_scale,
+            output_type=output_type,
+            first_frame_time=min(first_frame_times)
+        )
+
+    def _measure(self, function: object) -> list:
+        seconds = []
+
+        for _ in range(self._repeats):
+            # Progress prints of the measured code are not part of the results
+            with contextlib.redirect_stdout(io.StringIO()):
+                measure_start = time.perf_counter()
+                function()
+                seconds.append(time.perf_counter() - measure_start)
+
+        return seconds
+
+    def _add_result(
+            self,
+            stage: str,
+            media: dict,
+            seconds: list,
+            frame_count: int,
+            resolution_scale: float = None,
+            num_cores: int = 1,
+            **extra: object
+        ) -> None:
+
+        # The fastest repeat is the least disturbed by the rest of the system
+        best_seconds = min(seconds)
+
+        result = {
+            'stage':            stage,
+            'media':            media['name'],
+            'size':             media['size'],
+            'frames':           frame_count,
+            'resolution':       resolution_scale,
+            'cores':            num_cores,
+            **extra,
+            'seconds':          best_seconds,
+            'all_seconds':      seconds,
+            'fps':              frame_count / max(best_seconds, 1e-9)
+        }
+        self._results.append(result)
+
+        print(f'{format_result_name(result):<80} {result["fps"]:>10.1f} fps')
+
+
+def create_synthetic_frame(width: int, height: int, frame_number: int) -> np.ndarray:
+    # Moving gradient, a moving circle and seeded noise, busy enough for realistic encoding and diffs
+    x_values = np.linspace(0, 255, width, dtype=np.float32)
+    y_values = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    gradient = ((x_values + y_values + frame_number * 4) % 256).astype(np.uint8)
+
+    frame = cv2.cvtColor(gradient, cv2.COLOR_GRAY2BGR)
+
+    center = (int(width / 2 + width / 3 * np.sin(frame_number / 10)), height // 2)
+    cv2.circle(frame, center, height // 4, (255, 200, 100), -1)
+
+    noise = np.random.default_rng(SYNTHETIC_SEED + frame_number).integers(0, 32, frame.shape, dtype=np.uint8)
+
+    return cv2.add(frame, noise)
+
+
+def get_environment_info() -> dict:
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'],
+            cwd=BASE_PATH,
+            capture_output=True,
+            text=True
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+
+    return {
+        'commit':       commit,
+        'time':         time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'platform':     platform.platform(),
+        'processor':    platform.processor(),
+        'cpu_count':    os.cpu_count(),
+        'python':       sys.version.split()[0],
+        'numpy':        np.__version__,
+        'opencv':       cv2.__version__
+    }
+
+
+def format_result_name(result: dict) -> str:
+    name_parts = [result['stage'], result['media']]
+
+    if result['resolution'] is not None:
+        name_parts.append(f'scale {result["resolution"]}')
+    if result['stage'] == STAGE_VIDEO_CONVERT:
+        name_parts.append(f'{result["cores"]} cores')
+        name_parts.append(result['decode'])
+    if 'output_type' in result:
+        name_parts.append(result['output_type'])
+    if 'glyph_mode' in result:
+        name_parts.append(result['glyph_mode'])
+
+    return ' | '.join(name_parts)
+
+
+def compare_results(baseline: dict, current: dict, tolerance: float = DEFAULT_REGRESSION_TOLERANCE) -> list:
+    # Returns (name, baseline fps, current fps) of every result slower than the baseline by more than the tolerance
+    baseline_fps = {format_result_name(result): result['fps'] for result in baseline['results']}
+    regressions = []
+
+    for result in current['results']:
+        result_name = format_result_name(result)
+        if result_name not in baseline_fps:
+            continue
+
+        if result['fps'] < baseline_fps[result_name] * (1 - tolerance):
+            regressions.append((result_name, baseline_fps[result_name], result['fps']))
+
+    return regressions
@@ -0,0 +1,189 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+
+
+BASE_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+DEFAULT_CACHE_PATH = os.path.join(BASE_PATH, 'cache')
+DEFAULT_CACHE_SIZE = 1024 ** 3
+
+CACHE_INDEX_FILE = 'index.json'
+HASH_CHUNK_SIZE = 1024 ** 2
+
+# Content hashes kept in the index, the least recently used input files are hashed again when needed
+MAX_HASHED_FILES = 4096
+
+
+class ConversionCache:
+    def __init__(self, cache_path: str = DEFAULT_CACHE_PATH, max_size: int = DEFAULT_CACHE_SIZE) -> None:
+        self._cache_path = cache_path
+        self._max_size = max_size
+        self._index_path = os.path.join(cache_path, CACHE_INDEX_FILE)
+
+        os.makedirs(cache_path, exist_ok=True)
+
+        # Entries by key + content hashes of input files by path (with the size and mtime they were hashed at)
+        self._index = self._load_index()
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+        self._lock = threading.Lock()
+
+    def __getstate__(self) -> dict:
+        # Locks can't be pickled, child processes get their own
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def get_key(self, input_path: str, params: dict) -> str:
+        key_data = json.dumps({'content': self._get_content_hash(input_path), **params}, sort_keys=True)
+        return hashlib.sha256(key_data.encode('utf-8')).hexdigest()
+
+    def get_path(self, key: str) -> str:
+        # Returns the cached file of a key or None, a hit makes the entry most recently used
+        with self._lock:
+            entry = self._index['entries'].get(key)
+            cached_path = os.path.join(self._cache_path, entry['file']) if entry is not None else None
+
+            if cached_path is None or not os.path.isfile(cached_path):
+                self._index['entries'].pop(key, None)
+                self._misses += 1
+                return None
+
+            entry['last_access'] = time.time()
+            self._hits += 1
+            self._save_index()
+
+            return cached_path
+
+    def copy_to(self, key: str, output_path: str) -> bool:
+        cached_path = self.get_path(key)
+        if cached_path is None:
+            return False
+
+        shutil.copyfile(cached_path, output_path)
+        return True
+
+    def put(self, key: str, source_path: str) -> None:
+        with open(source_path, 'rb') as source_file:
+            self.put_bytes(key, source_file.read(), os.path.splitext(source_path)[1])
+
+    def put_bytes(self, key: str, data: bytes, extension: str) -> None:
+        # Entries bigger than the whole cache are never stored
+        if len(data) > self._max_size:
+            return
+
+        with self._lock:
+            entry_file = f'{key}{extension}'
+            with open(os.path.join(self._cache_path, entry_file), 'wb') as entry:
+                entry.write(data)
+
+            self._index['entries'][key] = {
+                'file':         entry_file,
+                'size':         len(data),
+                'last_access':  time.time()
+            }
+
+            self._evict()
+            self._save_index()
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                'hits':         self._hits,
+                'misses':       self._misses,
+                'evictions':    self._evictions,
+                'entries':      len(self._index['entries']),
+                'size':         self._get_size(),
+                'max_size':     self._max_size
+            }
+
+    def get_stats_line(self) -> str:
+        stats = self.get_stats()
+        return (
+            f'Cache: {stats["hits"]} hits | {stats["misses"]} misses | {stats["evictions"]} evicted | '
+            f'{stats["size"] / 1024 ** 2:.1f}/{stats["max_size"] / 1024 ** 2:.1f}MB used'
+        )
+
+    def _get_content_hash(self, input_path: str) -> str:
+        # Hashes are reused while the file keeps its size and modification time
+        file_stat = os.stat(input_path)
+        file_path = os.path.abspath(input_path)
+        hashes = self._index['hashes']
+
+        with self._lock:
+            file_hash = hashes.pop(file_path, None)
+
+            # Reinserted so the most recently used files are the last ones to be dropped
+            if file_hash is not None and (file_hash['size'], file_hash['mtime']) == (file_stat.st_size, file_stat.st_mtime_ns):
+                hashes[file_path] = file_hash
+                return file_hash['hash']
+
+        content_hash = hashlib.sha256()
+        with open(input_path, 'rb') as input_file:
+            for chunk in iter(lambda: input_file.read(HASH_CHUNK_SIZE), b''):
+                content_hash.update(chunk)
+
+        # A changed file replaces its old hash, the index is saved with the next entry or hit
+        with self._lock:
+            hashes[file_path] = {
+                'size':     file_stat.st_size,
+                'mtime':    file_stat.st_mtime_ns,
+                'hash':     content_hash.hexdigest()
+            }
+
+            while len(hashes) > MAX_HASHED_FILES:
+                del hashes[next(iter(hashes))]
+
+        return content_hash.hexdigest()
+
+    def _evict(self) -> None:
+        # Remove least recently used entries until the cache fits its size limit
+        entries = self._index['entries']
+
+        while self._get_size() > self._max_size and entries:
+            key = min(entries, key=lambda entry_key: entries[entry_key]['last_access'])
+            entry = entries.pop(key)
+
+            entry_path = os.path.join(self._cache_path, entry['file'])
+            if os.path.isfile(entry_path):
+                os.remove(entry_path)
+
+            self._evictions += 1
+
+    def _get_size(self) -> int:
+        return sum(entry['size'] for entry in self._index['entries'].values())
+
+    def _load_index(self) -> dict:
+        if os.path.isfile(self._index_path):
+            try:
+                with open(self._index_path, 'r') as index_file:
+                    index = json.load(index_file)
+
+                # Hashes of older indexes were keyed by path, size and mtime, they are hashed again
+                index['hashes'] = {
+                    file_path: file_hash for file_path, file_hash in index['hashes'].items() if isinstance(file_hash, dict)
+                }
+                return index
+            except (OSError, ValueError, KeyError, AttributeError):
+                pass
+
+        return {'entries': {}, 'hashes': {}}
+
+    def _save_index(self) -> None:
+        # Write to a temp file first so a crash never leaves a broken index
+        temp_path = f'{self._index_path}.tmp'
+        with open(temp_path, 'w') as index_file:
+            json.dump(self._index, index_file)
+
+        os.replace(temp_path, self._index_path)
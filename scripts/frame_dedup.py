@@ -0,0 +1,107 @@
+from __future__ import annotations
+import hashlib
+from collections import OrderedDict
+from scripts.lazy_import import lazy_import
+
+np = lazy_import('numpy')
+
+
+# Block mean difference (gray levels) a cell of a near duplicate may have without counting as changed
+DUPLICATE_CELL_TOLERANCE = 8
+
+# Recently stored frames an exact duplicate can point at, catches slides that come back
+DUPLICATE_HISTORY_FRAMES = 16
+
+
+class DuplicateFrameDetector:
+    def __init__(
+            self,
+            threshold: float = 0.0,
+            cell_tolerance: int = DUPLICATE_CELL_TOLERANCE,
+            history_frames: int = DUPLICATE_HISTORY_FRAMES
+        ) -> None:
+
+        # Share of cells that may change for a frame to still count as a duplicate, 0 only matches identical frames
+        self._threshold = max(0.0, threshold)
+        self._cell_tolerance = cell_tolerance
+        self._history_frames = max(1, history_frames)
+
+        # Block hash -> frame number of recently stored frames
+        self._history = OrderedDict()
+
+        # Last stored frame, near duplicates are only compared against it
+        self._reference_number = None
+        self._reference_means = None
+        self._reference_colors = None
+        self._reference_glyphs = None
+
+    def find_reference(
+            self,
+            frame_number: int,
+            block_sums: np.ndarray,
+            block_area: int,
+            colors: np.ndarray = None,
+            glyph_indices: np.ndarray = None
+        ) -> int:
+
+        # Returns the number of an earlier frame this one duplicates, None when the frame has to be stored
+        # Glyphs picked by the block pixels (structure mode) are passed in, equal block sums do not mean equal glyphs there
+        frame_hash = self._get_hash(block_sums, colors, glyph_indices)
+
+        if frame_hash in self._history:
+            self._history.move_to_end(frame_hash)
+            return self._history[frame_hash]
+
+        block_means = block_sums // block_area
+        if self._is_near_duplicate(block_means, colors, glyph_indices):
+            return self._reference_number
+
+        self._store_reference(frame_number, frame_hash, block_means, colors, glyph_indices)
+
+        return None
+
+    def _is_near_duplicate(self, block_means: np.ndarray, colors: np.ndarray = None, glyph_indices: np.ndarray = None) -> bool:
+        if self._threshold <= 0 or self._reference_means is None or block_means.shape != self._reference_means.shape:
+            return False
+
+        changed_cells = np.abs(block_means - self._reference_means) > self._cell_tolerance
+
+        # Colors are quantized already, any difference is a changed cell
+        if colors is not None:
+            changed_colors = colors != self._reference_colors
+            changed_cells |= changed_colors if changed_colors.ndim == 2 else changed_colors.any(axis=2)
+
+        # A block with the same mean can still have turned into another shape
+        if glyph_indices is not None and self._reference_glyphs is not None:
+            changed_cells |= glyph_indices != self._reference_glyphs
+
+        return np.count_nonzero(changed_cells) <= self._threshold * changed_cells.size
+
+    def _store_reference(
+            self,
+            frame_number: int,
+            frame_hash: bytes,
+            block_means: np.ndarray,
+            colors: np.ndarray = None,
+            glyph_indices: np.ndarray = None
+        ) -> None:
+
+        self._history[frame_hash] = frame_number
+        if len(self._history) > self._history_frames:
+            self._history.popitem(last=False)
+
+        self._reference_number = frame_number
+        self._reference_means = block_means
+        self._reference_colors = colors
+        self._reference_glyphs = glyph_indices
+
+    def _get_hash(self, block_sums: np.ndarray, colors: np.ndarray = None, glyph_indices: np.ndarray = None) -> bytes:
+        # Hashing the block sums before the glyph mapping, or the glyphs themselves when they depend on more than the sums
+        hashed_values = block_sums if glyph_indices is None else glyph_indices
+        frame_hash = hashlib.blake2b(np.ascontiguousarray(hashed_values).tobytes(), digest_size=16)
+        frame_hash.update(str(hashed_values.shape).encode('ascii'))
+
+        if colors is not None:
+            frame_hash.update(np.ascontiguousarray(colors).tobytes())
+
+        return frame_hash.digest()
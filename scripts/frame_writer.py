@@ -0,0 +1,289 @@
+from __future__ import annotations
+import os
+import json
+import pickle
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable
+from scripts.ascii_color import encode_colors
+from scripts.ascii_video_codec import DeltaFrameEncoder, encode_delta_frame
+from scripts.ascii_video_file import AsciiVideoWriter
+from scripts.lazy_import import lazy_import
+
+np = lazy_import('numpy')
+
+
+# Frames converted but not yet written, the converting side waits for a free slot before sending more
+DEFAULT_REORDER_WINDOW = 64
+
+# Stored frames kept to resolve references of delta encoded output (references to older frames are written in full)
+DEFAULT_REFERENCE_HISTORY = 64
+
+# Pickle output is assembled from single pickled values, protocol 3 memoizes with explicit indices
+PICKLE_PROTOCOL = 3
+
+
+class IncrementalFrameWriter:
+    def __init__(
+            self,
+            frame_sink: object,
+            first_frame: int = 1,
+            keyframe_interval: int = 0,
+            reference_history: int = DEFAULT_REFERENCE_HISTORY
+        ) -> None:
+
+        # Frames arrive in any order and go to the sink in frame order as soon as the next one is there
+        self._frame_sink = frame_sink
+        self._next_number = first_frame
+        self._pending_frames = {}
+
+        # Delta chains skip references, with delta encoding a reference has to repeat the previous stored frame
+        self._resolve_references = keyframe_interval > 0
+        self._reference_history = max(1, reference_history)
+        self._stored_frames = OrderedDict()
+        self._previous_number = None
+
+        self._written_frames = 0
+
+    def add(self, frame_number: int, frame_value: object, colors: np.ndarray = None) -> int:
+        # Frame value is the glyph index array or the number of the frame a duplicate repeats
+        # Returns how many frames were written, every written frame frees a slot of the reorder window
+        self._pending_frames[frame_number] = (frame_value, colors)
+
+        return self._write_pending()
+
+    def skip_missing(self) -> int:
+        # Frames that will never arrive (crashed worker) are skipped up to the next pending one
+        if not self._pending_frames:
+            return 0
+
+        skipped_frames = min(self._pending_frames) - self._next_number
+        self._next_number += skipped_frames
+
+        return skipped_frames + self._write_pending()
+
+    def close(self) -> None:
+        # Whatever is left is written in order, missing frames stay missing
+        for frame_number in sorted(self._pending_frames):
+            self._write_frame(frame_number, *self._pending_frames[frame_number])
+
+        self._pending_frames = {}
+        self._frame_sink.close()
+
+    def get_pending_count(self) -> int:
+        return len(self._pending_frames)
+
+    def get_written_count(self) -> int:
+        return self._written_frames
+
+    def _write_pending(self) -> int:
+        written_frames = 0
+
+        while self._next_number in self._pending_frames:
+            self._write_frame(self._next_number, *self._pending_frames.pop(self._next_number))
+            self._next_number += 1
+            written_frames += 1
+
+        return written_frames
+
+    def _write_frame(self, frame_number: int, frame_value: object, colors: np.ndarray = None) -> None:
+        self._written_frames += 1
+
+        if isinstance(frame_value, int) and self._resolve_references:
+            frame_value, colors = self._resolve_reference(frame_value, colors)
+
+        if isinstance(frame_value, int):
+            self._frame_sink.write_reference(frame_number, frame_value)
+            return
+
+        self._frame_sink.write_frame(frame_number, frame_value, colors)
+
+        if self._resolve_references:
+            self._stored_frames[frame_number] = (frame_value, colors)
+            if len(self._stored_frames) > self._reference_history:
+                self._stored_frames.popitem(last=False)
+            self._previous_number = frame_number
+
+    def _resolve_reference(self, reference_number: int, colors: np.ndarray = None) -> tuple:
+        # Same rules as resolve_references: the previous stored frame or an equal one stays a reference
+        if reference_number == self._previous_number:
+            return reference_number, None
+
+        if reference_number not in self._stored_frames:
+            raise RuntimeError(f'Frame {reference_number} left the reference history before a duplicate of it was written')
+
+        self._stored_frames.move_to_end(reference_number)
+        target_value, target_colors = self._stored_frames[reference_number]
+        previous_value, previous_colors = self._stored_frames[self._previous_number]
+
+        if np.array_equal(target_value, previous_value) and (
+                target_colors is None or np.array_equal(target_colors, previous_colors)):
+            return self._previous_number, None
+
+        return target_value, target_colors
+
+
+class TextFrameSink(ABC):
+    def __init__(
+            self,
+            path: str,
+            get_header: Callable[[int], dict],
+            glyph_indices_to_rows: Callable[[np.ndarray], list],
+            keyframe_interval: int = 0
+        ) -> None:
+
+        # Writes a .json/.pkl output frame by frame, readable like one dumped at once
+        self._path = path
+        self._get_header = get_header
+        self._glyph_indices_to_rows = glyph_indices_to_rows
+        self._encoder = DeltaFrameEncoder(keyframe_interval) if keyframe_interval > 0 else None
+
+        self._file = None
+
+    def write_frame(self, frame_number: int, glyph_indices: np.ndarray, colors: np.ndarray = None) -> None:
+        frame_rows = self._glyph_indices_to_rows(glyph_indices)
+        frame_value = frame_rows if self._encoder is None else encode_delta_frame(self._encoder, frame_rows)
+
+        if colors is not None:
+            # Colored frames are objects holding the rows (or delta runs) and the base64 colors
+            frame_value = {
+                **(frame_value if isinstance(frame_value, dict) else {'rows': frame_value}),
+                'colors': encode_colors(colors)
+            }
+
+        self._write_value(frame_number, frame_value)
+
+    def write_reference(self, frame_number: int, reference_number: int) -> None:
+        self._write_value(frame_number, reference_number)
+
+    def __enter__(self) -> TextFrameSink:
+        return self
+
+    def __exit__(self, exc_type: type, *exc_info: object) -> None:
+        # Outputs cut off by an error can not be read, they are removed
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+    def close(self) -> None:
+        # Outputs without frames still get their header
+        if self._file is None:
+            self._open(1)
+        elif self._file.closed:
+            return
+
+        self._write_end()
+        self._file.close()
+
+    def discard(self) -> None:
+        if self._file is None or self._file.closed:
+            return
+
+        self._file.close()
+        os.remove(self._path)
+
+    def _write_value(self, frame_number: int, frame_value: object) -> None:
+        # The first frame written is the first frame of the output
+        if self._file is None:
+            self._open(frame_number)
+            self._write_item(str(frame_number), frame_value, True)
+            return
+
+        self._write_item(str(frame_number), frame_value, False)
+
+    def _open(self, first_frame: int) -> None:
+        self._file = open(self._path, 'wb')
+        self._write_start(self._get_header(first_frame))
+
+    @abstractmethod
+    def _write_start(self, header: dict) -> None:
+        pass
+
+    @abstractmethod
+    def _write_item(self, frame_key: str, frame_value: object, is_first: bool) -> None:
+        pass
+
+    @abstractmethod
+    def _write_end(self) -> None:
+        pass
+
+
+class JsonFrameSink(TextFrameSink):
+    # Same separators as json.dump, lazy readers find the frame keys by their '": ' suffix
+    def _write_start(self, header: dict) -> None:
+        self._file.write(json.dumps(header)[:-1].encode('ascii'))
+        self._file.write(b', "frames": {' if header else b'"frames": {')
+
+    def _write_item(self, frame_key: str, frame_value: object, is_first: bool) -> None:
+        if not is_first:
+            self._file.write(b', ')
+
+        self._file.write(f'{json.dumps(frame_key)}: {json.dumps(frame_value)}'.encode('ascii'))
+
+    def _write_end(self) -> None:
+        self._file.write(b'}}')
+
+
+class PickleFrameSink(TextFrameSink):
+    # One pickled dict built from opcodes: every header item and frame is set on it as soon as it is written
+    def _write_start(self, header: dict) -> None:
+        self._file.write(pickle.PROTO + bytes([PICKLE_PROTOCOL]) + pickle.EMPTY_DICT)
+
+        for key, value in header.items():
+            self._file.write(_pickle_value(key) + _pickle_value(value) + pickle.SETITEM)
+
+        self._file.write(_pickle_value('frames') + pickle.EMPTY_DICT)
+
+    def _write_item(self, frame_key: str, frame_value: object, is_first: bool) -> None:
+        self._file.write(_pickle_value(frame_key) + _pickle_value(frame_value) + pickle.SETITEM)
+
+    def _write_end(self) -> None:
+        # Sets the frames dict on the output dict
+        self._file.write(pickle.SETITEM + pickle.STOP)
+
+
+class BinaryFrameSink:
+    def __init__(self, create_writer: Callable[[int, int, int], AsciiVideoWriter]) -> None:
+        # The .ascv writer needs the frame size and first frame, it is created with the first frame
+        self._create_writer = create_writer
+        self._writer = None
+
+    def write_frame(self, frame_number: int, glyph_indices: np.ndarray, colors: np.ndarray = None) -> None:
+        if self._writer is None:
+            self._writer = self._create_writer(*glyph_indices.shape, frame_number)
+
+        self._writer.write_frame(glyph_indices, colors, frame_number)
+
+    def write_reference(self, frame_number: int, reference_number: int) -> None:
+        # The frame size comes from the first stored frame, a reference can not open the output
+        if self._writer is None:
+            raise ValueError(f'Frame {frame_number} repeats frame {reference_number}, the first frame written has to be stored')
+
+        self._writer.write_reference(reference_number, frame_number)
+
+    def __enter__(self) -> BinaryFrameSink:
+        return self
+
+    def __exit__(self, exc_type: type, *exc_info: object) -> None:
+        # The writer removes its file when writing failed
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+
+    def discard(self) -> None:
+        if self._writer is not None:
+            self._writer.discard()
+
+    def get_compression_ratio(self) -> float:
+        return self._writer.get_compression_ratio() if self._writer is not None else 1.0
+
+
+def _pickle_value(value: object) -> bytes:
+    # Pickled value without the protocol and stop opcodes, its memo indices only refer to itself
+    return pickle.dumps(value, PICKLE_PROTOCOL)[2:-1]
@@ -1,26 +1,98 @@
+from __future__ import annotations
+import io
 import os
 import json
 import scripts.ui as ui
-import numpy as np
-from PIL import Image, ImageOps
+from scripts.conversion_cache import ConversionCache
+from scripts.ascii_color import COLOR_NONE, quantize_colors, encode_colors, decode_colors, colorize_rows
+from scripts.lazy_import import lazy_import
+
+np = lazy_import('numpy')
+Image = lazy_import('PIL.Image')
+ImageOps = lazy_import('PIL.ImageOps')
+ImageDraw = lazy_import('PIL.ImageDraw')
+ImageFont = lazy_import('PIL.ImageFont')
 
 
 BASE_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 
+# Bump when the step calculation or the glyph mapping changes, invalidates cached conversions
+CONVERSION_VERSION = 1
+
+# Glyphs picked by the block brightness only, or by the best matching glyph shape
+GLYPH_MODE_BRIGHTNESS = 'brightness'
+GLYPH_MODE_STRUCTURE = 'structure'
+
+GLYPH_MODES = [GLYPH_MODE_BRIGHTNESS, GLYPH_MODE_STRUCTURE]
+
+GLYPH_MODE_OPTIONS = {
+    'b': GLYPH_MODE_BRIGHTNESS,
+    's': GLYPH_MODE_STRUCTURE
+}
+
+# Charsets are ordered from dark to bright, the structure one favours lines and edges over letters
+DEFAULT_CHARSET = ' .\'`^",:;Il!i><~+_-?]}[{1)(|\/tfjrxnuvczXYUJCLQ0OZmwqpdbkhao*#MW&8%B@$'
+STRUCTURE_CHARSET = ' .`\',-_~:;^"!|/\\()<>=+*#'
+
+# Glyphs are rendered at this font size once and scaled down to the block size
+GLYPH_RENDER_SIZE = 24
+
+# Blocks with a lower pixel standard deviation have no shape worth matching, their brightness picks the glyph
+STRUCTURE_MIN_CONTRAST = 12.0
+
+# Smaller blocks (high resolution scales) can not tell glyph shapes apart
+STRUCTURE_MIN_BLOCK_AREA = 4
+
 class ImgAsciiConvertor:
-    def __init__(self, resolution_scale: float, output_to_file: bool, print_output: bool = False) -> None:
+    def __init__(
+            self,
+            resolution_scale: float,
+            output_to_file: bool,
+            print_output: bool = False,
+            cache: ConversionCache = None,
+            color_mode: str = COLOR_NONE,
+            glyph_mode: str = GLYPH_MODE_BRIGHTNESS,
+            charset: str = None
+        ) -> None:
+
+        if glyph_mode not in GLYPH_MODES:
+            raise ValueError(f'Unsupported glyph mode {glyph_mode}')
+
         self._resolution_scale = resolution_scale
         self._output_to_file = output_to_file
         self._print_output = print_output
 
-        self._grayscale_chars = ' .\'`^",:;Il!i><~+_-?]}[{1)(|\/tfjrxnuvczXYUJCLQ0OZmwqpdbkhao*#MW&8%B@$'
+        # Average color of every cell is kept next to the glyphs unless the mode is none
+        self._color_mode = color_mode
+
+        # Converted images are looked up here before converting, None disables caching
+        self._cache = cache
+
+        # Structure mode compares every block against the glyph bitmaps, brightness mode only its mean
+        self._glyph_mode = glyph_mode
+
+        if charset is None:
+            charset = STRUCTURE_CHARSET if glyph_mode == GLYPH_MODE_STRUCTURE else DEFAULT_CHARSET
+        validate_charset(charset)
+
+        self._grayscale_chars = charset
+
+        # Glyph index -> glyph byte, built on first use so cache hits never load numpy
+        self._grayscale_bytes = None
+
+        # Glyph lookup tables keyed by block area (block pixel sum -> glyph index)
+        self._block_sum_luts = {}
+
+        # Glyph bitmaps, rendered on first use, and their matrices keyed by block size (y step, x step)
+        self._glyph_bitmaps = None
+        self._glyph_matrices = {}
 
         self._input_path = os.path.join(BASE_PATH, 'input\\img_ascii')
         self._output_path = os.path.join(BASE_PATH, 'output\\img_ascii')
 
     def convert_input_files(self) -> None:
         for file in os.listdir(self._input_path):
-            self.convert(file)
+            self.convert(os.path.join(self._input_path, file))
 
     def convert(self, image_path: str, print_message: bool = False) -> list:
         if not os.path.isfile(image_path):
@@ -29,68 +101,317 @@ class ImgAsciiConvertor:
         if print_message:
             print(f'Converting {os.path.basename(image_path)} to ascii...')
 
-        with Image.open(image_path) as base_image:
-            image = ImageOps.grayscale(base_image)
-            image_array = np.array(image)
+        output_ascii = None
+        output_colors = None
+        if self._cache is not None:
+            cache_key = self._cache.get_key(image_path, self.get_cache_params())
+            cached_path = self._cache.get_path(cache_key)
 
-        image_size = image_array.shape
-        x_step = int(image_size[0] / (image_size[0] * np.clip(self._resolution_scale, 0.0, 1.0)))
-        y_step = int(image_size[1] / (image_size[1] * np.clip(self._resolution_scale, 0.0, 1.0)))
+            if cached_path is not None:
+                with open(cached_path, 'r') as cached_file:
+                    output_ascii, output_colors = self._load_cached_result(json.load(cached_file))
 
-        # Lower sampling in the vertical direction to avoid stretching
-        y_step = int(y_step * (1.5 + self._resolution_scale))
+        if output_ascii is None:
+            output_ascii, output_colors = self.convert_image_data(image_path)
+
+            if self._cache is not None:
+                self._cache.put_bytes(cache_key, json.dumps(self._get_result_data(output_ascii, output_colors)).encode('utf-8'), '.json')
 
-        output_ascii = []
-
-        for y in range(0, image_size[0] - y_step, y_step):
-            # Build row string
-            output_row = ''
-            for x in range(0, image_size[1] - x_step, x_step):
-                pixel_chunk = image_array[y:(y + y_step), x:(x + x_step)]
-                average_color_value = np.mean(pixel_chunk)
-                ascii_char = self._convert_gray_to_ascii(average_color_value)
-                output_row += ascii_char
-            
-            # Add the row string to output
-            output_ascii.append(output_row)
-        
         if self._output_to_file:
             result_filename = f'{os.path.basename(image_path).split(".")[0]}'
-            result_path = self._save_result(output_ascii, result_filename)
+            result_path = self.save_result(output_ascii, result_filename, output_colors)
 
         if print_message:
             outro_lines = ['CONVERSION FINISHED']
             if self._output_to_file:
                 outro_lines.append(f' -> Output file: {result_path}')
 
+            if self._cache is not None:
+                outro_lines.append(f' -> {self._cache.get_stats_line()}')
+
             ui.print_lines(outro_lines, seperate_chunk=True)
 
         if self._print_output:
-            self.print_result(output_ascii)
+            self.print_result(output_ascii, output_colors)
 
         return output_ascii
     
+    def convert_image_data(self, image_data: object) -> tuple:
+        # Rows + block colors (None without colors) of an image path, encoded image bytes or a pixel array
+        with open_image(image_data) as image:
+            image_array = np.array(ImageOps.grayscale(image))
+            color_array = np.array(image.convert('RGB')) if self.has_colors() else None
+
+        output_colors = self.get_block_colors(color_array) if color_array is not None else None
+
+        return self.convert_image_array(image_array), output_colors
+
+    def load_image_array(self, image_path: str) -> np.ndarray:
+        with Image.open(image_path) as base_image:
+            image = ImageOps.grayscale(base_image)
+            return np.array(image)
+
+    def load_image_arrays(self, image_path: str) -> tuple:
+        # Grayscale and rgb arrays of one image, read once
+        with Image.open(image_path) as base_image:
+            return np.array(ImageOps.grayscale(base_image)), np.array(base_image.convert('RGB'))
+
+    def convert_image_array(self, image_array: np.ndarray) -> list:
+        glyph_indices = self.get_glyph_indices(image_array)
+        return self.glyph_indices_to_rows(glyph_indices)
+
+    def get_glyph_indices(self, image_array: np.ndarray, block_sums: np.ndarray = None) -> np.ndarray:
+        # Block sums already computed for the image can be passed in
+        if block_sums is None:
+            block_sums, block_area = self.get_block_sums(image_array)
+        else:
+            x_step, y_step = self._get_steps(image_array.shape)
+            block_area = x_step * y_step
+
+        glyph_indices = self._get_block_sum_lut(block_area)[block_sums]
+
+        if self.matches_glyph_structure(block_area):
+            self._match_glyph_structure(image_array, block_sums, glyph_indices)
+
+        return glyph_indices
+
+    def get_block_sums(self, image_array: np.ndarray) -> tuple:
+        # Pixel sum of every cell block + the block area, everything the glyph mapping needs
+        x_step, y_step = self._get_steps(image_array.shape)
+        rows, cols = self.get_output_shape(image_array.shape)
+
+        # Crop to whole blocks and sum every block in one reduction
+        blocks = image_array[:rows * y_step, :cols * x_step].reshape(rows, y_step, cols, x_step)
+        block_sums = blocks.sum(axis=(1, 3), dtype=np.int64)
+
+        return block_sums, x_step * y_step
+
+    def get_block_colors(self, rgb_array: np.ndarray) -> np.ndarray:
+        # Same blocks as the glyphs, the average color of each quantized to the color mode
+        x_step, y_step = self._get_steps(rgb_array.shape)
+        rows, cols = self.get_output_shape(rgb_array.shape)
+
+        blocks = rgb_array[:rows * y_step, :cols * x_step].reshape(rows, y_step, cols, x_step, 3)
+        block_area = x_step * y_step
+        block_colors = (blocks.sum(axis=(1, 3), dtype=np.int64) + block_area // 2) // block_area
+
+        return quantize_colors(block_colors, self._color_mode)
+
+    def glyph_indices_to_rows(self, glyph_indices: np.ndarray) -> list:
+        if self._grayscale_bytes is None:
+            self._grayscale_bytes = np.frombuffer(self._grayscale_chars.encode('ascii'), dtype=np.uint8)
+
+        glyph_bytes = self._grayscale_bytes[glyph_indices]
+        return [row.tobytes().decode('ascii') for row in glyph_bytes]
+
+    def get_output_shape(self, image_size: tuple) -> tuple:
+        x_step, y_step = self._get_steps(image_size)
+
+        # Only whole blocks that end before the last pixel are converted
+        rows = max(0, (image_size[0] - 1) // y_step)
+        cols = max(0, (image_size[1] - 1) // x_step)
+
+        return rows, cols
+
+    def get_resolution_scale(self) -> float:
+        return self._resolution_scale
+
+    def get_grayscale_chars(self) -> str:
+        return self._grayscale_chars
+
+    def get_color_mode(self) -> str:
+        return self._color_mode
+
+    def get_glyph_mode(self) -> str:
+        return self._glyph_mode
+
+    def matches_glyph_structure(self, block_area: int) -> bool:
+        # Glyphs of these blocks depend on the block pixels, not only on the block sums
+        return self._glyph_mode == GLYPH_MODE_STRUCTURE and block_area >= STRUCTURE_MIN_BLOCK_AREA
+
+    def outputs_to_file(self) -> bool:
+        return self._output_to_file
+
+    def has_colors(self) -> bool:
+        return self._color_mode != COLOR_NONE
+
+    def get_cache_params(self) -> dict:
+        # Everything besides the input content that changes the conversion result
+        return {
+            'resolution':   self._resolution_scale,
+            'charset':      self._grayscale_chars,
+            'color_mode':   self._color_mode,
+            'glyph_mode':   self._glyph_mode,
+            'version':      CONVERSION_VERSION
+        }
+
     def set_resolution_scale(self, resolution_scale: float) -> None:
         self._resolution_scale = resolution_scale
 
+    def set_output_path(self, output_path: str) -> None:
+        self._output_path = output_path
+
+    def _get_steps(self, image_size: tuple) -> tuple:
+        x_step = int(image_size[0] / (image_size[0] * np.clip(self._resolution_scale, 0.0, 1.0)))
+        y_step = int(image_size[1] / (image_size[1] * np.clip(self._resolution_scale, 0.0, 1.0)))
+
+        # Lower sampling in the vertical direction to avoid stretching
+        y_step = int(y_step * (1.5 + self._resolution_scale))
+
+        return x_step, y_step
+
+    def _get_block_sum_lut(self, block_area: int) -> np.ndarray:
+        if block_area not in self._block_sum_luts:
+            # Same mean -> index mapping as _convert_gray_to_ascii for every possible block sum
+            average_values = np.arange(block_area * 255 + 1, dtype=np.float64) / block_area
+            index_values = np.rint((average_values / 256) * (len(self._grayscale_chars) - 1))
+            self._block_sum_luts[block_area] = index_values.astype(np.uint8)
+
+        return self._block_sum_luts[block_area]
+
+    def _match_glyph_structure(self, image_array: np.ndarray, block_sums: np.ndarray, glyph_indices: np.ndarray) -> None:
+        # Replaces the brightness glyphs of contrasted blocks with the glyph of the most similar shape
+        x_step, y_step = self._get_steps(image_array.shape)
+        rows, cols = block_sums.shape
+        block_area = x_step * y_step
+
+        glyph_matrix, matrix_indices = self._get_glyph_matrix(y_step, x_step)
+        if len(matrix_indices) == 0:
+            return
+
+        # One row of pixels per block, centered on the block mean
+        blocks = image_array[:rows * y_step, :cols * x_step].reshape(rows, y_step, cols, x_step)
+        block_vectors = blocks.transpose(0, 2, 1, 3).reshape(rows * cols, block_area).astype(np.float32)
+        block_vectors -= (block_sums.reshape(-1, 1) / block_area).astype(np.float32)
+
+        contrasted = np.einsum('ij,ij->i', block_vectors, block_vectors) >= STRUCTURE_MIN_CONTRAST ** 2 * block_area
+        if not contrasted.any():
+            return
+
+        # Glyph vectors are centered and normalized, the block norm does not change the best match of a block
+        block_vectors = block_vectors[contrasted]
+        best_glyphs = np.argmax(block_vectors @ glyph_matrix, axis=1)
+
+        glyph_indices.reshape(-1)[contrasted] = matrix_indices[best_glyphs]
+
+    def _get_glyph_matrix(self, y_step: int, x_step: int) -> tuple:
+        # (block area, glyphs) matrix of the glyph bitmaps scaled to the block size + the charset index of every column
+        block_size = (y_step, x_step)
+
+        if block_size not in self._glyph_matrices:
+            if self._glyph_bitmaps is None:
+                self._glyph_bitmaps = _render_glyph_bitmaps(self._grayscale_chars)
+
+            glyph_vectors = np.array([
+                np.asarray(bitmap.resize((x_step, y_step), Image.BOX), dtype=np.float32).reshape(-1)
+                for bitmap in self._glyph_bitmaps
+            ])
+            glyph_vectors -= glyph_vectors.mean(axis=1, keepdims=True)
+            glyph_norms = np.linalg.norm(glyph_vectors, axis=1)
+
+            # Glyphs without a shape at this size (space, full blocks) are only picked by brightness
+            has_shape = glyph_norms > 1e-3
+            glyph_matrix = (glyph_vectors[has_shape] / glyph_norms[has_shape, None]).T
+
+            self._glyph_matrices[block_size] = (
+                np.ascontiguousarray(glyph_matrix, dtype=np.float32),
+                np.flatnonzero(has_shape).astype(np.uint8)
+            )
+
+        return self._glyph_matrices[block_size]
+
     def _convert_gray_to_ascii(self, gray_value: float) -> str:
         index_value = round(((gray_value / 256) * (len(self._grayscale_chars) - 1)))
         return self._grayscale_chars[index_value]
 
-    def _save_result(self, output: list, file_name: str) -> str:
-        # Add resolution to file name
-        file_name += f'_0{int(self._resolution_scale * 100)}'
-
-        result_path = os.path.join(self._output_path, f'{file_name}.json')
+    def save_result(self, output: list, file_name: str, colors: np.ndarray = None) -> str:
+        result_path = self.get_result_path(file_name)
         with open(result_path, 'w') as json_file:
-            json.dump(output, json_file)
+            json.dump(self._get_result_data(output, colors), json_file)
         
         return result_path
 
-    def print_result(self, result: list) -> None:
+    def get_result_path(self, file_name: str) -> str:
+        # Add resolution to file name
+        file_name += f'_0{int(self._resolution_scale * 100)}'
+
+        return os.path.join(self._output_path, f'{file_name}.json')
+
+    def _get_result_data(self, output: list, colors: np.ndarray = None) -> object:
+        # Colored results are objects with the colors next to the rows, plain ones stay a list of rows
+        if colors is None:
+            return output
+
+        return {
+            'color_mode':   self._color_mode,
+            'rows':         output,
+            'colors':       encode_colors(colors)
+        }
+
+    def _load_cached_result(self, result_data: object) -> tuple:
+        if isinstance(result_data, list):
+            return result_data, None
+
+        output = result_data['rows']
+        colors = decode_colors(result_data['colors'], len(output), len(output[0]), result_data['color_mode'])
+
+        return output, colors
+
+    def print_result(self, result: list, colors: np.ndarray = None) -> None:
+        result_rows = [''.join(row) for row in result]
+        if colors is not None:
+            result_rows = colorize_rows(result_rows, colors, self._color_mode)
+
         ui.print_lines([
             'RESULT:',
             '',
-            *[''.join(row) for row in result]
+            *result_rows
         ], max_separator_length=100)
         ui.print_separator(length=100)
+
+
+def validate_charset(charset: str) -> None:
+    # Glyph indices are stored as single bytes, every glyph has to be printable ascii
+    if not 2 <= len(charset) <= 256:
+        raise ValueError('A charset needs between 2 and 256 glyphs')
+
+    if len(set(charset)) != len(charset):
+        raise ValueError('A charset can not repeat glyphs')
+
+    if not all(' ' <= char <= '~' for char in charset):
+        raise ValueError('A charset can only hold printable ascii glyphs')
+
+
+def open_image(image_data: object) -> Image.Image:
+    # Paths and encoded bytes (png, jpg, ...) are decoded, arrays are taken as grayscale or RGB pixels
+    if isinstance(image_data, np.ndarray):
+        return Image.fromarray(image_data)
+
+    if isinstance(image_data, (bytes, bytearray, memoryview)):
+        return Image.open(io.BytesIO(image_data))
+
+    return Image.open(image_data)
+
+
+def _render_glyph_bitmaps(charset: str) -> list:
+    # Every glyph centered in the same cell, white on black like the brightness it stands for
+    try:
+        font = ImageFont.load_default(size=GLYPH_RENDER_SIZE)
+    except TypeError:
+        # Pillow before 10.1 only has the small bitmap font
+        font = ImageFont.load_default()
+
+    glyph_boxes = [font.getbbox(char) for char in charset]
+    cell_width = max(max(right - left for left, _, right, _ in glyph_boxes), 1)
+
+    # The cell spans the ink of the whole charset, so lines through a block can match lines through a glyph
+    cell_top = min(top for _, top, _, _ in glyph_boxes)
+    cell_height = max(max(bottom for _, _, _, bottom in glyph_boxes) - cell_top, 1)
+
+    bitmaps = []
+    for char, (left, _, right, _) in zip(charset, glyph_boxes):
+        bitmap = Image.new('L', (cell_width, cell_height), 0)
+        ImageDraw.Draw(bitmap).text(((cell_width - (right - left)) // 2 - left, -cell_top), char, fill=255, font=font)
+        bitmaps.append(bitmap)
+
+    return bitmaps
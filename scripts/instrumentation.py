@@ -0,0 +1,187 @@
+import json
+import time
+import threading
+import contextlib
+from typing import Callable
+
+
+MAIN_WORKER = 'main'
+
+# Progress line updates per second
+PROGRESS_INTERVAL = 0.25
+
+
+class Instrumentation:
+    def __init__(self, enabled: bool = True, trace: bool = False) -> None:
+        # Disabled instrumentation records nothing, stages only run their body
+        self._enabled = enabled
+        self._trace = enabled and trace
+
+        self.reset()
+
+    def reset(self) -> None:
+        # Stage -> worker -> [seconds, calls], counter -> worker -> value
+        self._stages = {}
+        self._counters = {}
+        self._events = []
+
+    def is_enabled(self) -> bool:
+        return self._enabled
+
+    @contextlib.contextmanager
+    def stage(self, name: str, worker: str = MAIN_WORKER):
+        if not self._enabled:
+            yield
+            return
+
+        start_time = time.time()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start, worker, start_time)
+
+    def add_time(self, name: str, seconds: float, worker: str = MAIN_WORKER, start_time: float = None) -> None:
+        if not self._enabled:
+            return
+
+        stage_times = self._stages.setdefault(name, {}).setdefault(worker, [0.0, 0])
+        stage_times[0] += seconds
+        stage_times[1] += 1
+
+        if self._trace:
+            # Wall clock start so events of all processes share one timeline
+            if start_time is None:
+                start_time = time.time() - seconds
+            self._events.append([name, worker, start_time, seconds])
+
+    def count(self, name: str, amount: int = 1, worker: str = MAIN_WORKER) -> None:
+        if not self._enabled:
+            return
+
+        worker_counters = self._counters.setdefault(name, {})
+        worker_counters[worker] = worker_counters.get(worker, 0) + amount
+
+    def get_records(self) -> dict:
+        # Raw records, sent from worker processes and merged in the main one
+        return {
+            'stages':   self._stages,
+            'counters': self._counters,
+            'events':   self._events
+        }
+
+    def merge(self, records: dict) -> None:
+        for name, workers in records['stages'].items():
+            for worker, (seconds, calls) in workers.items():
+                stage_times = self._stages.setdefault(name, {}).setdefault(worker, [0.0, 0])
+                stage_times[0] += seconds
+                stage_times[1] += calls
+
+        for name, workers in records['counters'].items():
+            for worker, value in workers.items():
+                self.count(name, value, worker)
+
+        self._events.extend(records['events'])
+
+    def get_metrics(self) -> dict:
+        return {
+            'stages': {
+                name: {
+                    'seconds':  sum(seconds for seconds, _ in workers.values()),
+                    'calls':    sum(calls for _, calls in workers.values()),
+                    'workers':  {worker: {'seconds': seconds, 'calls': calls} for worker, (seconds, calls) in workers.items()}
+                }
+                for name, workers in self._stages.items()
+            },
+            'counters': {
+                name: {
+                    'total':    sum(workers.values()),
+                    'workers':  dict(workers)
+                }
+                for name, workers in self._counters.items()
+            }
+        }
+
+    def get_summary_line(self) -> str:
+        stage_parts = []
+
+        for name, stage_metrics in self.get_metrics()['stages'].items():
+            worker_count = len(stage_metrics['workers'])
+            if worker_count > 1:
+                stage_parts.append(f'{name} {stage_metrics["seconds"]:.2f}s over {worker_count} workers')
+            else:
+                stage_parts.append(f'{name} {stage_metrics["seconds"]:.2f}s')
+
+        return f'Stages: {" | ".join(stage_parts)}'
+
+    def save(self, path: str, extra: dict = None) -> None:
+        # Trace events use the chrome://tracing format, one thread per worker
+        if extra is None:
+            extra = {}
+
+        workers = sorted({event[1] for event in self._events}, key=lambda worker: (worker != MAIN_WORKER, worker))
+        thread_ids = {worker: thread_id for thread_id, worker in enumerate(workers)}
+        first_time = min((event[2] for event in self._events), default=0.0)
+
+        trace_events = [
+            {'name': 'thread_name', 'ph': 'M', 'pid': 0, 'tid': thread_id, 'args': {'name': worker}}
+            for worker, thread_id in thread_ids.items()
+        ]
+        trace_events.extend(
+            {
+                'name': name,
+                'ph':   'X',
+                'pid':  0,
+                'tid':  thread_ids[worker],
+                'ts':   (start_time - first_time) * 1e6,
+                'dur':  seconds * 1e6
+            }
+            for name, worker, start_time, seconds in self._events
+        )
+
+        with open(path, 'w') as trace_file:
+            json.dump({**extra, 'metrics': self.get_metrics(), 'traceEvents': trace_events}, trace_file)
+
+
+class ProgressReporter:
+    def __init__(self, label: str, total: int, get_count: Callable[[], int], interval: float = PROGRESS_INTERVAL) -> None:
+        # Prints one progress line a few times per second from its own thread
+        self._label = label
+        self._total = total
+        self._get_count = get_count
+        self._interval = interval
+
+        self._start = None
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        self._start = time.time()
+        self._stopped.clear()
+
+        self._thread = threading.Thread(target=self._report, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+        # Clear the progress line
+        print('                                                                                    ')
+
+    def _report(self) -> None:
+        # Event.wait sleeps between updates instead of spinning
+        while not self._stopped.wait(self._interval):
+            self._print_progress()
+
+    def _print_progress(self) -> None:
+        count = self._get_count()
+        fps = count / max(time.time() - self._start, 1e-9)
+
+        progress_line = f'{self._label} [{count}/{self._total}]'
+        if fps > 0:
+            progress_line += f' | est. time left: {int(max(0, self._total - count) / fps)}s'
+
+        print(f'{progress_line}            ', end='\r')
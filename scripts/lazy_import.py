@@ -0,0 +1,26 @@
+import importlib
+
+
+class LazyModule:
+    def __init__(self, name: str) -> None:
+        # Stands in for a module until one of its attributes is used, the import happens then
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attribute: str) -> object:
+        # Only called for attributes not read before, read ones are kept on the instance
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+
+        value = getattr(self._module, attribute)
+        setattr(self, attribute, value)
+
+        return value
+
+    def __repr__(self) -> str:
+        return f'<lazy module {self._name}{"" if self._module is None else " (loaded)"}>'
+
+
+def lazy_import(name: str) -> LazyModule:
+    # Heavy dependencies (numpy, cv2, PIL, keyboard) load on first use, entry points start without them
+    return LazyModule(name)
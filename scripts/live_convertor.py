@@ -0,0 +1,364 @@
+from __future__ import annotations
+import os
+import time
+import threading
+import multiprocessing as mp
+import scripts.ui as ui
+from scripts.img_ascii_convertor import ImgAsciiConvertor
+from scripts.ascii_video_player import AsciiVideoPlayer
+from scripts.video_to_frames import FrameSampler
+from scripts.ascii_color import COLOR_NONE
+from scripts.lazy_import import lazy_import
+
+np = lazy_import('numpy')
+cv2 = lazy_import('cv2')
+
+
+# Longest wait for a frame that is not converted yet, the previous frame stays on screen after it
+DEFAULT_LATENCY_BUDGET = 0.1
+
+# Frames decoded ahead of the one being played, bounds the reorder buffer
+DEFAULT_REORDER_FRAMES = 16
+
+# Playhead given to the workers on close so they skip everything still queued
+CLOSED_PLAYHEAD = 2 ** 31 - 1
+
+
+class LiveFrames:
+    def __init__(
+            self,
+            video_path: str,
+            resolution_scale: float,
+            num_cores: int,
+            latency_budget: float = DEFAULT_LATENCY_BUDGET,
+            reorder_size: int = DEFAULT_REORDER_FRAMES,
+            target_fps: float = None,
+            color_mode: str = COLOR_NONE
+        ) -> None:
+
+        # Frames source of the player, decoded and converted while playing
+        self._vidcap = cv2.VideoCapture(video_path)
+        if not self._vidcap.isOpened():
+            raise IOError(f'Could not open {video_path}')
+
+        self._sampler = FrameSampler(self._vidcap.get(cv2.CAP_PROP_FPS), target_fps)
+        self._frame_count = self._sampler.get_frame_count(int(self._vidcap.get(cv2.CAP_PROP_FRAME_COUNT)))
+        self._num_cores = max(1, min(int(num_cores), os.cpu_count()))
+        self._latency_budget = latency_budget
+        self._reorder_size = max(1, reorder_size)
+        self._color_mode = color_mode
+
+        # Frame number -> converted frame, None for frames the workers skipped
+        self._buffer = {}
+        self._buffer_condition = threading.Condition()
+        self._last_frame = None
+        self._decoded_number = 0
+        self._decode_finished = False
+        self._collect_finished = False
+        self._closed = False
+
+        # Frame being played, workers skip frames behind it
+        self._playhead = mp.Value('i', 1)
+
+        self._start_time = time.time()
+        self._first_frame_time = None
+        self._converted_frames = 0
+        self._skipped_frames = 0
+        self._late_frames = 0
+
+        self._frame_queue = mp.Queue(maxsize=self._num_cores * 2)
+        self._result_queue = mp.Queue()
+
+        self._workers = [
+            mp.Process(
+                target=_convert_live_frames,
+                args=(self._frame_queue, self._result_queue, self._playhead, resolution_scale, color_mode,),
+                daemon=True
+            )
+            for _ in range(self._num_cores)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+        self._decode_thread = threading.Thread(target=self._decode_frames, daemon=True)
+        self._collect_thread = threading.Thread(target=self._collect_frames, daemon=True)
+        self._decode_thread.start()
+        self._collect_thread.start()
+
+    def __contains__(self, frame_key: object) -> bool:
+        frame_number = int(frame_key)
+
+        with self._buffer_condition:
+            # The player asks for the frame after the one it is on every loop, skipped frames move the playhead too
+            self._move_playhead(frame_number - 1)
+
+            # Frames within the reported frame count exist, later ones once the decoder reaches them
+            if not self._decode_finished and frame_number <= self._frame_count:
+                return True
+
+            self._buffer_condition.wait_for(
+                lambda: self._decoded_number >= frame_number or self._decode_finished
+            )
+            return frame_number <= self._decoded_number
+
+    def __getitem__(self, frame_key: object) -> object:
+        frame_number = int(frame_key)
+
+        with self._buffer_condition:
+            self._move_playhead(frame_number)
+
+            # Nothing is on screen yet, the first frame is waited for however long it takes
+            timeout = self._latency_budget if self._last_frame is not None else None
+            is_ready = self._buffer_condition.wait_for(
+                lambda: frame_number in self._buffer or self._collect_finished
+                or (self._decode_finished and frame_number > self._decoded_number),
+                timeout
+            )
+
+            frame_data = self._buffer.get(frame_number) if is_ready else None
+            if frame_data is None and self._last_frame is None:
+                # There is no previous frame to keep on screen, the first one that exists is shown instead
+                frame_data = self._wait_for_first_frame(frame_number)
+
+            if frame_data is None:
+                # Not converted within the latency budget or skipped, the previous frame stays on screen
+                self._late_frames += 1
+                return self._last_frame
+
+            if self._first_frame_time is None:
+                self._first_frame_time = time.time() - self._start_time
+
+            self._last_frame = frame_data
+            return frame_data
+
+    def get_fps(self) -> float:
+        return self._sampler.get_output_fps()
+
+    def get_color_mode(self) -> str:
+        return self._color_mode
+
+    def get_stats(self) -> dict:
+        return {
+            'time_to_first_frame':  self._first_frame_time,
+            'converted_frames':     self._converted_frames,
+            'skipped_frames':       self._skipped_frames,
+            'late_frames':          self._late_frames
+        }
+
+    def get_stats_lines(self) -> list:
+        stats = self.get_stats()
+        first_frame_time = stats['time_to_first_frame'] or 0.0
+
+        return [
+            f' -> Time to first frame: {first_frame_time * 1000:.0f}ms',
+            f' -> Converted frames: {stats["converted_frames"]} | Skipped behind playback: {stats["skipped_frames"]}'
+            f' | Over latency budget: {stats["late_frames"]}'
+        ]
+
+    def close(self) -> None:
+        with self._buffer_condition:
+            self._closed = True
+            self._buffer_condition.notify_all()
+
+        # Workers drop whatever is still queued
+        with self._playhead.get_lock():
+            self._playhead.value = CLOSED_PLAYHEAD
+
+        self._decode_thread.join()
+        self._collect_thread.join()
+
+        for worker in self._workers:
+            worker.join()
+
+    def _move_playhead(self, frame_number: int) -> None:
+        with self._playhead.get_lock():
+            self._playhead.value = frame_number
+
+        # Played frames leave the buffer, making room in the decode window
+        for buffered_number in [number for number in self._buffer if number < frame_number]:
+            del self._buffer[buffered_number]
+        self._buffer_condition.notify_all()
+
+    def _wait_for_first_frame(self, frame_number: int) -> object:
+        self._buffer_condition.wait_for(
+            lambda: self._get_next_buffered(frame_number) is not None or self._collect_finished
+        )
+
+        next_number = self._get_next_buffered(frame_number)
+        if next_number is None:
+            raise IOError('No frame of the video could be decoded and converted')
+
+        return self._buffer[next_number]
+
+    def _get_next_buffered(self, frame_number: int) -> int:
+        # Lowest converted frame from the given one on, None while there is none
+        converted_numbers = [
+            number for number, frame_data in self._buffer.items()
+            if number >= frame_number and frame_data is not None
+        ]
+
+        return min(converted_numbers, default=None)
+
+    def _decode_frames(self) -> None:
+        source_index = -1
+
+        try:
+            while self._vidcap.grab():
+                source_index += 1
+                if not self._sampler.keeps(source_index):
+                    continue
+
+                frame_number = self._sampler.get_frame_number(source_index)
+
+                with self._buffer_condition:
+                    # Decode at most the reorder window ahead of the playhead
+                    self._buffer_condition.wait_for(
+                        lambda: self._closed or frame_number < self._playhead.value + self._reorder_size
+                    )
+                    if self._closed:
+                        break
+
+                    self._decoded_number = frame_number
+                    self._buffer_condition.notify_all()
+
+                    # Conversion fell behind, frames the player already passed are never retrieved
+                    if frame_number < self._playhead.value:
+                        self._skipped_frames += 1
+                        continue
+
+                success, image = self._vidcap.retrieve()
+                if not success:
+                    # The frame never reaches a worker, it must not be waited for
+                    with self._buffer_condition:
+                        self._decoded_number = frame_number - 1
+                    break
+
+                if self._color_mode == COLOR_NONE:
+                    image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+                self._frame_queue.put((frame_number, image))
+        finally:
+            self._vidcap.release()
+
+            with self._buffer_condition:
+                self._decode_finished = True
+                self._buffer_condition.notify_all()
+
+            # Signal every worker that there are no more frames
+            for _ in self._workers:
+                self._frame_queue.put(None)
+
+    def _collect_frames(self) -> None:
+        finished_workers = 0
+
+        try:
+            while finished_workers < len(self._workers):
+                result = self._result_queue.get()
+                if result is None:
+                    finished_workers += 1
+                    continue
+
+                frame_number, frame_data = result
+
+                with self._buffer_condition:
+                    if frame_data is None:
+                        self._skipped_frames += 1
+                    else:
+                        self._converted_frames += 1
+
+                    # Frames that arrive after the player passed them are dropped
+                    if frame_number >= self._playhead.value:
+                        self._buffer[frame_number] = frame_data
+                        self._buffer_condition.notify_all()
+        finally:
+            # No more frames will arrive, nothing is waited for past this
+            with self._buffer_condition:
+                self._collect_finished = True
+                self._buffer_condition.notify_all()
+
+
+class LiveAsciiConvertor:
+    def __init__(
+            self,
+            resolution_scale: float,
+            num_cores: int,
+            latency_budget: float = DEFAULT_LATENCY_BUDGET,
+            reorder_size: int = DEFAULT_REORDER_FRAMES,
+            target_fps: float = None,
+            color_mode: str = COLOR_NONE
+        ) -> None:
+
+        # Plays a video while converting it, no output file is written
+        self._resolution_scale = resolution_scale
+        self._num_cores = num_cores
+        self._latency_budget = latency_budget
+        self._reorder_size = reorder_size
+        self._target_fps = target_fps
+        self._color_mode = color_mode
+
+        self._video_player = AsciiVideoPlayer()
+
+    def play(self, video_path: str, speed: float = 1.0) -> dict:
+        if not os.path.isfile(video_path):
+            raise FileNotFoundError
+
+        print('Starting live conversion...')
+
+        live_frames = LiveFrames(
+            video_path,
+            self._resolution_scale,
+            self._num_cores,
+            self._latency_budget,
+            self._reorder_size,
+            self._target_fps,
+            self._color_mode
+        )
+
+        self._video_player.play_frames({
+            'fps':          live_frames.get_fps(),
+            'first_frame':  1,
+            'color_mode':   live_frames.get_color_mode(),
+            'frames':       live_frames
+        }, True, speed)
+
+        ui.print_lines(['LIVE CONVERSION FINISHED', *live_frames.get_stats_lines()], seperate_chunk=True)
+
+        return live_frames.get_stats()
+
+
+def _convert_live_frames(
+        frame_queue: mp.Queue,
+        result_queue: mp.Queue,
+        playhead: mp.Value,
+        resolution_scale: float,
+        color_mode: str
+    ) -> None:
+
+    image_convertor = ImgAsciiConvertor(resolution_scale, False, color_mode=color_mode)
+
+    while True:
+        queued_frame = frame_queue.get()
+        if queued_frame is None:
+            break
+
+        frame_number, frame_array = queued_frame
+
+        # Frames the player already passed are not worth converting
+        if frame_number < playhead.value:
+            result_queue.put((frame_number, None))
+            continue
+
+        result_queue.put((frame_number, _convert_live_frame(image_convertor, frame_array)))
+
+    result_queue.put(None)
+
+
+def _convert_live_frame(image_convertor: ImgAsciiConvertor, frame_array: np.ndarray) -> object:
+    if frame_array.ndim == 2:
+        return image_convertor.convert_image_array(frame_array)
+
+    # Colored frames arrive as decoded (BGR) and are played as (rows, colors)
+    frame_rows = image_convertor.convert_image_array(cv2.cvtColor(frame_array, cv2.COLOR_BGR2GRAY))
+    colors = image_convertor.get_block_colors(cv2.cvtColor(frame_array, cv2.COLOR_BGR2RGB))
+
+    return frame_rows, colors
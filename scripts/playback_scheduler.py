@@ -0,0 +1,84 @@
+import time
+
+
+class PlaybackScheduler:
+    def __init__(self, fps: float, speed: float = 1.0) -> None:
+        self._frame_interval = 1.0 / (fps * speed)
+        self._target_fps = fps * speed
+
+        # Deadlines are counted from a base frame shown at the base time
+        self._base_frame = 0
+        self._base_time = 0.0
+        self._next_frame = 0
+
+        self._start_time = 0.0
+        self._rendered_frames = 0
+        self._dropped_frames = 0
+        self._lateness = []
+
+    def start(self, frame_number: int) -> None:
+        self._start_time = time.monotonic()
+        self._rebase(frame_number, self._start_time)
+        self._next_frame = frame_number + 1
+
+    def should_render(self, frame_number: int) -> bool:
+        # A frame whose display slot already ended is skipped so the video catches up
+        lateness = time.monotonic() - self._get_deadline(frame_number)
+
+        if lateness > self._frame_interval:
+            self._dropped_frames += 1
+            return False
+
+        self._rendered_frames += 1
+        self._lateness.append(max(0.0, lateness))
+
+        return True
+
+    def wait_for_frame(self, frame_number: int) -> None:
+        # Pausing and seeking break the frame sequence, restart the clock one frame from now
+        if frame_number != self._next_frame:
+            self._rebase(frame_number, time.monotonic() + self._frame_interval)
+
+        remaining = self._get_deadline(frame_number) - time.monotonic()
+        if remaining > 0:
+            time.sleep(remaining)
+
+        self._next_frame = frame_number + 1
+
+    def get_stats(self) -> dict:
+        play_time = max(time.monotonic() - self._start_time, 1e-9)
+        lateness = sorted(self._lateness)
+
+        return {
+            'target_fps':       self._target_fps,
+            'achieved_fps':     self._rendered_frames / play_time,
+            'rendered_frames':  self._rendered_frames,
+            'dropped_frames':   self._dropped_frames,
+            'jitter_p50_ms':    _percentile(lateness, 50) * 1000,
+            'jitter_p95_ms':    _percentile(lateness, 95) * 1000,
+            'jitter_p99_ms':    _percentile(lateness, 99) * 1000
+        }
+
+    def get_stats_lines(self) -> list:
+        stats = self.get_stats()
+
+        return [
+            f' -> Target fps: {stats["target_fps"]:.2f} | Achieved fps: {stats["achieved_fps"]:.2f}',
+            f' -> Rendered frames: {stats["rendered_frames"]} | Dropped frames: {stats["dropped_frames"]}',
+            f' -> Frame jitter p50/p95/p99: {stats["jitter_p50_ms"]:.1f}/{stats["jitter_p95_ms"]:.1f}/{stats["jitter_p99_ms"]:.1f}ms'
+        ]
+
+    def _rebase(self, frame_number: int, frame_time: float) -> None:
+        self._base_frame = frame_number
+        self._base_time = frame_time
+
+    def _get_deadline(self, frame_number: int) -> float:
+        return self._base_time + (frame_number - self._base_frame) * self._frame_interval
+
+
+def _percentile(sorted_values: list, percent: float) -> float:
+    if not sorted_values:
+        return 0.0
+
+    index = min(len(sorted_values) - 1, int(round(percent / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
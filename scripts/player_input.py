@@ -0,0 +1,160 @@
+from __future__ import annotations
+import os
+import sys
+import queue
+import threading
+from scripts.lazy_import import lazy_import
+
+keyboard = lazy_import('keyboard')
+
+INPUT_AUTO = 'auto'
+INPUT_TERMINAL = 'terminal'
+INPUT_KEYBOARD = 'keyboard'
+INPUT_NONE = 'none'
+
+INPUT_BACKENDS = [INPUT_AUTO, INPUT_TERMINAL, INPUT_KEYBOARD, INPUT_NONE]
+
+# The reader thread wakes up this often to see if it should stop (seconds)
+STDIN_POLL_INTERVAL = 0.1
+
+# Bytes read from stdin at once, escape sequences of special keys arrive in one read
+STDIN_READ_SIZE = 64
+
+
+class KeyInput:
+    def __init__(self) -> None:
+        # Keys pressed since the last poll, filled by the backend outside of the frame loop
+        self._keys = queue.Queue()
+
+    def start(self) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+    def poll(self) -> set:
+        # One cheap check per frame, the queue is only drained when a key was pressed
+        if self._keys.empty():
+            return set()
+
+        pressed_keys = set()
+        try:
+            while True:
+                pressed_keys.add(self._keys.get_nowait())
+        except queue.Empty:
+            pass
+
+        return pressed_keys
+
+    def __enter__(self) -> KeyInput:
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.stop()
+
+
+class TerminalKeyInput(KeyInput):
+    def __init__(self) -> None:
+        # Reads keys from stdin without root or an input device, works over SSH
+        super().__init__()
+
+        self._fd = None
+        self._old_attributes = None
+        self._stop_event = threading.Event()
+        self._reader_thread = None
+
+    def start(self) -> None:
+        # Imported here, the modules only exist on unix
+        import termios
+        import tty
+
+        self._fd = sys.stdin.fileno()
+        self._old_attributes = termios.tcgetattr(self._fd)
+
+        # Keys arrive without enter and are not echoed, ctrl+c still raises KeyboardInterrupt
+        tty.setcbreak(self._fd, termios.TCSANOW)
+
+        self._stop_event.clear()
+        self._reader_thread = threading.Thread(target=self._read_keys, daemon=True)
+        self._reader_thread.start()
+
+    def stop(self) -> None:
+        if self._reader_thread is None:
+            return
+
+        import termios
+
+        self._stop_event.set()
+        self._reader_thread.join()
+        self._reader_thread = None
+
+        # Give the terminal back the way it was, typed text is echoed again
+        termios.tcsetattr(self._fd, termios.TCSADRAIN, self._old_attributes)
+
+    def _read_keys(self) -> None:
+        import select
+
+        while not self._stop_event.is_set():
+            readable, _, _ = select.select([self._fd], [], [], STDIN_POLL_INTERVAL)
+            if not readable:
+                continue
+
+            key_bytes = os.read(self._fd, STDIN_READ_SIZE)
+            if not key_bytes:
+                # Stdin was closed
+                return
+
+            for key in key_bytes.decode('ascii', errors='ignore').lower():
+                self._keys.put(key)
+
+
+class KeyboardKeyInput(KeyInput):
+    def __init__(self) -> None:
+        # Global key hooks of the keyboard module, the only backend on windows (needs root on linux)
+        super().__init__()
+
+        self._hook = None
+
+    def start(self) -> None:
+        self._hook = keyboard.on_press(self._on_press)
+
+    def stop(self) -> None:
+        if self._hook is None:
+            return
+
+        keyboard.unhook(self._hook)
+        self._hook = None
+
+    def _on_press(self, event: object) -> None:
+        # Runs on the hook thread of the keyboard module
+        if event.name:
+            self._keys.put(event.name.lower())
+
+
+def create_key_input(backend: str = INPUT_AUTO) -> KeyInput:
+    if backend == INPUT_AUTO:
+        backend = _get_default_backend()
+
+    if backend == INPUT_TERMINAL:
+        return TerminalKeyInput()
+
+    if backend == INPUT_KEYBOARD:
+        return KeyboardKeyInput()
+
+    if backend == INPUT_NONE:
+        # Plays without controls, ctrl+c still stops it
+        return KeyInput()
+
+    raise ValueError(f'Unknown input backend {backend}, expected one of {", ".join(INPUT_BACKENDS)}')
+
+
+def _get_default_backend() -> str:
+    if os.name == 'nt':
+        return INPUT_KEYBOARD
+
+    # Piped or redirected stdin has no keys to read
+    if not sys.stdin.isatty():
+        return INPUT_NONE
+
+    return INPUT_TERMINAL
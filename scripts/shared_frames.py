@@ -0,0 +1,193 @@
+from __future__ import annotations
+import os
+import shutil
+import tempfile
+import multiprocessing as mp
+from typing import Callable
+from multiprocessing import shared_memory
+from scripts.lazy_import import lazy_import
+
+np = lazy_import('numpy')
+
+
+REFERENCE_BYTES = 4
+
+OVERFLOW_EXTENSION = 'npz'
+
+
+class SharedGlyphFrames:
+    def __init__(self, frame_count: int, frame_rows: int, frame_cols: int, color_cell_bytes: int = 0) -> None:
+        self._shape = (frame_count, frame_rows, frame_cols)
+
+        # Glyph indices of every frame + a flag per frame marking it as converted
+        self._glyphs_shm = shared_memory.SharedMemory(create=True, size=max(1, frame_count * frame_rows * frame_cols))
+        self._stored_shm = shared_memory.SharedMemory(create=True, size=max(1, frame_count))
+        self._owner = True
+
+        # Number of the earlier frame a duplicate repeats (int32), 0 for frames with glyphs of their own
+        self._references_shm = shared_memory.SharedMemory(create=True, size=max(1, frame_count * REFERENCE_BYTES))
+
+        # Cell colors of every frame, a palette index (1 byte) or rgb (3 bytes) per cell
+        self._color_cell_bytes = color_cell_bytes
+        self._colors_shm = None
+        if color_cell_bytes > 0:
+            self._colors_shm = shared_memory.SharedMemory(
+                create=True,
+                size=max(1, frame_count * frame_rows * frame_cols * color_cell_bytes)
+            )
+
+        # Frame count reported by the vidcap can be too low, frames past it are stored as files in here
+        self._overflow_dir = tempfile.mkdtemp(prefix='ascii_frames_')
+
+        self._converted_frames = mp.Value('i', 0)
+
+        self._attach_arrays()
+        self._stored[:] = 0
+        self._references[:] = 0
+
+    def __getstate__(self) -> dict:
+        # Shared memory is passed to spawned processes by name and attached again
+        return {
+            'shape':            self._shape,
+            'glyphs_name':      self._glyphs_shm.name,
+            'stored_name':      self._stored_shm.name,
+            'references_name':  self._references_shm.name,
+            'colors_name':      self._colors_shm.name if self._colors_shm is not None else None,
+            'color_cell_bytes': self._color_cell_bytes,
+            'overflow_dir':     self._overflow_dir,
+            'converted_frames': self._converted_frames
+        }
+
+    def __setstate__(self, state: dict) -> None:
+        self._shape = state['shape']
+        self._glyphs_shm = shared_memory.SharedMemory(name=state['glyphs_name'])
+        self._stored_shm = shared_memory.SharedMemory(name=state['stored_name'])
+        self._references_shm = shared_memory.SharedMemory(name=state['references_name'])
+        self._owner = False
+        self._overflow_dir = state['overflow_dir']
+        self._converted_frames = state['converted_frames']
+
+        self._color_cell_bytes = state['color_cell_bytes']
+        self._colors_shm = None
+        if state['colors_name'] is not None:
+            self._colors_shm = shared_memory.SharedMemory(name=state['colors_name'])
+
+        # Child processes share the resource tracker of the creating process, which unregisters on unlink
+
+        self._attach_arrays()
+
+    def store(self, frame_number: int, glyph_indices: np.ndarray, colors: np.ndarray = None) -> None:
+        frame_index = frame_number - 1
+
+        if frame_index >= self._shape[0]:
+            if colors is not None and self._colors is not None:
+                self._store_overflow(frame_number, glyphs=glyph_indices, colors=colors)
+            else:
+                self._store_overflow(frame_number, glyphs=glyph_indices)
+        elif frame_index >= 0:
+            self._glyphs[frame_index] = glyph_indices
+            if colors is not None and self._colors is not None:
+                self._colors[frame_index] = colors
+            self._stored[frame_index] = 1
+
+        with self._converted_frames.get_lock():
+            self._converted_frames.value += 1
+
+    def store_reference(self, frame_number: int, reference_number: int) -> None:
+        # Duplicate frames keep the number of the frame they repeat instead of glyphs
+        frame_index = frame_number - 1
+
+        if frame_index >= self._shape[0]:
+            self._store_overflow(frame_number, reference=np.int32(reference_number))
+        elif frame_index >= 0:
+            self._references[frame_index] = reference_number
+            self._stored[frame_index] = 1
+
+        with self._converted_frames.get_lock():
+            self._converted_frames.value += 1
+
+    def get_converted_count(self) -> int:
+        return self._converted_frames.value
+
+    def to_frames_dict(self, glyph_indices_to_rows: Callable[[np.ndarray], list]) -> dict:
+        # Build the output frames once all processes finished, duplicates stay frame numbers
+        return {
+            str(frame_number): frame_value if isinstance(frame_value, int) else glyph_indices_to_rows(frame_value)
+            for frame_number, frame_value in self.get_stored_frames()
+        }
+
+    def get_stored_frames(self):
+        # Yield (frame number, glyph indices or the number of the repeated frame) of every converted frame in order
+        for frame_index in np.flatnonzero(self._stored):
+            reference_number = int(self._references[frame_index])
+            yield frame_index + 1, reference_number or self._glyphs[frame_index]
+
+        # Frames past the shared memory all come after the ones in it
+        for frame_number in self.get_overflow_numbers():
+            with np.load(self._get_overflow_path(frame_number)) as overflow_frame:
+                if 'reference' in overflow_frame:
+                    yield frame_number, int(overflow_frame['reference'])
+                else:
+                    yield frame_number, overflow_frame['glyphs']
+
+    def get_colors(self, frame_number: int) -> np.ndarray:
+        if frame_number - 1 >= self._shape[0]:
+            with np.load(self._get_overflow_path(frame_number)) as overflow_frame:
+                return overflow_frame['colors']
+
+        return self._colors[frame_number - 1]
+
+    def get_overflow_numbers(self) -> list:
+        # Numbers of the frames that did not fit the preallocated frame count, in order
+        return sorted(
+            int(file_name.split('.')[0]) for file_name in os.listdir(self._overflow_dir)
+            if file_name.endswith(f'.{OVERFLOW_EXTENSION}')
+        )
+
+    def has_colors(self) -> bool:
+        return self._colors_shm is not None
+
+    def get_frame_shape(self) -> tuple:
+        return self._shape[1:]
+
+    def close(self) -> None:
+        # Drop the numpy views before closing the shared memory
+        self._glyphs = None
+        self._stored = None
+        self._references = None
+        self._colors = None
+
+        self._glyphs_shm.close()
+        self._stored_shm.close()
+        self._references_shm.close()
+        if self._colors_shm is not None:
+            self._colors_shm.close()
+
+        if self._owner:
+            self._glyphs_shm.unlink()
+            self._stored_shm.unlink()
+            self._references_shm.unlink()
+            if self._colors_shm is not None:
+                self._colors_shm.unlink()
+            shutil.rmtree(self._overflow_dir, ignore_errors=True)
+
+    def _store_overflow(self, frame_number: int, **arrays: np.ndarray) -> None:
+        # Written under a temporary name, readers never see a partly written frame
+        temp_path = os.path.join(self._overflow_dir, f'{frame_number}.{OVERFLOW_EXTENSION}.tmp')
+        with open(temp_path, 'wb') as temp_file:
+            np.savez(temp_file, **arrays)
+        os.replace(temp_path, self._get_overflow_path(frame_number))
+
+    def _get_overflow_path(self, frame_number: int) -> str:
+        return os.path.join(self._overflow_dir, f'{frame_number}.{OVERFLOW_EXTENSION}')
+
+    def _attach_arrays(self) -> None:
+        self._glyphs = np.ndarray(self._shape, dtype=np.uint8, buffer=self._glyphs_shm.buf)
+        self._stored = np.ndarray(self._shape[:1], dtype=np.uint8, buffer=self._stored_shm.buf)
+        self._references = np.ndarray(self._shape[:1], dtype=np.int32, buffer=self._references_shm.buf)
+
+        self._colors = None
+        if self._colors_shm is not None:
+            # Palette indices have no channel axis
+            color_shape = self._shape if self._color_cell_bytes == 1 else (*self._shape, self._color_cell_bytes)
+            self._colors = np.ndarray(color_shape, dtype=np.uint8, buffer=self._colors_shm.buf)
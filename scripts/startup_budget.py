@@ -0,0 +1,85 @@
+import os
+import sys
+import json
+import time
+import subprocess
+from statistics import median
+
+
+BASE_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Entry point module -> import time budget in ms, wrappers start these for every small input
+ENTRY_POINT_BUDGETS = {
+    'ascii_player':             60,
+    'image_to_ascii':           60,
+    'ascii_format_convertor':   60,
+    'video_to_ascii':           120,
+    'batch_convert':            120,
+    'batch_image_convert':      120,
+    'export_ascii_video':       120,
+    'live_preview':             120,
+    'benchmark':                120,
+    'broadcast':                200
+}
+
+# Dependencies that only load once a code path uses them, no entry point may import them on start
+HEAVY_MODULES = ['numpy', 'cv2', 'PIL', 'keyboard']
+
+# Fresh interpreters started per entry point, the median is compared to the budget
+DEFAULT_RUNS = 5
+
+# Runs in the child interpreter, nothing is imported before the entry point besides what measuring needs
+MEASURE_SOURCE = '''
+import sys, time, json
+start = time.perf_counter()
+import {entry_point}
+import_time = time.perf_counter() - start
+print(json.dumps({{
+    'import_time':      import_time,
+    'heavy_modules':    [name for name in {heavy_modules!r} if name in sys.modules]
+}}))
+'''
+
+
+def measure_startup(entry_point: str, runs: int = DEFAULT_RUNS) -> dict:
+    # Import and whole process times of an entry point, each run in a new interpreter
+    import_times = []
+    process_times = []
+    heavy_modules = set()
+
+    for _ in range(max(1, runs)):
+        process_start = time.perf_counter()
+        completed = subprocess.run(
+            [sys.executable, '-c', MEASURE_SOURCE.format(entry_point=entry_point, heavy_modules=HEAVY_MODULES)],
+            cwd=BASE_PATH,
+            capture_output=True,
+            text=True
+        )
+        process_times.append(time.perf_counter() - process_start)
+
+        if completed.returncode != 0:
+            raise RuntimeError(f'Importing {entry_point} failed:\n{completed.stderr.strip()}')
+
+        measurement = json.loads(completed.stdout.strip().splitlines()[-1])
+        import_times.append(measurement['import_time'])
+        heavy_modules.update(measurement['heavy_modules'])
+
+    return {
+        'entry_point':      entry_point,
+        'import_ms':        median(import_times) * 1000,
+        'process_ms':       median(process_times) * 1000,
+        'heavy_modules':    sorted(heavy_modules)
+    }
+
+
+def check_startup(entry_points: list = None, runs: int = DEFAULT_RUNS, budget_scale: float = 1.0) -> list:
+    # Measurement of every entry point with its budget, passed when it stays in budget without heavy imports
+    results = []
+
+    for entry_point in entry_points or list(ENTRY_POINT_BUDGETS.keys()):
+        result = measure_startup(entry_point, runs)
+        result['budget_ms'] = ENTRY_POINT_BUDGETS[entry_point] * budget_scale
+        result['passed'] = result['import_ms'] <= result['budget_ms'] and not result['heavy_modules']
+        results.append(result)
+
+    return results
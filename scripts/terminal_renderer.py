@@ -0,0 +1,156 @@
+from __future__ import annotations
+import sys
+from typing import TextIO
+from scripts.ascii_video_codec import find_changed_runs, find_runs
+from scripts.ascii_color import SgrWriter, COLOR_NONE, SPACE_BYTE, get_color_keys
+from scripts.lazy_import import lazy_import
+
+np = lazy_import('numpy')
+
+
+CURSOR_HOME = '\033[H'
+CLEAR_SCREEN = '\033[2J'
+CLEAR_LINE = '\033[2K'
+
+
+class DiffRenderer:
+    def __init__(
+            self,
+            frame_rows: int,
+            frame_cols: int,
+            controls_line: str,
+            output: TextIO = sys.stdout,
+            color_mode: str = COLOR_NONE
+        ) -> None:
+
+        self._frame_rows = frame_rows
+        self._frame_cols = frame_cols
+        self._output = output
+
+        # Static lines below the frame are built once
+        self._separator_line = '-' * frame_cols
+        self._status_row = frame_rows + 2
+        self._status_line = controls_line
+
+        self._last_frame = None
+
+        # Colored frames come as (rows, colors), codes are only written where the color changes
+        self._color_mode = color_mode
+        self._sgr_writer = SgrWriter(color_mode)
+        self._last_color_keys = None
+
+        self._frames_rendered = 0
+        self._bytes_written = 0
+        self._last_frame_bytes = 0
+
+    def render(self, frame_data: object) -> int:
+        color_keys = None
+        if isinstance(frame_data, tuple):
+            frame_data, colors = frame_data
+            color_keys = get_color_keys(colors, self._color_mode)
+
+        frame = ''.join(frame_data).encode('ascii')
+
+        if (
+            self._last_frame is None
+            or len(frame) != len(self._last_frame)
+            or (color_keys is None) != (self._last_color_keys is None)
+        ):
+            output = self._get_full_redraw(frame_data, color_keys)
+        elif color_keys is not None:
+            output = self._get_changed_color_segments(frame, color_keys)
+        else:
+            output = self._get_changed_segments(frame)
+
+        self._last_frame = frame
+        self._last_color_keys = color_keys
+        self._write(output)
+
+        self._frames_rendered += 1
+        self._last_frame_bytes = len(output)
+
+        return self._last_frame_bytes
+
+    def render_status(self, status_line: str) -> None:
+        # Replace the line below the separator, used for the controls and the paused message
+        self._status_line = status_line
+        self._write(f'\033[{self._status_row};1H{CLEAR_LINE}{status_line}')
+
+    def invalidate(self) -> None:
+        # Console was cleared, draw everything again on the next frame
+        self._last_frame = None
+        self._last_color_keys = None
+        self._sgr_writer.invalidate()
+
+    def get_last_frame_bytes(self) -> int:
+        return self._last_frame_bytes
+
+    def get_average_frame_bytes(self) -> float:
+        return self._bytes_written / max(1, self._frames_rendered)
+
+    def _get_full_redraw(self, frame_data: list, color_keys: np.ndarray = None) -> str:
+        if color_keys is not None:
+            frame_data = [
+                self._sgr_writer.write_cells(row, color_keys[row_index * self._frame_cols:(row_index + 1) * self._frame_cols])
+                for row_index, row in enumerate(frame_data)
+            ]
+
+        # The lines below the frame are drawn in the default color
+        return ''.join([
+            CLEAR_SCREEN,
+            CURSOR_HOME,
+            '\n'.join(frame_data),
+            self._sgr_writer.reset(),
+            '\n',
+            self._separator_line,
+            '\n',
+            self._status_line
+        ])
+
+    def _get_changed_segments(self, frame: bytes) -> str:
+        runs, _ = find_changed_runs(self._last_frame, frame)
+        return self._get_run_segments(frame, runs)
+
+    def _get_changed_color_segments(self, frame: bytes, color_keys: np.ndarray) -> str:
+        previous_cells = np.frombuffer(self._last_frame, dtype=np.uint8)
+        cells = np.frombuffer(frame, dtype=np.uint8)
+
+        # A new color only shows on cells that draw a glyph
+        changed_mask = (previous_cells != cells) | ((self._last_color_keys != color_keys) & (cells != SPACE_BYTE))
+
+        return self._get_run_segments(frame, find_runs(np.flatnonzero(changed_mask)), color_keys)
+
+    def _get_run_segments(self, frame: bytes, runs: list, color_keys: np.ndarray = None) -> str:
+        segments = []
+
+        for start, end in runs:
+            # Runs are on the flattened frame, split them on row ends
+            while start < end:
+                row, col = divmod(start, self._frame_cols)
+                segment_end = min(end, (row + 1) * self._frame_cols)
+
+                segments.append(f'\033[{row + 1};{col + 1}H')
+
+                segment = frame[start:segment_end].decode('ascii')
+                if color_keys is not None:
+                    segment = self._sgr_writer.write_cells(segment, color_keys[start:segment_end])
+                segments.append(segment)
+
+                start = segment_end
+
+        # Park the cursor after the status line, in the default color
+        if segments:
+            segments.append(self._sgr_writer.reset())
+            segments.append(f'\033[{self._status_row + 1};1H')
+
+        return ''.join(segments)
+
+    def _write(self, output: str) -> None:
+        if not output:
+            return
+
+        # One buffered write per frame
+        self._output.write(output)
+        self._output.flush()
+
+        self._bytes_written += len(output)
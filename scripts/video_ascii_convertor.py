@@ -1,29 +1,128 @@
+from __future__ import annotations
 import os
 import shutil
 import json
 import pickle
 import multiprocessing as mp
 import time
+import queue
+import threading
 import scripts.ui as ui
 from math import ceil
-from scripts.video_to_frames import VideoFramesExtractor
-from scripts.img_ascii_convertor import ImgAsciiConvertor
+from scripts.video_to_frames import VideoFramesExtractor, FrameSampler
+from scripts.img_ascii_convertor import ImgAsciiConvertor, GLYPH_MODE_BRIGHTNESS
 from scripts.ascii_video_player import AsciiVideoPlayer
+from scripts.shared_frames import SharedGlyphFrames
+from scripts.frame_dedup import DuplicateFrameDetector, DUPLICATE_HISTORY_FRAMES
+from scripts.frame_writer import IncrementalFrameWriter, JsonFrameSink, PickleFrameSink, BinaryFrameSink, DEFAULT_REORDER_WINDOW
+from scripts.ascii_color import COLOR_NONE, COLOR_CELL_BYTES, encode_colors
+from scripts.conversion_cache import ConversionCache
+from scripts.instrumentation import Instrumentation, ProgressReporter
+from scripts.ascii_video_file import (
+    AsciiVideoWriter,
+    check_contiguous_frames,
+    ASCII_VIDEO_EXTENSION,
+    COMPRESSION_NONE,
+    COMPRESSION_ZLIB,
+    COMPRESSION_LZMA,
+    DEFAULT_COMPRESSION_LEVEL
+)
+from scripts.ascii_video_codec import delta_encode_frames, resolve_references, ENCODING_FULL, ENCODING_DELTA
+from scripts.lazy_import import lazy_import
+
+np = lazy_import('numpy')
+cv2 = lazy_import('cv2')
 
 
 BASE_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 
 OUTPUT_JSON = 'JSON'
 OUTPUT_PICKLE = 'PICKLE'
+OUTPUT_BINARY = 'BINARY'
 
 OUTPUT_TYPES = {
     'j': OUTPUT_JSON,
-    'p': OUTPUT_PICKLE
+    'p': OUTPUT_PICKLE,
+    'b': OUTPUT_BINARY
+}
+
+COMPRESSION_OPTIONS = {
+    'n': COMPRESSION_NONE,
+    'z': COMPRESSION_ZLIB,
+    'l': COMPRESSION_LZMA
 }
 
+# Decoded frames buffered per core when streaming frames to the convertor processes
+STREAM_QUEUE_FRAMES_PER_CORE = 4
+
+# Seconds without a converted frame before the incremental writer checks for crashed convertor processes
+INCREMENTAL_RESULT_TIMEOUT = 1.0
+
 class VideoAsciiConvertor:
-    def __init__(self, resolution_scale: float, num_cores: int, output_type: str) -> None:
+    def __init__(
+            self,
+            resolution_scale: float,
+            num_cores: int,
+            output_type: str,
+            stream_frames: bool = False,
+            shared_output: bool = False,
+            keyframe_interval: int = 0,
+            compression: str = COMPRESSION_NONE,
+            compression_level: int = DEFAULT_COMPRESSION_LEVEL,
+            cache: ConversionCache = None,
+            instrument: bool = True,
+            trace_path: str = None,
+            sharded_decode: bool = False,
+            target_fps: float = None,
+            color_mode: str = COLOR_NONE,
+            dedup_threshold: float = None,
+            glyph_mode: str = GLYPH_MODE_BRIGHTNESS,
+            charset: str = None,
+            incremental_output: bool = False,
+            reorder_window: int = DEFAULT_REORDER_WINDOW
+        ) -> None:
+
+        # Frames go to the output file in frame order as they finish, only the reorder window is held in memory
+        # The window only stays small when frames are handed out in order, so the frames are streamed
+        if incremental_output and (sharded_decode or shared_output):
+            raise ValueError('Incremental output streams the frames, it can not be combined with sharded decode or shared output')
+
+        self._incremental_output = incremental_output
+        self._reorder_window = max(1, reorder_window)
+        self._result_queue = None
+
         self._resolution_scale = resolution_scale
+        self._stream_frames = stream_frames
+        self._shared_output = shared_output
+
+        # Every convertor process decodes its own frame range of the video, overrides stream frames
+        self._sharded_decode = sharded_decode
+
+        # Source frames are skipped down to this fps without being converted, None keeps every frame
+        self._target_fps = target_fps
+
+        # Duplicate frames are stored as references to an earlier frame, the threshold is the share of cells
+        # a near duplicate may change (0 only matches identical frames), None converts every frame
+        self._dedup_threshold = dedup_threshold
+
+        # Created in every convertor process, workers compare against the frames they converted themselves
+        self._duplicate_detector = None
+
+        # Frames between keyframes are stored as deltas to the previous frame, 0 stores every frame in full
+        self._keyframe_interval = keyframe_interval
+
+        # Compression of binary output, written in independently compressed chunks
+        self._compression = compression
+        self._compression_level = compression_level
+
+        # Finished outputs are looked up here before converting, None disables caching
+        self._cache = cache
+
+        # Stage timings of every conversion, written with trace events to the trace path when set
+        self._instrumentation = Instrumentation(instrument, trace_path is not None)
+        self._trace_path = trace_path
+        self._metrics_queue = None
+
         self.set_num_cores(num_cores)
         self.set_output_type(output_type)
 
@@ -32,15 +131,35 @@ class VideoAsciiConvertor:
         self._temp_path = os.path.join(BASE_PATH, 'temp')
 
         self._frame_extractor = VideoFramesExtractor(self._temp_path)
-        self._image_convertor = ImgAsciiConvertor(resolution_scale, False)
+        self._image_convertor = ImgAsciiConvertor(
+            resolution_scale,
+            False,
+            color_mode=color_mode,
+            glyph_mode=glyph_mode,
+            charset=charset
+        )
         self._video_player = AsciiVideoPlayer()
 
         self._extract_start = None
         self._conversion_start = None
 
-        # Create shared output dict for multiprocessing
-        manager = mp.Manager()
-        self._output_frames = manager.dict()
+        # Shared glyph array used instead of the output dict when shared output is on
+        self._shared_frames = None
+
+        # Frames converted by all processes, read by the progress reporter
+        self._converted_frames = None
+
+        # Shared output dicts for multiprocessing, the manager process only starts once a conversion collects frames in them
+        self._manager = None
+        self._output_frames = None
+        self._output_colors = None
+
+    def __getstate__(self) -> dict:
+        # Workers are started with the convertor, spawned ones pickle it: the dict proxies
+        # can be pickled, the manager itself can not and stays in the main process
+        state = self.__dict__.copy()
+        state['_manager'] = None
+        return state
 
     def convert_input_files(self) -> None:
         for file in os.listdir(self._input_path):
@@ -51,39 +170,146 @@ class VideoAsciiConvertor:
         if not os.path.isfile(video_path):
             raise FileNotFoundError
 
-        # Extract frames from video into temp folder
-        self._extract_start = time.time()
-        temp_dir = self._frame_extractor.extract(video_path)
-        result_fps = self._frame_extractor.get_vidcap_fps() # Save fps for output before closing vidcap
-        self._frame_extractor.close_vidcap()
-        print(f'Frames extracted in {(time.time() - self._extract_start):.2f}s')
-        print()
+        result_filename = f'{os.path.basename(video_path).split(".")[0]}'
+
+        # A video converted before with the same settings is copied from the cache
+        cache_key = None
+        if self._cache is not None:
+            cache_key = self.get_cache_key(video_path)
+            result_path = self.restore_cached_result(cache_key, result_filename)
+
+            if result_path is not None:
+                ui.print_lines([
+                    'VIDEO CONVERSION FINISHED - Loaded from cache',
+                    f' -> Output file: {result_path}',
+                    f' -> {self._cache.get_stats_line()}'
+                ], seperate_chunk=True)
+
+                if (play_after_finish):
+                    self._play(result_path)
 
-    	# Convert frames to ascii
-        self._conversion_start = time.time()
-        self._convert_frames(temp_dir)
+                return result_path
+
+        # Shared memory and incremental output never store frames in the output dicts
+        if not self._shared_output and not self._incremental_output:
+            self._prepare_output_dicts()
+        self._instrumentation.reset()
+
+        if self._incremental_output:
+            # Decode frames straight into the convertor processes, the output is written while converting
+            self._extract_start = self._conversion_start = time.time()
+            result_fps, result_path = self._convert_frames_incremental(video_path, result_filename)
+            temp_dir = None
+        elif self._sharded_decode:
+            # Decode and convert frame ranges of the video in parallel
+            self._extract_start = self._conversion_start = time.time()
+            result_fps = self._convert_frames_sharded(video_path)
+            temp_dir = None
+        elif self._stream_frames:
+            # Decode frames straight into the convertor processes
+            self._extract_start = self._conversion_start = time.time()
+            result_fps = self._convert_frames_stream(video_path)
+            temp_dir = None
+        else:
+            # Extract frames from video into temp folder
+            self._extract_start = time.time()
+            with self._instrumentation.stage('decode'):
+                temp_dir = self._frame_extractor.extract(video_path, self._target_fps)
+                result_fps = self._frame_extractor.get_output_fps() # Save fps for output before closing vidcap
+                self._frame_extractor.close_vidcap()
+            print(f'Frames extracted in {(time.time() - self._extract_start):.2f}s')
+            print()
+
+            # Convert frames to ascii
+            self._conversion_start = time.time()
+            self._convert_frames(temp_dir)
         
         # Save output to file
         print('Saving the result...', end='\r')
-        result_filename = f'{os.path.basename(video_path).split(".")[0]}'
-        result_path = self._save_result(result_filename, result_fps)
+        with self._instrumentation.stage('serialize'):
+            if not self._incremental_output:
+                result_path = self._save_result(result_filename, result_fps)
 
-        # Clear temp directory
-        print('Cleaning up...      ', end='\r')
-        shutil.rmtree(temp_dir)
+            if cache_key is not None:
+                self._cache.put(cache_key, result_path)
+
+        with self._instrumentation.stage('cleanup'):
+            if self._shared_frames is not None:
+                self._shared_frames.close()
+                self._shared_frames = None
+
+            # Clear temp directory
+            if temp_dir is not None:
+                print('Cleaning up...      ', end='\r')
+                shutil.rmtree(temp_dir)
 
         print(f'Ascii conversion finished in {(time.time() - self._conversion_start):.2f}s')
         print()
         print()
 
-        ui.print_lines([
+        outro_lines = [
             f'VIDEO CONVERSION FINISHED - Total time {(time.time() - self._extract_start):.2f}s',
             f' -> Output file: {result_path}'
-        ], seperate_chunk=True)
+        ]
+        if self._cache is not None:
+            outro_lines.append(f' -> {self._cache.get_stats_line()}')
+        if self._instrumentation.is_enabled():
+            outro_lines.append(f' -> {self._instrumentation.get_summary_line()}')
+            if self._dedup_threshold is not None:
+                duplicate_frames = self._instrumentation.get_metrics()['counters'].get('duplicates', {}).get('total', 0)
+                outro_lines.append(f' -> Duplicate frames stored as references: {duplicate_frames}')
+
+        if self._trace_path is not None and self._instrumentation.is_enabled():
+            self._instrumentation.save(self._trace_path, {
+                'input':    video_path,
+                'output':   result_path,
+                'frames':   self._converted_frames.value,
+                'cores':    self._num_cores
+            })
+            outro_lines.append(f' -> Trace file: {self._trace_path}')
+
+        ui.print_lines(outro_lines, seperate_chunk=True)
 
         if (play_after_finish):
             self._play(result_path)
+
+        return result_path
     
+    def save_glyph_frames(self, file_name: str, fps: float, glyph_frames: dict, color_frames: dict = None) -> str:
+        # Save glyph indices (frame number -> array) converted outside of this convertor, with their colors in color mode
+        return self._save_result(file_name, fps, glyph_frames, color_frames)
+
+    def get_cache_key(self, video_path: str, stream_frames: bool = None) -> str:
+        # Frames extracted to temp files go through JPEG and convert differently than decoded in memory ones
+        if stream_frames is None:
+            stream_frames = self._stream_frames or self._sharded_decode or self._incremental_output
+
+        return self._cache.get_key(video_path, {
+            **self._image_convertor.get_cache_params(),
+            'output_type':          self._output_type,
+            'stream_frames':        stream_frames,
+            'keyframe_interval':    self._keyframe_interval,
+            'compression':          self._compression,
+            'compression_level':    self._compression_level,
+            'target_fps':           self._target_fps,
+            'dedup_threshold':      self._dedup_threshold
+        })
+
+    def restore_cached_result(self, cache_key: str, file_name: str) -> str:
+        # Copies a cached output to the output path, returns None on a cache miss
+        result_path = self._get_result_path(file_name)
+
+        if not self._cache.copy_to(cache_key, result_path):
+            return None
+
+        return result_path
+
+    def cache_result(self, cache_key: str, result_path: str) -> None:
+        self._cache.put(cache_key, result_path)
+
+    def get_cache(self) -> ConversionCache:
+        return self._cache
+
     def set_output_type(self, output_type: str) -> None:
         if output_type not in OUTPUT_TYPES:
             return
@@ -94,70 +320,680 @@ class VideoAsciiConvertor:
         self._resolution_scale = resolution_scale
         self._image_convertor.set_resolution_scale(resolution_scale)
     
+    def set_output_path(self, output_path: str) -> None:
+        self._output_path = output_path
+
+    def get_resolution_scale(self) -> float:
+        return self._resolution_scale
+
+    def get_target_fps(self) -> float:
+        return self._target_fps
+
+    def get_color_mode(self) -> str:
+        return self._image_convertor.get_color_mode()
+
+    def get_glyph_mode(self) -> str:
+        return self._image_convertor.get_glyph_mode()
+
+    def get_charset(self) -> str:
+        return self._image_convertor.get_grayscale_chars()
+
+    def get_dedup_threshold(self) -> float:
+        return self._dedup_threshold
+
     def set_num_cores(self, num_cores: int) -> None:
         # Set num cores in range 1 - max cores
-        self._num_cores = max(1, min(num_cores, os.cpu_count()))
+        self._num_cores = max(1, min(int(num_cores), os.cpu_count()))
 
     def _convert_frames(self, temp_dir: list) -> None:
         print('Preparing ascii conversion...', end='\r')
-        # Create processes based on num cores attribute
-        frames = os.listdir(temp_dir)
+        # Create processes based on num cores attribute, chunks of consecutive frames so duplicates are found
+        frames = sorted(os.listdir(temp_dir), key=lambda frame: int(frame.split('.')[0].split('_')[-1]))
         chunk_size = ceil(len(frames)/self._num_cores)
         split_frames = self._split_frames(frames, chunk_size)
         processes = []
 
-        for frame_chunk in split_frames:
-            process = mp.Process(target=self._convert_frame_chunk, args=(frame_chunk,temp_dir,len(frames),))
+        if self._shared_output and len(frames) > 0:
+            # All extracted frames have the size of the first one
+            frame_size = self._image_convertor.load_image_array(os.path.join(temp_dir, frames[0])).shape
+            self._create_shared_frames(len(frames), frame_size)
+
+        self._prepare_workers()
+        progress_reporter = self._create_progress_reporter(len(frames))
+
+        for worker_number, frame_chunk in enumerate(split_frames, start=1):
+            process = mp.Process(target=self._convert_frame_chunk, args=(frame_chunk,temp_dir,worker_number,))
             processes.append(process)
             process.start()
 
+        progress_reporter.start()
+        self._join_workers(processes)
+        progress_reporter.stop()
+
+    def _convert_frames_stream(self, video_path: str) -> float:
+        print('Preparing ascii conversion...', end='\r')
+        frame_count, fps, frame_size = self._frame_extractor.get_video_info(video_path)
+
+        sampler = FrameSampler(fps, self._target_fps)
+        frame_count = sampler.get_frame_count(frame_count)
+
+        if self._shared_output:
+            self._create_shared_frames(frame_count, frame_size)
+
+        # Bounded queue so decoding never runs far ahead of the conversion
+        frame_queue = mp.Queue(maxsize=self._num_cores * STREAM_QUEUE_FRAMES_PER_CORE)
+        processes = []
+
+        self._prepare_workers()
+        progress_reporter = self._create_progress_reporter(frame_count)
+
+        # Start the convertor processes before opening the vidcap so they can consume right away
+        for worker_number in range(1, self._num_cores + 1):
+            process = mp.Process(target=self._convert_frame_queue, args=(frame_queue,worker_number,))
+            processes.append(process)
+            process.start()
+
+        progress_reporter.start()
+
+        # Time spent blocked on a full queue counts as decoding too
+        with self._instrumentation.stage('decode'):
+            self._frame_extractor.stream(
+                video_path,
+                frame_queue,
+                self._num_cores,
+                self._target_fps,
+                self._image_convertor.has_colors()
+            )
+            self._frame_extractor.close_vidcap()
+
+        self._join_workers(processes)
+        progress_reporter.stop()
+
+        return sampler.get_output_fps()
+
+    def _convert_frames_incremental(self, video_path: str, file_name: str) -> tuple:
+        print('Preparing ascii conversion...', end='\r')
+        frame_count, fps, _ = self._frame_extractor.get_video_info(video_path)
+
+        sampler = FrameSampler(fps, self._target_fps)
+        frame_count = sampler.get_frame_count(frame_count)
+        result_fps = sampler.get_output_fps()
+        result_path = self._get_result_path(file_name)
+
+        # Every decoded frame takes a slot until it is written, frames in flight never exceed the reorder window
+        frame_slots = threading.Semaphore(self._reorder_window)
+        frame_sink = self._create_frame_sink(result_path, result_fps)
+        # The output is removed again when converting or writing fails
+        with frame_sink:
+            # Streamed frames are numbered from 1
+            frame_writer = IncrementalFrameWriter(
+                frame_sink,
+                1,
+                self._keyframe_interval,
+                DUPLICATE_HISTORY_FRAMES * self._num_cores + self._reorder_window
+            )
+
+            frame_queue = mp.Queue(maxsize=self._num_cores * STREAM_QUEUE_FRAMES_PER_CORE)
+            self._result_queue = mp.Queue()
+            processes = []
+
+            self._prepare_workers()
+            progress_reporter = self._create_progress_reporter(frame_count)
+
+            for worker_number in range(1, self._num_cores + 1):
+                process = mp.Process(target=self._convert_frame_queue, args=(frame_queue,worker_number,))
+                processes.append(process)
+                process.start()
+
+            write_errors = []
+            writer_thread = threading.Thread(
+                target=self._write_frames,
+                args=(frame_writer,frame_slots,processes,write_errors,),
+                daemon=True
+            )
+            writer_thread.start()
+            progress_reporter.start()
+
+            try:
+                with self._instrumentation.stage('decode'):
+                    self._frame_extractor.stream(
+                        video_path,
+                        frame_queue,
+                        self._num_cores,
+                        self._target_fps,
+                        self._image_convertor.has_colors(),
+                        frame_slots
+                    )
+                    self._frame_extractor.close_vidcap()
+
+                self._join_workers(processes)
+            finally:
+                # Every worker is done, the end marker comes after all their frames
+                self._result_queue.put(None)
+                writer_thread.join()
+                self._result_queue = None
+                progress_reporter.stop()
+
+            if write_errors:
+                raise write_errors[0]
+
+            with self._instrumentation.stage('serialize'):
+                frame_writer.close()
+
+        if self._output_type == OUTPUT_BINARY and self._compression != COMPRESSION_NONE:
+            print(f'Compression ratio: {frame_sink.get_compression_ratio():.1f}x ({self._compression})')
+
+        return result_fps, result_path
+
+    def _write_frames(
+            self,
+            frame_writer: IncrementalFrameWriter,
+            frame_slots: threading.Semaphore,
+            processes: list,
+            write_errors: list
+        ) -> None:
+
+        while True:
+            try:
+                result = self._result_queue.get(timeout=INCREMENTAL_RESULT_TIMEOUT)
+            except queue.Empty:
+                # Frames of a crashed worker never arrive, the ones after them are written without them
+                if any(process.exitcode not in (None, 0) for process in processes):
+                    skipped_frames = frame_writer.skip_missing()
+                    if skipped_frames > 0:
+                        frame_slots.release(skipped_frames)
+                continue
+
+            if result is None:
+                return
+
+            if write_errors:
+                # Keep freeing slots so decoding and the workers can finish, the error is raised after
+                frame_slots.release()
+                continue
+
+            try:
+                with self._instrumentation.stage('write', 'writer'):
+                    written_frames = frame_writer.add(*result)
+            except Exception as error:
+                write_errors.append(error)
+                written_frames = 1 + frame_writer.get_pending_count()
+
+            if written_frames > 0:
+                frame_slots.release(written_frames)
+
+    def _create_frame_sink(self, result_path: str, fps: float) -> object:
+        if self._output_type == OUTPUT_BINARY:
+            return BinaryFrameSink(
+                lambda frame_rows, frame_cols, first_frame: self._create_binary_writer(
+                    result_path, fps, frame_rows, frame_cols, first_frame
+                )
+            )
+
+        sink_class = JsonFrameSink if self._output_type == OUTPUT_JSON else PickleFrameSink
+
+        return sink_class(
+            result_path,
+            lambda first_frame: self._get_output_header(fps, first_frame),
+            self._image_convertor.glyph_indices_to_rows,
+            self._keyframe_interval
+        )
+
+    def _convert_frames_sharded(self, video_path: str) -> float:
+        print('Preparing ascii conversion...', end='\r')
+        source_frame_count, fps, frame_size = self._frame_extractor.get_video_info(video_path)
+
+        sampler = FrameSampler(fps, self._target_fps)
+        frame_count = sampler.get_frame_count(source_frame_count)
+
+        if self._shared_output:
+            self._create_shared_frames(frame_count, frame_size)
+
+        # Equal source frame ranges, the last one reads to the end in case the frame count is off
+        shard_size = max(1, ceil(source_frame_count / self._num_cores))
+        shard_count = max(1, min(self._num_cores, ceil(source_frame_count / shard_size)))
+        shard_queue = mp.Queue()
+        processes = []
+
+        self._prepare_workers()
+        progress_reporter = self._create_progress_reporter(frame_count)
+
+        for shard_index in range(shard_count):
+            first_index = shard_index * shard_size
+            end_index = first_index + shard_size if shard_index < shard_count - 1 else None
+
+            process = mp.Process(
+                target=self._convert_frame_range,
+                args=(video_path,sampler,first_index,end_index,shard_index + 1,shard_queue,)
+            )
+            processes.append(process)
+            process.start()
+
+        progress_reporter.start()
+        self._join_workers(processes)
+        progress_reporter.stop()
+
+        shards = []
+        for _ in range(shard_count):
+            try:
+                shards.append(shard_queue.get(timeout=1))
+            except queue.Empty:
+                break
+
+        self._verify_shards(shards, shard_count)
+
+        return sampler.get_output_fps()
+
+    def _convert_frame_range(
+            self,
+            video_path: str,
+            sampler: FrameSampler,
+            first_index: int,
+            end_index: int,
+            worker_number: int,
+            shard_queue: mp.Queue
+        ) -> None:
+
+        worker = f'worker-{worker_number}'
+        self._instrumentation.reset()
+        self._duplicate_detector = self._create_duplicate_detector()
+
+        start_index = None
+        first_number = None
+        converted_frames = 0
+
+        try:
+            with self._instrumentation.stage('seek', worker):
+                vidcap = self._frame_extractor.open_at_frame(video_path, first_index)
+
+            # Numbering follows the position the vidcap reports, checked against the other shards at the end
+            start_index = int(vidcap.get(cv2.CAP_PROP_POS_FRAMES))
+            source_index = start_index
+
+            while end_index is None or source_index < end_index:
+                with self._instrumentation.stage('decode', worker):
+                    success = vidcap.grab()
+
+                    # Skipped frames are grabbed but never retrieved and color converted
+                    kept = success and sampler.keeps(source_index)
+                    if kept:
+                        success, image = vidcap.retrieve()
+                        if success:
+                            frame_array, color_array = self._split_frame(image)
+                if not success:
+                    break
+
+                if kept:
+                    frame_number = sampler.get_frame_number(source_index)
+                    if first_number is None:
+                        first_number = frame_number
+
+                    self._convert_frame(frame_number, frame_array, worker, color_array)
+                    converted_frames += 1
+
+                source_index += 1
+
+            vidcap.release()
+        finally:
+            shard_queue.put((worker_number, first_index, start_index, first_number, converted_frames))
+            self._send_worker_metrics()
+
+    def _verify_shards(self, shards: list, shard_count: int) -> None:
+        # Shards have to start where they were sent and follow each other without gaps or overlaps
+        if len(shards) != shard_count:
+            raise RuntimeError(f'Only {len(shards)} of {shard_count} frame ranges finished')
+
+        next_number = 1
+        for worker_number, planned_index, start_index, first_number, converted_frames in sorted(shards):
+            if converted_frames == 0:
+                continue
+
+            if start_index != planned_index:
+                raise RuntimeError(
+                    f'Frame range {worker_number} starts at source frame {start_index}, expected {planned_index}'
+                )
+
+            if first_number != next_number:
+                raise RuntimeError(
+                    f'Frame range {worker_number} starts at frame {first_number}, expected {next_number}'
+                )
+
+            next_number = first_number + converted_frames
+
+    def _convert_frame_queue(self, frame_queue: mp.Queue, worker_number: int) -> None:
+        worker = f'worker-{worker_number}'
+        self._instrumentation.reset()
+        self._duplicate_detector = self._create_duplicate_detector()
+
+        try:
+            while True:
+                with self._instrumentation.stage('queue_wait', worker):
+                    queued_frame = frame_queue.get()
+                if queued_frame is None:
+                    break
+
+                frame_number, frame_array = queued_frame
+
+                # Frames of color mode come in as decoded
+                color_array = None
+                if frame_array.ndim == 3:
+                    frame_array, color_array = self._split_frame(frame_array)
+
+                self._convert_frame(frame_number, frame_array, worker, color_array)
+        finally:
+            self._send_worker_metrics()
+
+    def _convert_frame_chunk(self, frame_chunk: list, temp_dir: str, worker_number: int) -> None:
+        worker = f'worker-{worker_number}'
+        self._instrumentation.reset()
+        self._duplicate_detector = self._create_duplicate_detector()
+
+        try:
+            for frame in frame_chunk:
+                frame_number = int(frame.split('.')[0].split('_')[-1])
+                with self._instrumentation.stage('decode', worker):
+                    frame_path = os.path.join(temp_dir, frame)
+                    color_array = None
+                    if self._image_convertor.has_colors():
+                        frame_array, color_array = self._image_convertor.load_image_arrays(frame_path)
+                    else:
+                        frame_array = self._image_convertor.load_image_array(frame_path)
+
+                self._convert_frame(frame_number, frame_array, worker, color_array)
+        finally:
+            self._send_worker_metrics()
+
+    def _convert_frame(self, frame_number: int, frame_array: np.ndarray, worker: str, color_array: np.ndarray = None) -> None:
+        with self._instrumentation.stage('convert', worker):
+            block_sums, block_area = self._image_convertor.get_block_sums(frame_array)
+
+            colors = None
+            if color_array is not None:
+                colors = self._image_convertor.get_block_colors(color_array)
+
+            # Glyphs matched by shape are compared themselves, equal block sums can still hold other shapes
+            glyph_indices = None
+            if self._image_convertor.matches_glyph_structure(block_area):
+                glyph_indices = self._image_convertor.get_glyph_indices(frame_array, block_sums)
+
+            # Duplicates skip the glyph mapping and are stored as the number of the frame they repeat
+            reference_number = None
+            if self._duplicate_detector is not None:
+                reference_number = self._duplicate_detector.find_reference(frame_number, block_sums, block_area, colors, glyph_indices)
+
+            if reference_number is None and glyph_indices is None:
+                glyph_indices = self._image_convertor.get_glyph_indices(frame_array, block_sums)
+
+        with self._instrumentation.stage('store', worker):
+            if reference_number is None:
+                self._store_frame(frame_number, glyph_indices, colors)
+            else:
+                self._store_reference(frame_number, reference_number)
+                self._instrumentation.count('duplicates', 1, worker)
+
+        self._instrumentation.count('frames', 1, worker)
+
+        with self._converted_frames.get_lock():
+            self._converted_frames.value += 1
+
+    def _split_frame(self, image: np.ndarray) -> tuple:
+        # Decoded BGR frame -> grayscale array + rgb array in color mode, grayscale only otherwise
+        frame_array = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+        if not self._image_convertor.has_colors():
+            return frame_array, None
+
+        return frame_array, cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+    def _prepare_workers(self) -> None:
+        self._converted_frames = mp.Value('i', 0)
+
+        # Workers send their records once when they finish
+        self._metrics_queue = mp.Queue() if self._instrumentation.is_enabled() else None
+
+    def _send_worker_metrics(self) -> None:
+        if self._metrics_queue is not None:
+            self._metrics_queue.put(self._instrumentation.get_records())
+
+    def _join_workers(self, processes: list) -> None:
+        # Read worker records before joining, a worker can't exit while its queue data is unread
+        remaining_records = len(processes) if self._metrics_queue is not None else 0
+
+        while remaining_records > 0:
+            try:
+                self._instrumentation.merge(self._metrics_queue.get(timeout=0.1))
+                remaining_records -= 1
+            except queue.Empty:
+                # A crashed worker never sends its records
+                if not any(process.is_alive() for process in processes) and self._metrics_queue.empty():
+                    break
+
         for process in processes:
             process.join()
-        
-        # Clear the progress line
-        print('                                                                                    ')
 
-    def _convert_frame_chunk(self, frame_chunk: list, temp_dir: str, frame_count: int) -> None:
-        for frame in frame_chunk:
-            frame_number = frame.split('.')[0].split('_')[-1]
-            self._output_frames[frame_number] = self._image_convertor.convert(os.path.join(temp_dir, frame))
+    def _prepare_output_dicts(self) -> None:
+        if self._manager is None:
+            self._manager = mp.Manager()
+            self._output_frames = self._manager.dict()
+            self._output_colors = self._manager.dict()
 
-            # Print progress
-            self._print_convert_progress(frame_count)
+        # Drop frames left over from a previous video
+        self._output_frames.clear()
+        self._output_colors.clear()
+
+    def _create_progress_reporter(self, frame_count: int) -> ProgressReporter:
+        return ProgressReporter('Converting frames to ascii', frame_count, lambda: self._converted_frames.value)
+
+    def _create_shared_frames(self, frame_count: int, frame_size: tuple) -> None:
+        frame_rows, frame_cols = self._image_convertor.get_output_shape(frame_size)
+        self._shared_frames = SharedGlyphFrames(
+            frame_count,
+            frame_rows,
+            frame_cols,
+            COLOR_CELL_BYTES.get(self._image_convertor.get_color_mode(), 0)
+        )
+
+    def _store_frame(self, frame_number: int, glyph_indices: np.ndarray, colors: np.ndarray = None) -> None:
+        if self._result_queue is not None:
+            self._result_queue.put((frame_number, glyph_indices, colors))
+            return
+
+        if self._shared_frames is not None:
+            self._shared_frames.store(frame_number, glyph_indices, colors)
+            return
+
+        self._output_frames[str(frame_number)] = self._image_convertor.glyph_indices_to_rows(glyph_indices)
+        if colors is not None:
+            self._output_colors[str(frame_number)] = colors
+
+    def _store_reference(self, frame_number: int, reference_number: int) -> None:
+        if self._result_queue is not None:
+            self._result_queue.put((frame_number, reference_number, None))
+            return
+
+        if self._shared_frames is not None:
+            self._shared_frames.store_reference(frame_number, reference_number)
+            return
+
+        self._output_frames[str(frame_number)] = reference_number
+
+    def _create_duplicate_detector(self) -> DuplicateFrameDetector:
+        if self._dedup_threshold is None:
+            return None
+
+        return DuplicateFrameDetector(self._dedup_threshold)
+
+    def _get_output_frames(self, glyph_frames: dict = None) -> dict:
+        # Frame key -> rows, or the number of the repeated frame for duplicates
+        if glyph_frames is not None:
+            return {
+                str(frame_number): self._glyph_value_to_rows(glyph_frames[frame_number])
+                for frame_number in sorted(glyph_frames)
+            }
+
+        if self._shared_frames is not None:
+            return self._shared_frames.to_frames_dict(self._image_convertor.glyph_indices_to_rows)
+
+        return dict(self._output_frames) if self._output_frames is not None else {}
+
+    def _get_output_colors(self, glyph_frames: dict = None, color_frames: dict = None) -> dict:
+        # Frame key -> cell colors, None without colors
+        if not self._image_convertor.has_colors():
+            return None
+
+        if glyph_frames is not None:
+            return {str(frame_number): color_frames[frame_number] for frame_number in color_frames}
+
+        if self._shared_frames is not None:
+            return {
+                str(frame_number): self._shared_frames.get_colors(frame_number)
+                for frame_number, frame_value in self._shared_frames.get_stored_frames()
+                if not isinstance(frame_value, int)
+            }
+
+        return dict(self._output_colors) if self._output_colors is not None else {}
+
+    def _get_glyph_frames(self, glyph_frames: dict = None) -> dict:
+        # Frame key -> glyph indices, or the number of the repeated frame for duplicates
+        if glyph_frames is not None:
+            return {str(frame_number): glyph_frames[frame_number] for frame_number in sorted(glyph_frames)}
+
+        return {str(frame_number): frame_value for frame_number, frame_value in self._shared_frames.get_stored_frames()}
+
+    def _glyph_value_to_rows(self, frame_value: object) -> object:
+        if isinstance(frame_value, int):
+            return frame_value
+
+        return self._image_convertor.glyph_indices_to_rows(frame_value)
 
     def _split_frames(self, frames: list, chunk_size: int = 100):
         for i in range(0, len(frames), chunk_size):  
             yield frames[i:i + chunk_size] 
 
-    def _save_result(self, file_name: str, fps: float) -> None:
+    def _get_result_path(self, file_name: str) -> str:
+        # Add resolution to file name
+        file_name += f'_0{int(self._resolution_scale * 100)}'
+
+        extensions = {
+            OUTPUT_JSON:    'json',
+            OUTPUT_PICKLE:  'pkl',
+            OUTPUT_BINARY:  ASCII_VIDEO_EXTENSION
+        }
+
+        return os.path.join(self._output_path, f'{file_name}.{extensions[self._output_type]}')
+
+    def _save_result(self, file_name: str, fps: float, glyph_frames: dict = None, color_frames: dict = None) -> str:
+        result_path = self._get_result_path(file_name)
+        output_colors = self._get_output_colors(glyph_frames, color_frames)
+
+        if self._output_type == OUTPUT_BINARY:
+            self._save_binary_result(result_path, fps, glyph_frames, output_colors)
+            return result_path
+
+        # Frames are written in order so players can stream them from the start
+        output_frames = self._get_output_frames(glyph_frames)
+        frame_keys = sorted(output_frames.keys(), key=int)
+
         output = {
-            'fps':          fps,
-            'resolution':   self._resolution_scale,
-            'frames':       dict(self._output_frames)
+            **self._get_output_header(fps, int(frame_keys[0]) if frame_keys else 1),
+            'frames':       {frame_key: output_frames[frame_key] for frame_key in frame_keys}
         }
 
-        # Add resolution to file name
-        file_name += f'_0{int(self._resolution_scale * 100)}'
+        if self._keyframe_interval > 0:
+            output['frames'] = delta_encode_frames(
+                resolve_references(output['frames'], output_colors),
+                self._keyframe_interval
+            )
+
+        if output_colors is not None:
+            # Colored frames are objects holding the rows (or delta runs) and the base64 colors
+            output['frames'] = {
+                frame_key: frame_value if isinstance(frame_value, int) else {
+                    **(frame_value if isinstance(frame_value, dict) else {'rows': frame_value}),
+                    'colors': encode_colors(output_colors[frame_key])
+                }
+                for frame_key, frame_value in output['frames'].items()
+            }
 
         if self._output_type == OUTPUT_JSON:
-            result_path = os.path.join(self._output_path, f'{file_name}.json')
             with open(result_path, 'w') as json_file:
                 json.dump(output, json_file)
         
         if self._output_type == OUTPUT_PICKLE:
-            result_path = os.path.join(self._output_path, f'{file_name}.pkl')
             with open(result_path, 'wb') as pkl_file:
                 pickle.dump(output, pkl_file)
 
         return result_path
 
-    def _print_convert_progress(self, frame_count: int) -> None:
-        time_passed = time.time() - self._conversion_start
-        converted_frames = len(self._output_frames.keys())
-        fps = converted_frames / time_passed
-        estimate = int((frame_count - converted_frames) / fps)
+    def _get_output_header(self, fps: float, first_frame: int) -> dict:
+        # Lazy readers parse everything before the frames as the header
+        header = {
+            'fps':          fps,
+            'resolution':   self._resolution_scale,
+            'encoding':     ENCODING_FULL,
+            'first_frame':  first_frame,
+            'color_mode':   self._image_convertor.get_color_mode(),
+            'charset':      self._image_convertor.get_grayscale_chars()
+        }
+
+        if self._keyframe_interval > 0:
+            header['encoding'] = ENCODING_DELTA
+            header['keyframe_interval'] = self._keyframe_interval
+
+        return header
+
+    def _save_binary_result(self, result_path: str, fps: float, glyph_frames: dict = None, output_colors: dict = None) -> None:
+        # Glyph indices go to the file as they are, output frames as rows
+        is_glyph_output = glyph_frames is not None or self._shared_frames is not None
+        binary_frames = self._get_glyph_frames(glyph_frames) if is_glyph_output else self._get_output_frames()
+        frame_keys = sorted(binary_frames.keys(), key=int)
+
+        # Checked before the file is created, the .ascv index can not hold gaps
+        if not frame_keys:
+            raise ValueError(f'No frames were converted, {os.path.basename(result_path)} was not written')
+        check_contiguous_frames(frame_keys)
+
+        first_value = binary_frames[frame_keys[0]]
+        if is_glyph_output:
+            frame_rows, frame_cols = first_value.shape
+        else:
+            frame_rows, frame_cols = len(first_value), len(first_value[0])
+
+        # Delta encoded files need every reference to repeat the previous stored frame
+        if self._keyframe_interval > 0:
+            binary_frames = resolve_references(binary_frames, output_colors)
+
+        if output_colors is None:
+            output_colors = {}
+
+        with self._create_binary_writer(result_path, fps, frame_rows, frame_cols, int(frame_keys[0])) as writer:
+            for frame_key in frame_keys:
+                frame_value = binary_frames[frame_key]
+
+                if isinstance(frame_value, int):
+                    writer.write_reference(frame_value, int(frame_key))
+                elif isinstance(frame_value, list):
+                    writer.write_rows(frame_value, output_colors.get(frame_key), int(frame_key))
+                else:
+                    writer.write_frame(frame_value, output_colors.get(frame_key), int(frame_key))
+
+        if self._compression != COMPRESSION_NONE:
+            print(f'Compression ratio: {writer.get_compression_ratio():.1f}x ({self._compression})')
 
-        print(f'Converting frames to ascii [{converted_frames}/{frame_count}] | est. time left: {estimate}s            ', end='\r')
+    def _create_binary_writer(self, result_path: str, fps: float, frame_rows: int, frame_cols: int, first_frame: int) -> AsciiVideoWriter:
+        return AsciiVideoWriter(
+            result_path,
+            fps,
+            self._resolution_scale,
+            frame_rows,
+            frame_cols,
+            self._image_convertor.get_grayscale_chars(),
+            first_frame,
+            self._keyframe_interval,
+            self._compression,
+            self._compression_level,
+            color_mode=self._image_convertor.get_color_mode()
+        )
 
     def _play(self, path: str) -> None:
         print()
@@ -1,8 +1,39 @@
-import cv2
+from __future__ import annotations
 import os
 import threading
+from typing import Any
 from string import digits
 from random import choice as rand_choice
+from scripts.instrumentation import ProgressReporter
+from scripts.lazy_import import lazy_import
+
+cv2 = lazy_import('cv2')
+
+
+class FrameSampler:
+    def __init__(self, source_fps: float, target_fps: float = None) -> None:
+        # Keeps the first source frame at or after every tick of the target fps, all frames without a lower target
+        self._source_fps = source_fps
+
+        self._ratio = 1.0
+        if target_fps and source_fps and target_fps < source_fps:
+            self._ratio = target_fps / source_fps
+
+    def keeps(self, source_index: int) -> bool:
+        return source_index == 0 or int(source_index * self._ratio) != int((source_index - 1) * self._ratio)
+
+    def get_frame_number(self, source_index: int) -> int:
+        # Kept frames are numbered 1, 2, 3... without gaps
+        return int(source_index * self._ratio) + 1
+
+    def get_frame_count(self, source_frame_count: int) -> int:
+        if source_frame_count <= 0:
+            return 0
+
+        return self.get_frame_number(source_frame_count - 1)
+
+    def get_output_fps(self) -> float:
+        return self._source_fps * self._ratio
 
 
 class VideoFramesExtractor:
@@ -10,35 +41,115 @@ class VideoFramesExtractor:
         self._output_path = output_path
 
         self._vidcap = None
+        self._sampler = None
 
         self._extracting = False
         self._extracted_frames = 0
         self._frame_count = 0
         self._output_dir = ''
         
-    def extract(self, video_path: str) -> str:
+    def extract(self, video_path: str, target_fps: float = None) -> str:
         # Create vidcap
         self._vidcap = cv2.VideoCapture(video_path)
+        self._sampler = FrameSampler(self._vidcap.get(cv2.CAP_PROP_FPS), target_fps)
 
         self._create_output_dir()
 
-        self._frame_count = int(self._vidcap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self._frame_count = self._sampler.get_frame_count(int(self._vidcap.get(cv2.CAP_PROP_FRAME_COUNT)))
+        self._extracted_frames = 0
 
         self._extracting = True
 
         extract_thread = threading.Thread(target=self._extract_frames)
-        pp_thread = threading.Thread(target=self._print_progress)
+        progress_reporter = ProgressReporter('Extracting frames from video', self._frame_count, lambda: self._extracted_frames)
 
+        print('\r')
         extract_thread.start()
-        pp_thread.start()
+        progress_reporter.start()
 
         extract_thread.join()
-        pp_thread.join()
+        progress_reporter.stop()
 
         return self._output_dir
-    
+
+    def stream(
+            self,
+            video_path: str,
+            frame_queue: Any,
+            num_consumers: int,
+            target_fps: float = None,
+            keep_color: bool = False,
+            frame_slots: Any = None
+        ) -> None:
+
+        # Decode frames straight into the queue, put blocks while the consumers are behind
+        # Frames stay BGR with keep color, grayscale otherwise
+        # Every frame takes one of the frame slots first when given, freed once the frame was written
+        self._vidcap = cv2.VideoCapture(video_path)
+        self._sampler = FrameSampler(self._vidcap.get(cv2.CAP_PROP_FPS), target_fps)
+        self._frame_count = self._sampler.get_frame_count(int(self._vidcap.get(cv2.CAP_PROP_FRAME_COUNT)))
+        self._extracted_frames = 0
+
+        source_index = 0
+        while self._vidcap.grab():
+            # Skipped frames are grabbed but never retrieved and color converted
+            if self._sampler.keeps(source_index):
+                success, image = self._vidcap.retrieve()
+                if not success:
+                    break
+
+                self._extracted_frames += 1
+                if not keep_color:
+                    image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+                if frame_slots is not None:
+                    frame_slots.acquire()
+
+                frame_queue.put((self._sampler.get_frame_number(source_index), image))
+
+            source_index += 1
+
+        # Signal every consumer that there are no more frames
+        for _ in range(num_consumers):
+            frame_queue.put(None)
+
+    def open_at_frame(self, video_path: str, frame_index: int) -> cv2.VideoCapture:
+        # Returns a vidcap whose next read is the frame at the index (0 based)
+        vidcap = cv2.VideoCapture(video_path)
+        if frame_index == 0:
+            return vidcap
+
+        vidcap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+        if int(vidcap.get(cv2.CAP_PROP_POS_FRAMES)) == frame_index:
+            return vidcap
+
+        # Seeking is not supported or inexact for this file, skip the frames before without retrieving them
+        vidcap.release()
+        vidcap = cv2.VideoCapture(video_path)
+        for _ in range(frame_index):
+            if not vidcap.grab():
+                break
+
+        return vidcap
+
+    def get_video_info(self, video_path: str) -> tuple:
+        # Read frame count, fps and frame size (rows, cols) without keeping the vidcap open
+        vidcap = cv2.VideoCapture(video_path)
+        video_info = (
+            int(vidcap.get(cv2.CAP_PROP_FRAME_COUNT)),
+            vidcap.get(cv2.CAP_PROP_FPS),
+            (int(vidcap.get(cv2.CAP_PROP_FRAME_HEIGHT)), int(vidcap.get(cv2.CAP_PROP_FRAME_WIDTH)))
+        )
+        vidcap.release()
+
+        return video_info
+
     def get_vidcap_fps(self) -> float:
         return self._vidcap.get(cv2.CAP_PROP_FPS)
+
+    def get_output_fps(self) -> float:
+        # Fps of the extracted frames, lower than the vidcap fps with a target fps
+        return self._sampler.get_output_fps()
     
     def close_vidcap(self) -> None:
         # Close and destruct the vidcap
@@ -46,22 +157,24 @@ class VideoFramesExtractor:
         self._vidcap = None
 
     def _extract_frames(self) -> None:
+        source_index = 0
+
         while self._extracting:
-            self._extracted_frames += 1
-            self._extracting, image = self._vidcap.read()
-            try:
-                cv2.imwrite(os.path.join(self._output_dir, f'frame_{self._extracted_frames}.jpg'), image)
-            except:
-                self._extracting = False
+            self._extracting = self._vidcap.grab()
+            if not self._extracting:
                 break
-            if cv2.waitKey(10) == 27:
-                break
-    
-    def _print_progress(self) -> None:
-        print('\r')
-        while self._extracting and self._extracted_frames < self._frame_count:
-            print(f'Extracting frames from video [{self._extracted_frames}/{self._frame_count}]', end='\r')
-        print('                                                                                    ')
+
+            # Skipped frames are grabbed but never retrieved and written
+            if self._sampler.keeps(source_index):
+                self._extracting, image = self._vidcap.retrieve()
+                if not self._extracting:
+                    break
+
+                frame_number = self._sampler.get_frame_number(source_index)
+                cv2.imwrite(os.path.join(self._output_dir, f'frame_{frame_number}.jpg'), image)
+                self._extracted_frames += 1
+
+            source_index += 1
     
     def _create_output_dir(self) -> None:
         temp_id = ''.join([rand_choice(digits) for _ in range(10)])
@@ -0,0 +1,70 @@
+import sys
+import json
+import argparse
+import scripts.ui as ui
+from scripts.startup_budget import check_startup, ENTRY_POINT_BUDGETS, DEFAULT_RUNS
+
+
+def main() -> int:
+    args = parse_args()
+
+    ui.print_lines([
+        'STARTUP CHECK',
+        f' - Cold imports of {len(args.entry_points)} entry points, {args.runs} runs each'
+    ], seperate_chunk=True)
+
+    results = check_startup(args.entry_points, args.runs, args.budget_scale)
+
+    result_lines = []
+    for result in results:
+        status = 'OK' if result['passed'] else 'OVER BUDGET'
+        result_lines.append(
+            f'{result["entry_point"]}: {result["import_ms"]:.1f}ms import | {result["process_ms"]:.1f}ms process'
+            f' | budget {result["budget_ms"]:.0f}ms - {status}'
+        )
+
+        if result['heavy_modules']:
+            result_lines.append(f' -> Imported on start: {", ".join(result["heavy_modules"])}')
+
+    failed = [result for result in results if not result['passed']]
+    result_lines.append(f' -> Passed: {len(results) - len(failed)} | Failed: {len(failed)}')
+
+    ui.print_lines(result_lines, seperate_chunk=True)
+
+    if args.output is not None:
+        with open(args.output, 'w') as output_file:
+            json.dump(results, output_file, indent=4)
+
+    return 1 if failed else 0
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Check the cold start import time of every entry point against its budget')
+
+    parser.add_argument('entry_points', nargs='*', help=f'Entry points to check, all by default ({", ".join(ENTRY_POINT_BUDGETS.keys())})')
+    parser.add_argument('--runs', type=int, default=DEFAULT_RUNS, help='Fresh interpreters per entry point, the median is used')
+    parser.add_argument('--budget-scale', type=float, default=1.0, help='Multiplies every budget, for slower machines')
+    parser.add_argument('-o', '--output', default=None, help='Write the measurements to this JSON file')
+
+    args = parser.parse_args()
+
+    if not args.entry_points:
+        args.entry_points = list(ENTRY_POINT_BUDGETS.keys())
+
+    unknown_entry_points = [entry_point for entry_point in args.entry_points if entry_point not in ENTRY_POINT_BUDGETS]
+    if unknown_entry_points:
+        parser.error(f'Unknown entry points: {", ".join(unknown_entry_points)}')
+
+    if args.runs < 1:
+        parser.error('--runs must be at least 1')
+
+    return args
+
+
+if __name__ == '__main__':
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        # Turn off on keyboard interrupt
+        print('Turned off by Keyboard Interrupt')
+        sys.exit(130)
@@ -1,6 +1,9 @@
 import scripts.ui as ui
 import os
-from scripts.video_ascii_convertor import VideoAsciiConvertor
+from scripts.video_ascii_convertor import VideoAsciiConvertor, COMPRESSION_OPTIONS
+from scripts.conversion_cache import ConversionCache
+from scripts.ascii_color import COLOR_OPTIONS
+from scripts.img_ascii_convertor import GLYPH_MODE_OPTIONS
 
 # Define input options
 class InputOptions:
@@ -9,6 +12,17 @@ class InputOptions:
     output_type: str
     input_path: str
     play_after: bool
+    stream_frames: bool
+    incremental_output: bool
+    sharded_decode: bool
+    shared_output: bool
+    keyframe_interval: int
+    dedup_threshold: float
+    glyph_mode: str
+    target_fps: float
+    compression: str
+    color_mode: str
+    use_cache: bool
 
 
 def main() -> None:
@@ -24,7 +38,18 @@ def main() -> None:
     convertor = VideoAsciiConvertor(
         input_options.resolution_scale,
         input_options.num_cores,
-        input_options.output_type
+        input_options.output_type,
+        input_options.stream_frames,
+        input_options.shared_output,
+        input_options.keyframe_interval,
+        input_options.compression,
+        cache=ConversionCache() if input_options.use_cache else None,
+        sharded_decode=input_options.sharded_decode,
+        target_fps=input_options.target_fps,
+        color_mode=input_options.color_mode,
+        dedup_threshold=input_options.dedup_threshold,
+        glyph_mode=input_options.glyph_mode,
+        incremental_output=input_options.incremental_output
     )
 
     # Convert
@@ -69,12 +94,98 @@ def get_input_options() -> InputOptions:
 
     input_options.output_type = ui.get_input(
         prompt='Output type',
-        options=['j', 'p'],
-        options_prompt='j for JSON, p for PICKLE'
+        options=['j', 'p', 'b'],
+        options_prompt='j for JSON, p for PICKLE, b for BINARY'
     )
 
     print()
 
+    input_options.compression = COMPRESSION_OPTIONS['n']
+    if input_options.output_type == 'b':
+        compression = ui.get_input(
+            prompt='Compression',
+            options=list(COMPRESSION_OPTIONS.keys()),
+            options_prompt='n for NONE, z for ZLIB, l for LZMA'
+        )
+        input_options.compression = COMPRESSION_OPTIONS[compression]
+
+        print()
+
+    color_mode = ui.get_input(
+        prompt='Colors',
+        options=list(COLOR_OPTIONS.keys()),
+        options_prompt='n for NONE, 2 for 256 COLORS, t for TRUECOLOR'
+    )
+    input_options.color_mode = COLOR_OPTIONS[color_mode]
+
+    print()
+
+    glyph_mode = ui.get_input(
+        prompt='Glyphs',
+        options=list(GLYPH_MODE_OPTIONS.keys()),
+        options_prompt='b for BRIGHTNESS, s for STRUCTURE (sharper edges)'
+    )
+    input_options.glyph_mode = GLYPH_MODE_OPTIONS[glyph_mode]
+
+    print()
+
+    target_fps = ui.get_range_input(
+        prompt='Target fps, 0 keeps the fps of the video',
+        min_val=0,
+        max_val=240
+    )
+    input_options.target_fps = target_fps if target_fps > 0 else None
+
+    print()
+
+    input_options.sharded_decode = ui.get_bool_input(prompt='Decode on every core (no temp files)')
+
+    print()
+
+    input_options.stream_frames = False
+    if not input_options.sharded_decode:
+        input_options.stream_frames = ui.get_bool_input(prompt='Stream frames to the convertor (no temp files)')
+
+        print()
+
+    # Streamed frames can go to the output file as they finish instead of being collected first
+    input_options.incremental_output = False
+    if input_options.stream_frames:
+        input_options.incremental_output = ui.get_bool_input(prompt='Write frames to the output while converting (low memory)')
+
+        print()
+
+    input_options.shared_output = False
+    if not input_options.incremental_output:
+        input_options.shared_output = ui.get_bool_input(prompt='Collect frames in shared memory')
+
+        print()
+
+    input_options.keyframe_interval = int(ui.get_range_input(
+        prompt='Keyframe interval, 0 stores every frame in full',
+        min_val=0,
+        max_val=240
+    ))
+
+    print()
+
+    input_options.dedup_threshold = None
+    if ui.get_bool_input(prompt='Store duplicate frames as references'):
+        print()
+
+        # Cells of a near duplicate that may change, 0 only skips identical frames
+        input_options.dedup_threshold = ui.get_range_input(
+            prompt='Near duplicate tolerance in % of changed cells',
+            min_val=0,
+            max_val=10
+        ) / 100
+
+    print()
+
+    input_options.use_cache = ui.get_bool_input(prompt='Reuse cached conversions')
+
+    print()
+
     input_options.play_after = ui.get_bool_input(prompt='Play after conversion finished')
 
     return input_options